@@ -2,7 +2,10 @@ from node_editor.node_node import Node
 from .data_node_graphics_base import VizGraphicsNode
 from node_editor.node_socket import SocketPosition
 from node_editor.utils import dumpException
-from typing import TYPE_CHECKING, Optional, Any
+from node_editor.node_scene_cache import makeKey
+from functools import partial
+import pandas as pd
+from typing import TYPE_CHECKING, Optional, Any, List, Callable, Iterator, Iterable
 
 if TYPE_CHECKING:
     from node_editor.node_socket import Socket
@@ -20,6 +23,10 @@ class DataNode(Node):
 
     GraphicsNode_class = VizGraphicsNode
     NodeContent_class = None
+    # store the results in the cache of the scene, see node_editor.node_scene_cache.ResultCache
+    cache_result = True
+    # the operation processes each row independently, see DataNode.evalStream
+    rowwise = False
 
     def __init__(self, scene: 'Scene', inputs=None, outputs=None):
         """Instantiate a `DataNode` which is a subclass of :class:`~node_editor.node_node.Node`
@@ -30,6 +37,9 @@ class DataNode(Node):
             grNode - by default, reference to the :class:`~data_node_graphics_base.VizGraphicsNode`
             input_socket_position - :class:`~node_socket.SocketPosition`
             output_socket_position - :class:`~node_socket.SocketPosition`
+            value_key - key of the computation which produced the current value, see
+            :py:meth:`~data_node_base.DataNode.getCacheKey`
+            value_fingerprint - digest of the content of the current value
 
         Parameters
         ----------
@@ -50,9 +60,33 @@ class DataNode(Node):
         self.propertiesWidget = None
         self.initPropertiesWidget()
         # Nodes are dirty by default
-        self.value = None
+        self._value = None
+        self.value_key = None
+        self.value_fingerprint = None
+        self._pending_key = None
         self.markDirty()
 
+    @property
+    def value(self) -> Any:
+        """Current evaluation of this `DataNode`.
+
+        When the cache of the `Scene` spills results to disk, the `DataNode` does not hold its value, it is
+        read from the cache, hence loaded back from disk if needed. If the value is no longer available, the
+        `DataNode` is marked `Dirty`.
+
+        - Setter: store the value in this `DataNode`
+        """
+        if self._value is None and self.value_key is not None and self.cache_result:
+            value = self.scene.cache.get(self.value_key)
+            if value is None:
+                self.markDirty()
+            return value
+        return self._value
+
+    @value.setter
+    def value(self, value: Any):
+        self._value = value
+
     def initPropertiesWidget(self):
         """To be overridden, defines an attribute named properties_widget used in the properties toolbar"""
         raise NotImplementedError
@@ -122,29 +156,34 @@ class DataNode(Node):
         res = super().deserialize(data, hashmap, restore_id)
         # restore the node settings
         if data['node_settings'] != dict():
+            if data['node_settings'] != self.getNodeSettings():
+                # e.g. undo, the value is looked up in the cache of the scene on next evaluation
+                self.markDirty()
             res &= self.restoreNodeSettings(data)
-        print("Deserialize DataNode {}: res : {}".format(self.__class__.__name__, res))
+        self.print("deserialize : res : {}".format(res))
         return res
 
-    def forcedEval(self) -> Any:
+    def forcedEval(self):
         """Force evaluation of the current `DataNode`.
 
-        Returns
-        -------
-        Any
-
+        The `DataNode` and its descendants are evaluated by the
+        :class:`~node_editor.node_scene_evaluator.SceneEvaluator` of the `Scene`, each of them only once.
+        Parents which did not read the columns now required are evaluated again first.
 
+        Nothing is returned: when the evaluator is asynchronous, the evaluation is only scheduled and `value` is
+        updated once it completes, see :py:meth:`~data_node_base.DataNode.finishEval`.
         """
         self.markDirty(True)
-        return self.eval(force=True)
+        self.scene.evaluator.evalNodes([self] + self.getStaleParents(), force=True)
 
     def eval(self, force: bool = False) -> Any:
         """Evaluate this `Node`.
 
         Return cached value in case no change was detected. Evaluation can be forced by setting Force to ``True``.
         Otherwise, evaluate this `Node` by calling :py:meth:`~data_node_base.DataNode.evalImplementation`.
-        In case of ValueError, set the node and their children as dirty.
-        Any other error will set the node and their children as invalid
+        In case of ValueError, set the node as dirty.
+        Any other error will set the node as invalid.
+        Descendants are not evaluated here, see :py:meth:`~data_node_base.DataNode.forcedEval`
         Parameters
         ----------
         force: bool
@@ -161,55 +200,322 @@ class DataNode(Node):
             return self.value
 
         try:
-            # By default, undirty and valid the node
-            # self.markDirty(False)
-            # self.markInvalid(False)
             val = self.evalImplementation(force=force)
             return val
 
-        except ValueError as e:
-            self.markDirty()
-            self.setToolTip(str(e))
-            self.markDescendantDirty()
-
         except Exception as e:
-            self.markInvalid()
-            self.setToolTip(str(e))
-            dumpException(e)
+            self.failEval(e)
 
     def evalImplementation(self, force: bool = False):
         """Evaluation implementation of the current `DataNode`.
 
+        Runs the three steps of the evaluation one after the other in the current thread :
+            - :py:meth:`~data_node_base.DataNode.prepareEval` gathers the inputs and the node settings
+            - the returned job runs :py:meth:`~data_node_base.DataNode.evalOperation`
+            - :py:meth:`~data_node_base.DataNode.finishEval` stores the result and resets the states of the Node
 
-        Evaluation of the node usually implements the following steps :
-            - get values of the inputs
-            - handle errors :
-                - mark invalid and DescendantDirty
-                - set tooltip with error message
-            - reset the states of the Node : un-Dirty and Valid
-            - store the current evaluation in self.value
-            - reset tooltip
-            - markDescendantDirty(True) :py:meth:'~data_node_base.DataNode.markDescendantInvalid(False)'
-            - evaluate the children of the `Node`
-            - return current evaluation
+        Children are evaluated afterwards by the :class:`~node_editor.node_scene_evaluator.SceneEvaluator`.
 
         Returns
         -------
+        Any
+            current evaluation
+        """
+        job = self.prepareEval(force=force)
+        if job is None:
+            return self.value
+        return self.finishEval(job())
+
+    def getRequiredColumns(self) -> Optional[List[Any]]:
+        """Returns the columns of the input this `DataNode` reads, None if it needs all of them.
+
+        Used by the source nodes to read only the required columns. May be overridden.
+        """
+        return None
+
+    def getAvailableColumns(self) -> Optional[pd.Index]:
+        """Returns the columns the output of this `DataNode` can provide, by default the ones of the current
+        value. May be overridden, e.g. by source nodes reading only some of the columns of a file."""
+        value = self.value
+        return value.columns if isinstance(value, pd.DataFrame) else None
+
+    def isProjectionStale(self) -> bool:
+        """Returns ``True`` if the current value lacks columns now required by the children. May be overridden."""
+        return False
+
+    def getStaleParents(self) -> List['DataNode']:
+        """Returns the parents whose value lacks columns required by their children"""
+        return [node for node in self.getParentNodes() if isinstance(node, DataNode) and node.isProjectionStale()]
+
+    def getInputKeys(self) -> List[Optional[str]]:
+        """Returns the keys identifying the values of the `Nodes` connected to each input.
+
+        The key of an input is the one of the computation which produced its value, or the digest of its
+        content when the provenance of the value is unknown. The digest was computed in the worker thread along
+        with the value, it is never computed here.
+
+        Returns
+        -------
+        List[Optional[str]]
+            key of each input, None if it can not be identified
+        """
+        keys = []
+        for index in range(len(self.inputs)):
+            input_node = self.getInput(index)
+            key = getattr(input_node, 'value_key', None)
+            if key is None:
+                key = getattr(input_node, 'value_fingerprint', None)
+            keys.append(key)
+        return keys
+
+    def getCacheKey(self, input_keys: List[Optional[str]], settings: dict) -> Optional[str]:
+        """Returns the key under which the result of the evaluation is stored in the cache of the `Scene`.
+
+        Parameters
+        ----------
+        input_keys: List[Optional[str]]
+            keys of the inputs as returned by :py:meth:`~data_node_base.DataNode.getInputKeys`
+        settings: dict
+            node settings as returned by :py:meth:`~data_node_base.DataNode.getNodeSettings`
+
+        Returns
+        -------
+        Optional[str]
+            key of the result, None if one of the inputs can not be identified
+        """
+        if any(key is None for key in input_keys):
+            return None
+        return makeKey(self.__class__.getOpCode(), settings, input_keys)
+
+    def getInputValues(self) -> Optional[List[Any]]:
+        """Returns the values of the `Nodes` connected to each input.
+
+        In case an input is not connected or its value is None, mark this `Node` invalid, set the tooltip with
+        the error message and returns None.
+
+        Returns
+        -------
+        Optional[List[Any]]
+            value of each input, in the order of the inputs
+        """
+        values = []
+        for index in range(len(self.inputs)):
+            input_node = self.getInput(index)
+            if not input_node:
+                self.setToolTip('Input is not connected')
+                self.markInvalid()
+                return None
+
+            value = input_node.eval()
+            if value is None:
+                self.setToolTip('Input is NaN')
+                self.markInvalid()
+                return None
+            values.append(value)
+        return values
+
+    def onInputValues(self, inputs: List[Any]):
+        """To be overridden - update the properties widget according to the values of the inputs.
+
+        Called in the GUI thread, before the node settings are retrieved"""
+        pass
+
+    @classmethod
+    def evalOperation(cls, inputs: List[Any], settings: dict) -> Any:
+        """To be overridden - compute the output of the node.
+
+        The operation only depends on its arguments and must not access any widget, as it may be run outside
+        of the GUI thread.
+
+        Parameters
+        ----------
+        inputs: List[Any]
+            values of the inputs as returned by :py:meth:`~data_node_base.DataNode.getInputValues`
+        settings: dict
+            node settings as returned by :py:meth:`~data_node_base.DataNode.getNodeSettings`
 
+        Returns
+        -------
+        Any
+            output of the node
         """
         raise NotImplementedError
 
-    def onInputChanged(self, socket: 'Socket') -> Any:
-        """Event called when an `Edge` is connected to the inputs
+    @classmethod
+    def evalStream(cls, streams: List[Iterator[Any]], settings: dict, chunksize: int) -> Iterator[Any]:
+        """Compute the output of the node chunk by chunk, used by the streaming mode of
+        :class:`~node_editor.node_scene_runner.SceneRunner`. May be overridden.
+
+        By default, a `rowwise` operation is applied to each chunk of its single input as it arrives. Otherwise
+        the chunks of each input are gathered and :py:meth:`~data_node_base.DataNode.evalOperation` is called
+        once. Sources and aggregating operations override this method to read or combine the chunks.
 
         Parameters
         ----------
-        socket: 'Socket'
+        streams: List[Iterator[Any]]
+            chunks of each input, in the order of the inputs
+        settings: dict
+            node settings as returned by :py:meth:`~data_node_base.DataNode.getNodeSettings`
+        chunksize: int
+            number of rows of the chunks read by the sources
+
+        Returns
+        -------
+        Iterator[Any]
+            chunks of the output of the node
+        """
+        if cls.rowwise and len(streams) == 1:
+            for chunk in streams[0]:
+                yield cls.evalOperation([chunk], settings)
+        else:
+            yield cls.evalOperation([cls.gatherChunks(stream) for stream in streams], settings)
+
+    @staticmethod
+    def gatherChunks(stream: Iterable[Any]) -> Any:
+        """Returns the concatenation of the chunks of `stream`"""
+        chunks = list(stream)
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks)
+
+    def prepareEval(self, force: bool = False) -> Optional[Callable[[], Any]]:
+        """Gather everything the evaluation depends on. Called in the GUI thread.
+
+        Parameters
+        ----------
+        force: bool
+            ``True`` Force evaluation of this `Node`.
+
+        Unless the evaluation is forced, the result is looked up in the cache of the `Scene` first, in which case
+        there is nothing to compute. A result saved with the graph is not even read: the inputs are not gathered
+        and the result is read once the value is needed, see :py:meth:`~data_node_base.DataNode.restoreResult`.
+        Neither the key nor the fingerprint of the result are computed if `cache_result` is ``False``.
 
         Returns
         -------
+        Optional[Callable[[], Any]]
+            job computing the output of the node, or None if there is nothing to compute.
+        """
+        if self.cache_result and not force and self.scene.cache.hasSnapshots():
+            key = self.getCacheKey(self.getInputKeys(), self.getNodeSettings())
+            if self.scene.cache.isSnapshot(key):
+                self.restoreResult(key)
+                return None
+
+        inputs = self.getInputValues()
+        if inputs is None:
+            return None
+        self.onInputValues(inputs)
+        settings = self.getNodeSettings()
+
+        job = partial(self.__class__.evalOperation, inputs, settings)
+        if not self.cache_result:
+            self._pending_key = None
+            return job
+
+        key = self.getCacheKey(self.getInputKeys(), settings)
+        cached = None if force else self.scene.cache.get(key)
+        self._pending_key = key
+        if cached is not None:
+            self.print('result found in cache')
+            self.finishEval(cached)
+            return None
+        # the fingerprint of the result is computed in the worker thread as well
+        return self.scene.cache.fingerprintJob(key, job, self.getPreviousResult())
+
+    def finishEval(self, value: Any) -> Any:
+        """Store the result of the evaluation, un-Dirty and Valid the node. Called in the GUI thread.
+
+        Parameters
+        ----------
+        value: Any
+            result of the job returned by :py:meth:`~data_node_base.DataNode.prepareEval`
 
+        Returns
+        -------
+        Any
+            current evaluation
+        """
+        self.value = value
+        self.value_key, self._pending_key = self._pending_key, None
+        if self.cache_result:
+            self.value_fingerprint = self.scene.cache.getFingerprint(self.value_key, value)
+            self.scene.cache.put(self.value_key, value)
+            if self.scene.cache.isSpilling() and self.value_key in self.scene.cache:
+                # the cache owns the value, it may be written to disk once cold
+                self._value = None
+        else:
+            self.value_fingerprint = None
+        self.markDirty(False)
+        self.markInvalid(False)
+        self.setToolTip('')
+        return value
+
+    def restoreResult(self, key: str):
+        """Use the result saved with the graph under `key` as current evaluation, without reading it.
+
+        The value is read from the cache of the `Scene` on first access, see :py:attr:`~data_node_base.DataNode.value`
+
+        Parameters
+        ----------
+        key: str
+            key of the result
+        """
+        self.print('result restored from snapshot')
+        self._value = None
+        self.value_key, self._pending_key = key, None
+        self.value_fingerprint = self.scene.cache.getFingerprint(key, None)
+        self.markDirty(False)
+        self.markInvalid(False)
+        self.setToolTip('')
+
+    def getPreviousResult(self) -> Optional[tuple]:
+        """Returns the current value, if it is in memory, and its fingerprint, None if there is no fingerprint.
+
+        A new result is compared to it, see :py:meth:`~node_editor.node_scene_cache.ResultCache.fingerprintJob`
+        """
+        if self.value_fingerprint is None:
+            return None
+        value = self._value if self._value is not None else self.scene.cache.peek(self.value_key)
+        return value, self.value_fingerprint
+
+    def getResultKey(self) -> Optional[str]:
+        if not self.cache_result or self.isDirty() or self.isInvalid():
+            return None
+        return self.value_key
+
+    def failEval(self, exception: Exception):
+        """Handle an error raised during the evaluation.
+
+        In case of ValueError, set the node as dirty.
+        Any other error will set the node as invalid.
+
+        Parameters
+        ----------
+        exception: Exception
+        """
+        self._pending_key = None
+        if isinstance(exception, ValueError):
+            self.markDirty()
+            self.setToolTip(str(exception))
+        else:
+            self.markInvalid()
+            self.setToolTip(str(exception))
+            dumpException(exception)
+
+    def getOutputFingerprint(self) -> Optional[str]:
+        """Returns the digest of the content of the current value, None if it can not be computed"""
+        return self.value_fingerprint
+
+    def onInputChanged(self, socket: 'Socket'):
+        """Event called when an `Edge` is connected to the inputs, the `DataNode` is evaluated again.
+
+        As for :py:meth:`~data_node_base.DataNode.forcedEval`, the evaluation may only be scheduled.
+
+        Parameters
+        ----------
+        socket: 'Socket'
         """
         self.print(f'{self.__class__.__name__}::onInputChanged')
         self.markDirty()
-        return self.eval()
+        self.scene.evaluator.evalNodes([self] + self.getStaleParents())
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from PyQt5.QtCore import Qt, QIODevice, QDataStream
 from PyQt5.QtGui import QCloseEvent, QDropEvent, QDragEnterEvent, QPixmap, QContextMenuEvent, QIcon
 from PyQt5.QtWidgets import QGraphicsProxyWidget, QMenu, QAction
@@ -16,6 +18,17 @@ if TYPE_CHECKING:
 
 DEBUG = True
 DEBUG_CONTEXT = False
+# number of independent nodes evaluated concurrently, evaluation is sequential when lower than 2
+EVAL_MAX_WORKERS = min(4, os.cpu_count() or 1)
+# write the cold results to a temporary directory instead of keeping all of them in memory
+SPILL_RESULTS = True
+# save the results next to the graph, so that reopening it does not compute them again. Off by default, the
+# results are written to a directory of possibly large files next to the one of the graph
+SAVE_RESULTS = False
+# delay between two backups of the graph in ms, written next to its file, see node_editor.node_scene_autosave
+AUTOSAVE_INTERVAL = 60000
+# prefix of the name of the backup files
+AUTOSAVE_PREFIX = '.autosave-'
 
 
 class DataSubWindow(NodeEditorWidget):
@@ -30,7 +43,14 @@ class DataSubWindow(NodeEditorWidget):
         self.scene.addDragEnterListener(self.onDragEnter)
         self.scene.addDropListener(self.onDrop)
         self.scene.setNodeClassSelector(self.getNodeClassFromData)
+        self.scene.evaluator.setMaxWorkers(EVAL_MAX_WORKERS)
+        # evaluate in the background so that long computations do not freeze the editor
+        self.scene.evaluator.setAsynchronous(True)
+        if SPILL_RESULTS:
+            self.scene.cache.setSpillDirectory()
+        self.scene.save_results = SAVE_RESULTS
         self._close_event_listeners = []
+        self.startAutosave()
 
     def initNewNodeActions(self):
         """Instantiates """
@@ -61,12 +81,8 @@ class DataSubWindow(NodeEditorWidget):
         self.doEvalOutputs()
 
     def doEvalOutputs(self):
-        # eval all output nodes
-        # TODO Fix eval output
-        # TODO implement NetWorkX
-        for node in self.scene.nodes:
-            if node.__class__.__name__ == 'CalcNodeOutput':
-                node.eval()
+        # eval all dirty nodes and their descendants, each of them once in topological order
+        self.scene.evaluator.evalDirtyNodes()
 
     def getNodeClassFromData(self, data):
         if 'op_code' not in data:
@@ -75,10 +91,29 @@ class DataSubWindow(NodeEditorWidget):
 
     def fileLoad(self, filename: str) -> bool:
         if super().fileLoad(filename):
+            self.startAutosave()
             self.doEvalOutputs()
             return True
         return False
 
+    def fileSave(self, filename=None):
+        if super().fileSave(filename):
+            # the backup is out of date
+            self.scene.autosave.discard()
+            self.startAutosave()
+            return True
+        return False
+
+    def getAutosavePath(self) -> str:
+        """Returns the path of the backup file, next to the file of the graph and in the same format"""
+        if self.isFilenameSet():
+            return os.path.join(os.path.dirname(self.filename), AUTOSAVE_PREFIX + os.path.basename(self.filename))
+        return os.path.join(tempfile.gettempdir(), f'{AUTOSAVE_PREFIX}untitled-{os.getpid()}-{id(self)}.json')
+
+    def startAutosave(self):
+        if AUTOSAVE_INTERVAL:
+            self.scene.autosave.start(self.getAutosavePath(), AUTOSAVE_INTERVAL)
+
     def setTitle(self):
         self.setWindowTitle(self.getUserFriendlyFilename())
 
@@ -88,6 +123,10 @@ class DataSubWindow(NodeEditorWidget):
     def closeEvent(self, event):
         for callback in self._close_event_listeners:
             callback(self, event)
+        if event.isAccepted():
+            self.scene.evaluator.shutdown()
+            self.scene.cache.close()
+            self.scene.autosave.close()
 
     def onDragEnter(self, event: QDragEnterEvent):
         if event.mimeData().hasFormat(LISTBOX_MIMETYPE):
@@ -203,8 +242,8 @@ class DataSubWindow(NodeEditorWidget):
         elif selected and action == markDirtyDescendant:
             selected.markDescendantDirty(True)
         elif selected and action == evalAct:
-            val = selected.eval()
-            if DEBUG_CONTEXT: print(val)
+            self.scene.evaluator.evalNodes([selected])
+            if DEBUG_CONTEXT: print(selected.value)
 
     def determine_target_socket_of_node(self, was_dragged_flag, new_calc_node):
         target_socket = None
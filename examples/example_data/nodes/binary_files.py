@@ -0,0 +1,240 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFrame, QFileDialog
+from PyQt5.QtGui import QIcon
+import os
+import numpy as np
+import pandas as pd
+
+from ..data_node_base import DataNode
+from ..data_node_graphics_base import OpGraphicsNode
+from ..data_conf import NodeFactory
+from .files import HAS_PYARROW
+from typing import Any, List, Optional
+
+if HAS_PYARROW:
+    import pyarrow
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as parquet
+
+DEBUG = False
+
+
+class OpNode_BinaryFileSource(DataNode):
+    """Base class of the source nodes reading a columnar binary file through memory mapping.
+
+    Only the columns required by the children are read, see
+    :py:meth:`~data_node_base.DataNode.getRequiredColumns`. The columns available in the file are read from its
+    metadata, without loading the data.
+    """
+    icon = 'icons/computer-folder-open-64.svg'
+    op_title = 'Binary file'
+    content_label = ''
+    content_label_objname = 'data_node_file_read'
+
+    GraphicsNode_class = OpGraphicsNode
+    NodeContent_class = None
+
+    file_filter = 'All files (*)'
+
+    def __init__(self, scene):
+        super().__init__(scene, inputs=[], outputs=[1])
+        self.filepath = ''
+        # columns read from the file, None if all of them
+        self.loaded_columns = None
+        # (signature of the file, columns available in the file)
+        self._available_columns = (None, None)
+
+    def initPropertiesWidget(self):
+        """Initialize the layout of properties DockWidget"""
+        self.propertiesWidget = QWidget()
+
+        layout = QHBoxLayout()
+        self._path_text = QLineEdit()
+        self._path_text.setReadOnly(True)  # set to read only, it is modified only by selecting a path
+        self._open_file_button = QPushButton()
+        self._open_file_button.setIcon(QIcon(self.icon))
+        self._open_file_button.clicked.connect(self.openFileDialog)
+        layout.addWidget(QLabel('File : '))
+        layout.addWidget(self._path_text)
+        layout.addWidget(self._open_file_button)
+
+        import_frame = QFrame()
+        import_frame.setFrameShape(QFrame.StyledPanel)
+        import_frame.setLayout(layout)
+
+        outer_layout = QVBoxLayout()
+        outer_layout.addStretch()
+        outer_layout.addWidget(import_frame)
+        outer_layout.addStretch()
+        self.propertiesWidget.setLayout(outer_layout)
+
+    def openFileDialog(self):
+        subWnd = self.scene.getView().parent()
+        mainWnd = subWnd.getMainWindow()
+
+        fname, fileFilter = QFileDialog.getOpenFileName(mainWnd, 'Open file', '', self.file_filter)
+        self.print('Filename selected :', fname)
+        if fname == '':
+            return
+        self.filepath = fname
+        self._path_text.setText(self.filepath)
+        self.forcedEval()
+
+    def getNodeSettings(self) -> dict:
+        return {'filepath': self.filepath, 'columns': self.getProjection()}
+
+    def restoreNodeSettings(self, data: dict) -> bool:
+        self.filepath = data['node_settings']['filepath']
+        self._path_text.setText(self.filepath)
+        return True
+
+    def getAvailableColumns(self) -> Optional[pd.Index]:
+        """Returns the columns of the file, read from its metadata"""
+        if self.filepath == '' or not os.path.exists(self.filepath):
+            return None
+        signature = os.path.getmtime(self.filepath)
+        if self._available_columns[0] != signature:
+            self._available_columns = (signature, pd.Index(self.readColumns(self.filepath)))
+        return self._available_columns[1]
+
+    def getProjection(self) -> Optional[List[Any]]:
+        """Returns the columns required by the children, in the order of the file. None if all of them are"""
+        children = self.getChildrenNodes()
+        required = set()
+        for child in children:
+            columns = child.getRequiredColumns() if isinstance(child, DataNode) else None
+            if columns is None:
+                return None
+            required.update(columns)
+
+        available = self.getAvailableColumns()
+        if not children or available is None:
+            return None
+        return [column for column in available if column in required]
+
+    def isProjectionStale(self) -> bool:
+        if self.value is None or self.loaded_columns is None:
+            return False
+        projection = self.getProjection()
+        return projection is None or not set(projection).issubset(self.loaded_columns)
+
+    def prepareEval(self, force=False):
+        if self.filepath == '':
+            return None
+        return super().prepareEval(force)
+
+    def getCacheKey(self, input_keys, settings):
+        # the content of the file may have changed since it was cached
+        settings = dict(settings, last_modified=os.path.getmtime(self.filepath))
+        return super().getCacheKey(input_keys, settings)
+
+    @classmethod
+    def readColumns(cls, filepath: str) -> List[Any]:
+        """To be overridden - returns the columns of the file"""
+        raise NotImplementedError
+
+    @classmethod
+    def readFile(cls, filepath: str, columns: Optional[List[Any]]) -> pd.DataFrame:
+        """To be overridden - read `columns` of the file, all of them if None"""
+        raise NotImplementedError
+
+    @classmethod
+    def iterFile(cls, filepath: str, columns: Optional[List[Any]], chunksize: int):
+        """Read `columns` of the file chunk by chunk. May be overridden, by default the file is read at once"""
+        yield cls.readFile(filepath, columns)
+
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        return cls.readFile(settings['filepath'], settings.get('columns'))
+
+    @classmethod
+    def evalStream(cls, streams, settings, chunksize):
+        yield from cls.iterFile(settings['filepath'], settings.get('columns'), chunksize)
+
+    def finishEval(self, value):
+        # keep track of the projection the value was read with
+        self.loaded_columns = self.getNodeSettings()['columns']
+        return super().finishEval(value)
+
+
+if HAS_PYARROW:
+    @NodeFactory.register()
+    class OpNode_ReadParquetFile(OpNode_BinaryFileSource):
+        op_title = 'Parquet file'
+        file_filter = 'Parquet (*.parquet *.pq);;All files (*)'
+
+        @classmethod
+        def readColumns(cls, filepath):
+            schema = parquet.read_schema(filepath, memory_map=True)
+            # index stored by pandas
+            return [name for name in schema.names if not name.startswith('__index_level_')]
+
+        @classmethod
+        def readFile(cls, filepath, columns):
+            return pd.read_parquet(filepath, engine='pyarrow', columns=columns, memory_map=True)
+
+        @classmethod
+        def iterFile(cls, filepath, columns, chunksize):
+            file = parquet.ParquetFile(filepath, memory_map=True)
+            for batch in file.iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+
+    @NodeFactory.register()
+    class OpNode_ReadFeatherFile(OpNode_BinaryFileSource):
+        op_title = 'Feather file'
+        file_filter = 'Feather (*.feather *.arrow);;All files (*)'
+
+        @classmethod
+        def readColumns(cls, filepath):
+            with pyarrow.memory_map(filepath) as source:
+                schema = ipc.open_file(source).schema
+            return [name for name in schema.names if not name.startswith('__index_level_')]
+
+        @classmethod
+        def readFile(cls, filepath, columns):
+            # uncompressed files are mapped without copy until the conversion to pandas
+            return feather.read_table(filepath, columns=columns, memory_map=True).to_pandas()
+
+        @classmethod
+        def iterFile(cls, filepath, columns, chunksize):
+            table = feather.read_table(filepath, columns=columns, memory_map=True)
+            for batch in table.to_batches(max_chunksize=chunksize):
+                yield batch.to_pandas()
+
+
+@NodeFactory.register()
+class OpNode_ReadNpyFile(OpNode_BinaryFileSource):
+    """Read a NumPy .npy file. Fields of a structured array are the columns, otherwise the columns of a 2D array"""
+    op_title = 'NumPy file'
+    file_filter = 'NumPy (*.npy);;All files (*)'
+
+    @classmethod
+    def readColumns(cls, filepath):
+        array = np.load(filepath, mmap_mode='r')
+        if array.dtype.names is not None:
+            return list(array.dtype.names)
+        return list(range(array.shape[1])) if array.ndim == 2 else [0]
+
+    @classmethod
+    def toFrame(cls, array: np.ndarray, columns: Optional[List[Any]]) -> pd.DataFrame:
+        """Returns the `columns` of `array` as a DataFrame, only these columns are copied from the mapped file"""
+        if array.dtype.names is not None:
+            names = list(array.dtype.names) if columns is None else columns
+            return pd.DataFrame({name: np.asarray(array[name]) for name in names}, columns=names)
+        if array.ndim == 1:
+            array = array.reshape(-1, 1)
+        if columns is None:
+            return pd.DataFrame(np.asarray(array))
+        return pd.DataFrame(np.asarray(array[:, columns]), columns=columns)
+
+    @classmethod
+    def readFile(cls, filepath, columns):
+        return cls.toFrame(np.load(filepath, mmap_mode='r'), columns)
+
+    @classmethod
+    def iterFile(cls, filepath, columns, chunksize):
+        array = np.load(filepath, mmap_mode='r')
+        for start in range(0, len(array), chunksize):
+            chunk = cls.toFrame(array[start:start + chunksize], columns)
+            chunk.index += start
+            yield chunk
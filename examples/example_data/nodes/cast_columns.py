@@ -8,7 +8,20 @@ from ..data_conf import NodeFactory
 from .cast_columns_utils import TYPE_OPTIONS, ComboDelegate, TypeChooserModel
 
 from node_editor.utils import dumpException
-from typing import Union
+from typing import Union, Any
+
+# conversion of the type names displayed in the type table
+TYPE_CONVERTERS = {'str': str, 'int': int, 'float': float, 'bool': bool}
+
+
+def _column_key(column: Any) -> Any:
+    """Helper function - column names of MultiIndex are restored as list from json, convert them back to tuple"""
+    return tuple(column) if isinstance(column, list) else column
+
+
+def _serializable_key(column: Any) -> Any:
+    """Helper function - convert numpy scalars column names to python ones so that they can be serialized"""
+    return column.item() if isinstance(column, np.generic) else column
 
 
 @NodeFactory.register()
@@ -19,6 +32,7 @@ class OpNode_CastColumns(DataNode):
     content_label_objname = 'data_node_cast_columns'
 
     GraphicsNode_class = OpGraphicsNode
+    rowwise = True
 
     def __init__(self, scene):
         self.columnsDtype: Union[pd.Series, None] = None
@@ -75,6 +89,11 @@ class OpNode_CastColumns(DataNode):
             dtypes = dtypes.str.extract('(' + '|'.join(TYPE_OPTIONS) + ')', expand=False)
             dtypes = dtypes.replace(np.nan, 'str')
             model = self.columnTypeTable.model()
+            # keep the types already chosen for the columns which are still present
+            previous = model.dataframe
+            if previous is not None and len(previous) > 0:
+                common = dtypes.index.intersection(previous.index)
+                dtypes.loc[common] = previous.loc[common]
             model.dataframe = dtypes
             self.columnTypeTable.setColumnWidth(0, 80)
 
@@ -91,54 +110,42 @@ class OpNode_CastColumns(DataNode):
         Is called upon chnage of value in properties dock widget"""
         self.forcedEval()
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-
-        # get first input
-        input_node: Union[DataNode, None] = self.getInput(0)
-        if not input_node:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        self.input_val = input_node.eval()
-        if isinstance(self.input_val, pd.DataFrame):
-            new_columns_dtype = self.input_val.dtypes
+    def onInputValues(self, inputs):
+        """Update the type table in case the columns of the input table changed"""
+        if isinstance(inputs[0], pd.DataFrame):
+            new_columns_dtype = inputs[0].dtypes
         else:
-            self.columnsDtype = None
             new_columns_dtype = None
 
         # Compare if new columns are the same as the old one
-        if self.columnsDtype is None or not (self.columnsDtype.index.equals(new_columns_dtype.index)):
+        if self.columnsDtype is None or new_columns_dtype is None or \
+                not (self.columnsDtype.index.equals(new_columns_dtype.index)):
             # Update the properties toolbar accordingly
             self.columnsDtype = new_columns_dtype
             self.updatePropertiesWidget()
 
-        if self.columnsDtype is None:
-            self.setToolTip('Input is NaN')
-            self.markInvalid()
-            return
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        input_val = inputs[0]
+        if not isinstance(input_val, pd.DataFrame):
+            raise TypeError('Input is not a table')
 
         # Change column datatype to the one selected from table
-        dtypes = self.columnTypeTable.model().dataframe
         # convert string values for the corresponding type
-        dtypes = dtypes.apply(eval)
-        self.value = self.input_val.astype(dtypes, errors='ignore')
-        print(self.value.dtypes == self.columnsDtype)
-        print(self.value.dtypes, self.columnsDtype)
+        dtypes = {_column_key(column): TYPE_CONVERTERS[dtype] for column, dtype in settings.get('dtypes', [])}
         # TODO handle failure
-        # TODO serialize / deserialize
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
+        return input_val.astype(dtypes, errors='ignore')
 
-        self.setToolTip('')
-
-        self.evalChildren()
-
-        return self.value
+    def getNodeSettings(self) -> dict:
+        dtypes = self.columnTypeTable.model().dataframe
+        if dtypes is None:
+            return {'dtypes': []}
+        return {'dtypes': [[_serializable_key(column), dtype] for column, dtype in dtypes.items()]}
+
+    def restoreNodeSettings(self, data: dict) -> bool:
+        kwargs = data['node_settings']
+        if kwargs.get('dtypes'):
+            index = [_column_key(column) for column, _ in kwargs['dtypes']]
+            values = [dtype for _, dtype in kwargs['dtypes']]
+            self.columnTypeTable.model().dataframe = pd.Series(values, index=index, name='Type', dtype='O')
+        return True
@@ -5,7 +5,7 @@ import os
 import pandas as pd
 import csv
 
-from typing import Any, List
+from typing import Any, List, Optional
 
 # TODO implement read_csv file
 # TODO Automatic discover for different modules ?
@@ -14,7 +14,15 @@ from ..data_node_base import DataNode
 from ..data_node_graphics_base import OpGraphicsNode
 from ..data_conf import *
 
+try:
+    import pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 DEBUG = False
+# number of rows read to infer the type of the columns
+SCHEMA_SAMPLE_ROWS = 1000
 
 
 @NodeFactory.register()
@@ -31,7 +39,8 @@ class OpNode_ReadCSVFile(DataNode):
 
         super().__init__(scene, inputs=[], outputs=[1])
         self.filepath = ''
-        self.file_last_modified = None
+        # type of the columns of the file, see getSchema
+        self.schema = None
 
     def _file_UI(self) -> QLayout:
         outer_layout = QVBoxLayout()
@@ -56,9 +65,19 @@ class OpNode_ReadCSVFile(DataNode):
         self._combo_encoding.addItems(['utf-8', 'latin-1'])
         self._combo_encoding.setToolTip('Encoding defines the way a text file is encoded into bytes.'
                                         'US files are usually in utf-8, european files in latin-1')
-        self._combo_encoding.currentIndexChanged.connect(self.forcedEval)
+        self._combo_encoding.currentIndexChanged.connect(self.onOptionsChanged)
         layout.addWidget(self._combo_encoding)
         outer_layout.addLayout(layout)
+
+        # Layout parser engine
+        layout = QHBoxLayout()
+        layout.addWidget(QLabel('Engine :'))
+        self._combo_engine = QComboBox()
+        self._combo_engine.addItems(['c', 'pyarrow'] if HAS_PYARROW else ['c'])
+        self._combo_engine.setToolTip('Parser used to read the file. pyarrow is multithreaded, faster on large files')
+        self._combo_engine.currentIndexChanged.connect(self.forcedEval)
+        layout.addWidget(self._combo_engine)
+        outer_layout.addLayout(layout)
         return outer_layout
 
     def _idx_UI(self):
@@ -200,7 +219,7 @@ class OpNode_ReadCSVFile(DataNode):
         self._hdr_list.addItem(new_item)
         self._hdr_list.setCurrentRow(self._hdr_list.count() - 1)
         self._hdr_spinbox.setValue(value + 1)
-        self.forcedEval()
+        self.onOptionsChanged()
 
     def onHdrRemBtnClicked(self):
         # remove from list
@@ -208,7 +227,7 @@ class OpNode_ReadCSVFile(DataNode):
         if row != -1:
             value = int(self._hdr_list.takeItem(row).text())
             self._hdr_spinbox.setValue(value)
-            self.forcedEval()
+            self.onOptionsChanged()
 
     def openFileDialog(self):
         subWnd = self.scene.getView().parent()
@@ -224,6 +243,11 @@ class OpNode_ReadCSVFile(DataNode):
 
         # TODO Probably trigger history stamp event
         # force the evaluation of the node
+        self.onOptionsChanged()
+
+    def onOptionsChanged(self):
+        """The columns may differ, the schema is inferred again"""
+        self.schema = None
         self.forcedEval()
 
     def getNodeSettings(self) -> dict:
@@ -251,60 +275,139 @@ class OpNode_ReadCSVFile(DataNode):
         # file_path
         kwargs['filepath_or_buffer'] = self.filepath
 
+        # parser options, not passed as is to read_csv
+        kwargs['engine'] = self._combo_engine.currentText()
+        kwargs['schema'] = self.schema
+
         return kwargs
 
     def restoreNodeSettings(self, data: dict) -> bool:
         kwargs = data['node_settings']
         # restore file_path
-        self._path_text.setText(kwargs['filepath_or_buffer'])
-        # restore options
-        index = self._combo_encoding.findText(kwargs['encoding'], Qt.MatchFixedString)
-        if index > 0:
-            self._combo_encoding.setCurrentIndex(index)
-        if kwargs['index_col']:
-            for value in kwargs['index_col']:
+        self.filepath = kwargs['filepath_or_buffer']
+        self._path_text.setText(self.filepath)
+        # restore options, without triggering an evaluation
+        for combo, text in ((self._combo_encoding, kwargs['encoding']), (self._combo_engine, kwargs.get('engine', 'c'))):
+            index = combo.findText(text, Qt.MatchFixedString)
+            if index >= 0:
+                combo.blockSignals(True)
+                combo.setCurrentIndex(index)
+                combo.blockSignals(False)
+        # the lists are filled again when the node is restored by undo or redo
+        for list_widget, values in ((self._idx_list, kwargs['index_col']), (self._hdr_list, kwargs['header'])):
+            list_widget.clear()
+            for value in values or []:
                 new_item = QListWidgetItem()
                 new_item.setText(str(value))
-                self._idx_list.addItem(new_item)
+                list_widget.addItem(new_item)
+        self.schema = kwargs.get('schema')
 
         return True
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-        kwargs = self.getNodeSettings()
-        print(kwargs)
-
-        if self.filepath != '':
-            # store the last modified time of the file
-            if not self.file_last_modified:
-                self.file_last_modified = os.path.getmtime(self.filepath)
-
-            elif self.file_last_modified == os.path.getmtime(self.filepath) and not force:
-                # the file has already been loaded, simply return the values stored
-                return self.value
-
-            with open(self.filepath) as f:
-                # automatically detect delimiters
-                dialect = csv.Sniffer().sniff(f.read(4096), delimiters=';, \t')
-
-            # load csv file
-            data_frame = pd.read_csv(dialect=dialect, **kwargs)
-            # by default cast some column to numeric type if possible
-            data_frame = data_frame.apply(pd.to_numeric, errors='ignore')
-            self.value = data_frame
-
-            self.markDirty(False)
-            self.markInvalid(False)
-
-            self.markDescendantInvalid(False)
-            self.markDescendantDirty()
-
-            self.setToolTip('')
-
-            self.evalChildren()
-
-        return self.value
+    def prepareEval(self, force=False):
+        self.print('prepareEval')
+        if self.filepath == '':
+            return None
+        # an unchanged file is not read again: the modification time is part of the key of the cached result
+        return super().prepareEval(force)
+
+    def getCacheKey(self, input_keys, settings):
+        # the content of the file may have changed since it was cached
+        settings = dict(settings, last_modified=os.path.getmtime(self.filepath))
+        # the schema is derived from the file, it does not change the result
+        settings.pop('schema', None)
+        return super().getCacheKey(input_keys, settings)
+
+    @staticmethod
+    def getFileSignature(filepath: str) -> List[float]:
+        """Returns the modification time and the size of the file, identifying the content a schema applies to"""
+        return [os.path.getmtime(filepath), os.path.getsize(filepath)]
+
+    @classmethod
+    def getReaderArguments(cls, settings: dict) -> dict:
+        """Returns the arguments of read_csv from the node settings, including the delimiter of the file"""
+        kwargs = dict(settings)
+        kwargs.pop('schema', None)
+        with open(kwargs['filepath_or_buffer'], encoding=kwargs['encoding']) as f:
+            # automatically detect delimiters
+            dialect = csv.Sniffer().sniff(f.read(4096), delimiters=';, \t')
+        if kwargs.get('engine') == 'pyarrow':
+            # pyarrow does not support dialects
+            kwargs['sep'] = dialect.delimiter
+        else:
+            kwargs['dialect'] = dialect
+        return kwargs
 
+    @classmethod
+    def hasValidSchema(cls, settings: dict) -> bool:
+        """Returns ``True`` if the schema stored in the settings was inferred from the current content of the file"""
+        schema = settings.get('schema')
+        return bool(schema) and schema['source'] == cls.getFileSignature(settings['filepath_or_buffer'])
+
+    @classmethod
+    def getSchema(cls, settings: dict, kwargs: dict) -> Optional[dict]:
+        """Returns the type of each column, given to the parser instead of converting the columns afterwards.
+
+        The schema stored in the settings is used if it was inferred from the current content of the file,
+        otherwise the types are inferred from the first SCHEMA_SAMPLE_ROWS rows.
+
+        Parameters
+        ----------
+        settings: dict
+            node settings
+        kwargs: dict
+            arguments of read_csv as returned by getReaderArguments
+
+        Returns
+        -------
+        Optional[dict]
+            dictionary column -> dtype, None if the columns span several header rows
+        """
+        if cls.hasValidSchema(settings):
+            return {column: dtype for column, dtype in settings['schema']['dtypes']}
+
+        header = kwargs.get('header')
+        if header is not None and len(header) > 1:
+            return None
+        sample_kwargs = dict(kwargs, engine='c', index_col=None, nrows=SCHEMA_SAMPLE_ROWS)
+        sample = pd.read_csv(**sample_kwargs)
+        return {column: dtype.name for column, dtype in sample.dtypes.items()}
+
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        kwargs = cls.getReaderArguments(settings)
+        dtype = cls.getSchema(settings, kwargs)
+        try:
+            return pd.read_csv(dtype=dtype, **kwargs)
+        except (ValueError, TypeError):
+            if dtype is None:
+                raise
+            # the sample is not representative, e.g. missing values in a column of integers
+            return pd.read_csv(**kwargs)
+
+    @classmethod
+    def evalStream(cls, streams, settings, chunksize):
+        kwargs = dict(cls.getReaderArguments(dict(settings, engine='c')), chunksize=chunksize)
+        dtype = cls.getSchema(settings, kwargs)
+        if dtype is not None and not cls.hasValidSchema(settings):
+            # inferred from a sample, allow missing values in the following chunks
+            dtype = {column: 'float64' if value.startswith(('int', 'uint')) else
+                     'object' if value == 'bool' else value for column, value in dtype.items()}
+
+        # only one chunk of the file is held in memory at once, all of them with the same types
+        with pd.read_csv(dtype=dtype, **kwargs) as reader:
+            for data_frame in reader:
+                yield data_frame
+
+    def finishEval(self, value):
+        header = self.getNodeSettings()['header']
+        if isinstance(value, pd.DataFrame) and (header is None or len(header) == 1):
+            # types of the whole file, the next loads skip the inference
+            schema = {'source': self.getFileSignature(self.filepath),
+                      'dtypes': [[column, dtype.name] for column, dtype in value.dtypes.items()]}
+            # saved with the node settings on the next save, an evaluation is not an edit recorded by the history
+            self.schema = schema
+        return super().finishEval(value)
 
     # def serialize(self):
     #     # Additionally store the file path
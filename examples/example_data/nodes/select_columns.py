@@ -5,7 +5,7 @@ from ..data_conf import *
 from ..data_node_base import *
 from ..data_node_graphics_base import OpGraphicsNode
 from .node_widgets import TreeWidgetUI
-from typing import TYPE_CHECKING, Union, List, Tuple, Any
+from typing import TYPE_CHECKING, Union, List, Tuple, Any, Optional
 
 if TYPE_CHECKING:
     from node_editor.node_node import Node
@@ -23,6 +23,7 @@ class DataNode_SelectColumns(DataNode):
 
     # NodeContent_class = DataTableContent
     GraphicsNode_class = OpGraphicsNode
+    rowwise = True
 
     def __init__(self, scene):
         self.columns = None
@@ -40,9 +41,27 @@ class DataNode_SelectColumns(DataNode):
         self.propertiesWidget.setLayout(layout)
 
     def updatePropertiesWidget(self):
-        """Populate `listWidget` with values from input dataframe columns"""
+        """Populate `listWidget` with values from input dataframe columns, keeping the columns previously
+        unchecked"""
         if self.columns is not None:
-            self.treeWidget.initModel(self.columns)
+            previous = {self._itemColumn(item): item[-1] for item in self.treeWidget.getItems(selected_only=False)}
+            items = [(*column, previous.get(column, True)) if isinstance(column, tuple) else
+                     (column, previous.get(column, True)) for column in self.columns]
+            # same ordering as the tree, sorted by level values
+            items.sort(key=lambda item: item[:-1])
+            self.treeWidget.initModel(items, include_checked=True)
+
+    @staticmethod
+    def _itemColumn(item: Tuple) -> Union[Tuple, Any]:
+        """Returns the column of an item of the tree, of the form (*levels, value, checked)"""
+        return tuple(item[:-1]) if len(item) > 2 else item[0]
+
+    def getRequiredColumns(self) -> Optional[List[Union[Tuple, Any]]]:
+        """Only the checked columns are read from the input, None until the tree is populated"""
+        items = self.treeWidget.getItems(selected_only=False)
+        if not items:
+            return None
+        return [self._itemColumn(item) for item in items if item[-1]]
 
     def getColumnSelection(self) -> List[Union[Tuple, Any]]:
         """Returns a list of checked columns
@@ -54,54 +73,47 @@ class DataNode_SelectColumns(DataNode):
         """
         return self.treeWidget.getItems()
 
-    def evalImplementation(self, force: bool = False):
-        self.print('evalImplementation')
-
-        # get first input
-        input_node = self.getInput(0)
-        if not input_node:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        self.input_val = input_node.eval()
-        if isinstance(self.input_val, pd.DataFrame):
-            new_columns = self.input_val.columns
-        else:
-            self.columns = None
-            new_columns = None
+    def onInputValues(self, inputs):
+        """Update the tree widget in case the columns of the input table changed"""
+        # all the columns the input can provide, not only the ones read for this node
+        new_columns = self.getInput(0).getAvailableColumns()
+        if new_columns is None and isinstance(inputs[0], pd.DataFrame):
+            new_columns = inputs[0].columns
 
         # Compare if new columns are the same as the old one
-        if self.columns is None or not (self.columns.equals(new_columns)):
+        if self.columns is None or new_columns is None or not (self.columns.equals(new_columns)):
             # Update the properties toolbar accordingly
             self.columns = new_columns
             self.updatePropertiesWidget()
 
-        if self.columns is None:
-            self.setToolTip('Input is NaN')
-            self.markInvalid()
-            return
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        input_val = inputs[0]
+        if not isinstance(input_val, pd.DataFrame):
+            raise TypeError('Input is not a table')
 
         # Store the table with only the selected columns
-        column_selection = self.getColumnSelection()
+        column_selection = cls.getColumnSelectionFromSettings(settings)
         if column_selection:
-            self.value = self.input_val[column_selection]
+            return input_val[column_selection]
         else:
-            self.value = pd.DataFrame()
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
+            return pd.DataFrame()
 
-        self.setToolTip('')
+    @staticmethod
+    def getColumnSelectionFromSettings(settings: dict) -> List[Union[Tuple, Any]]:
+        """Returns the list of checked columns stored in the node settings
 
-        self.evalChildren()
+        Parameters
+        ----------
+        settings: dict
+            node settings as returned by getNodeSettings, each item is of the form (*levels, value, checked)
 
-        return self.value
+        Returns
+        -------
+        list[Union[tuple, Any]]
+            list of checked column name
+        """
+        return [DataNode_SelectColumns._itemColumn(item) for item in settings['items'] if item[-1]]
 
     def getNodeSettings(self) -> dict:
         return {'items': self.treeWidget.getItems(selected_only=False)}
@@ -47,13 +47,8 @@ class DataTableContent(NodeContentWidget):
     # def setDataFrame(self, dataframe: pd.DataFrame):
     #     self.view.setDataFrame(dataframe, )
     def updateContent(self, value):
-        self.view.hide()  # old widget remained visible otherwise
-        # Remove and reassign new DataFrameView
-        self.layout.removeWidget(self.view)
-        view = DataFrameView(dataframe=value, parent=self)
-        view.setObjectName(self.node.content_label_objname)
-        self.view = view
-        self.layout.addWidget(self.view)
+        # the models of the view are updated in place
+        self.view.setDataFrame(value)
 
     @property
     def dataframe(self):
@@ -74,6 +69,9 @@ class DataNode_Table(DataNode):
 
     NodeContent_class = DataTableContent
     GraphicsNode_class = VizGraphicsNode
+    # the value is the one of the input, already cached
+    cache_result = False
+    rowwise = True
 
     def __init__(self, scene):
         super().__init__(scene, inputs=[1], outputs=[1])
@@ -84,55 +82,48 @@ class DataNode_Table(DataNode):
         self.width = 320
         self.grNode.updateLayout()
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-
-        # get first input
-        input_node: Node = self.getInput(0)
-        if not input_node:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        val = input_node.eval()
-        if val is None:
-            self.setToolTip('Input is NaN')
-            self.markInvalid()
-            return
-
-        self.value = val
-        # self.content.setDataFrame(self.value)
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        # the table simply displays its input
+        return inputs[0]
+
+    def finishEval(self, value):
+        super().finishEval(value)
+        # the value is the one of the input, so are its key and its fingerprint
+        input_node = self.getInput(0)
+        self.value_key = getattr(input_node, 'value_key', None)
+        self.value_fingerprint = getattr(input_node, 'value_fingerprint', None)
+        # update the displayed table in the GUI thread
         self.content.updateContent(self.value)
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
-
-        self.setToolTip('')
-
-        self.evalChildren()
-
         # output of the node
         return self.value
 
     def onDoubleClicked(self, event):
-        """Event handling double click on Graphics Node in `Scene`"""
+        """Event handling double click on Graphics Node in `Scene`
+
+        Opens a larger view of the table, sharing the model of the node content: neither the dataframe nor its
+        formatted cells are copied.
+        """
         try:
             flags = Qt.WindowMaximizeButtonHint
             flags |= Qt.WindowCloseButtonHint
             # flags |= Qt.WindowMinimizeButtonHint
 
             wnd = QDialog(flags=flags)
+            wnd.setWindowTitle(self.title)
             layout = QVBoxLayout()
-            layout.addWidget(self.content.view.copy())
+            layout.addWidget(self.createPreview(wnd))
             wnd.setLayout(layout)
             wnd.exec_()
         except Exception as e:
             dumpException(e)
 
+    def createPreview(self, parent: 'QWidget' = None) -> DataFrameView:
+        """Returns a new `DataFrameView` sharing the model of the node content"""
+        view = DataFrameView(parent=parent, model=self.content.view.dataView.model())
+        view.setObjectName(self.content_label_objname)
+        return view
+
 
 @NodeFactory.register()
 class DataNode_EditableTable(DataNode):
@@ -158,12 +149,9 @@ class DataNode_EditableTable(DataNode):
     def getDataFrame(self):
         return self.content.view.getDataFrame()
 
-    def evalImplementation(self):
-        # Get current content
-        self.value = self.getDataFrame()
-        self.markDirty(False)
-        self.markInvalid(False)
-        self.setToolTip('')
-
-        self.evalChildren()
-        return self.value
+    def prepareEval(self, force=False):
+        # Get current content, it is read from the widget hence in the GUI thread
+        dataframe = self.getDataFrame()
+        self._pending_key = None
+        # its fingerprint, identifying it for the children, is computed in the worker thread
+        return self.scene.cache.fingerprintJob(None, lambda: dataframe, self.getPreviousResult())
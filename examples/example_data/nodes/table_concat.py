@@ -16,41 +16,12 @@ class OpNode_ConcatTable(DataNode):
     def __init__(self, scene):
         super().__init__(scene, inputs=[1, 1], outputs=[1])
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-
-        # get first input
-        i1 = self.getInput(0)
-        i2 = self.getInput(1)
-        if not i1 or not i2:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        df1 = i1.eval()
-        df2 = i2.eval()
-        if df1 is None:
-            self.setToolTip('First input is NaN')
-            self.markInvalid()
-            return
-        elif df2 is None:
-            self.setToolTip('Second input is NaN')
-            self.markInvalid()
-            return
-
-
-        self.value = pd.concat([df1, df2])
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
-
-        self.setToolTip('')
-
-        self.evalChildren()
-
-        return self.value
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        return pd.concat(inputs)
+
+    @classmethod
+    def evalStream(cls, streams, settings, chunksize):
+        # rows of the first table, then rows of the second one
+        for stream in streams:
+            yield from stream
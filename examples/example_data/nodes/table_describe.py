@@ -1,8 +1,13 @@
 from ..data_node_base import DataNode
 from ..data_node_graphics_base import OpGraphicsNode
 from ..data_conf import NodeFactory
+from itertools import chain
+import numpy as np
 import pandas as pd
 
+# number of rows kept to estimate the quartiles in streaming mode
+QUANTILE_SAMPLE_SIZE = 100000
+
 
 @NodeFactory.register()
 class OpNode_DescribeTable(DataNode):
@@ -16,34 +21,51 @@ class OpNode_DescribeTable(DataNode):
     def __init__(self, scene):
         super().__init__(scene, inputs=[1], outputs=[1])
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        return inputs[0].describe()
 
-        # get first input
-        i1 = self.getInput(0)
-        if not i1:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
+    @classmethod
+    def evalStream(cls, streams, settings, chunksize):
+        """Count, mean, std, min and max of the numeric columns are combined exactly from the chunks.
 
-        # get value from input node
-        df1 = i1.eval()
-        if df1 is None:
-            self.setToolTip('Input is NaN')
-            self.markInvalid()
+        The quartiles are computed on a uniform sample of at most QUANTILE_SAMPLE_SIZE rows, hence are exact
+        for smaller tables only.
+        """
+        stream = iter(streams[0])
+        first = next(stream, None)
+        columns = first.select_dtypes(include='number').columns if isinstance(first, pd.DataFrame) else []
+        if len(columns) == 0:
+            # nothing to combine, describe the whole table
+            yield from super().evalStream([chain([first], stream)], settings, chunksize)
             return
 
-        self.value = df1.describe()
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
-
-        self.setToolTip('')
+        count, mean, m2, minimum, maximum, sample = 0, 0, 0, None, None, None
+        random = np.random.default_rng(0)
+        for chunk in chain([first], stream):
+            chunk = chunk[columns]
+            chunk_count = chunk.count()
+            chunk_mean = chunk.mean().fillna(0)
+            chunk_m2 = ((chunk - chunk_mean) ** 2).sum()
+            # parallel algorithm of Chan et al. combining the means and the sums of squared differences
+            total = count + chunk_count
+            delta = chunk_mean - mean
+            ratio = (chunk_count / total.where(total > 0)).fillna(0)
+            mean = mean + delta * ratio
+            m2 = m2 + chunk_m2 + delta ** 2 * count * ratio
+            count = total
+            minimum = chunk.min() if minimum is None else np.fmin(minimum, chunk.min())
+            maximum = chunk.max() if maximum is None else np.fmax(maximum, chunk.max())
 
-        self.evalChildren()
+            # bottom-k sampling, the rows with the smallest random keys form a uniform sample
+            keyed = chunk.assign(__key=random.random(len(chunk)))
+            sample = keyed if sample is None else pd.concat([sample, keyed])
+            sample = sample.nsmallest(QUANTILE_SAMPLE_SIZE, '__key')
 
-        return self.value
+        quantiles = sample.drop(columns='__key').quantile([0.25, 0.5, 0.75])
+        quantiles.index = ['25%', '50%', '75%']
+        result = pd.DataFrame({'count': count.astype(float),
+                               'mean': mean.where(count > 0),
+                               'std': np.sqrt(m2 / (count - 1).where(count > 1)),
+                               'min': minimum, }).T
+        yield pd.concat([result, quantiles, maximum.to_frame('max').T])[columns]
@@ -60,56 +60,59 @@ class OpNode_PivotTable(DataNode):
         assert 'node_settings' in data.keys(), 'node_settings is not in input'
         return self.dragger.restoreStatus(data['node_settings'])
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-
-        # get first input
-        input_node = self.getInput(0)
-        if not input_node:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        self.input_val = input_node.eval()
-        if isinstance(self.input_val, pd.DataFrame):
-            new_columns = self.input_val.columns
+    def onInputValues(self, inputs):
+        """Update the dragger in case the columns of the input table changed"""
+        if isinstance(inputs[0], pd.DataFrame):
+            new_columns = inputs[0].columns
         else:
-            self.columns = None
             new_columns = None
 
         # Compare if new columns are the same as the old one
-        if self.columns is None or not (self.columns.equals(new_columns)):
+        if self.columns is None or new_columns is None or not (self.columns.equals(new_columns)):
             # Update the properties toolbar accordingly
             self.columns = new_columns
             self.updatePropertiesWidget()
 
-        if self.columns is None:
-            self.setToolTip('Input is NaN')
-            self.markInvalid()
-            return
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        input_val = inputs[0]
+        if not isinstance(input_val, pd.DataFrame):
+            raise TypeError('Input is not a table')
 
         # check if at least one item is present in each
         # TODO evaluate such that only two value in the settings are necessary
-        widgetSettings = self.getNodeSettings()
-        evaluate = True
-        for key, value in widgetSettings['outputs'].items():
-            print(value)
-            evaluate &= len(value) >= 1
-        if evaluate:
-            self.print('evaluate')
-            kwargs = widgetSettings['outputs']
-            self.value = self.input_val.pivot_table(**kwargs)
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
-
-        self.setToolTip('')
-
-        self.evalChildren()
-
-        return self.value
+        kwargs = cls.getPivotArguments(settings)
+        return input_val.pivot_table(**kwargs)
+
+    @staticmethod
+    def getPivotArguments(settings):
+        """Returns the arguments of pivot_table, check that at least one item is present in each"""
+        kwargs = settings['outputs']
+        for key, value in kwargs.items():
+            if len(value) < 1:
+                raise ValueError('At least one column is expected in {}'.format(key))
+        return kwargs
+
+    @classmethod
+    def evalStream(cls, streams, settings, chunksize):
+        """The mean of each cell is combined from the sums and the counts of the chunks"""
+        kwargs = cls.getPivotArguments(settings)
+        keys = list(kwargs['index']) + list(kwargs['columns'])
+        values = list(kwargs['values'])
+        sums, counts = None, None
+        for chunk in streams[0]:
+            if not isinstance(chunk, pd.DataFrame):
+                raise TypeError('Input is not a table')
+            grouped = chunk.groupby(keys)[values]
+            chunk_sums, chunk_counts = grouped.sum(), grouped.count()
+            if sums is None:
+                sums, counts = chunk_sums, chunk_counts
+            else:
+                sums = sums.add(chunk_sums, fill_value=0)
+                counts = counts.add(chunk_counts, fill_value=0)
+        if sums is None:
+            raise ValueError('Input is empty')
+
+        # one row per cell of the pivot table, pivoting the means again keeps the layout of pivot_table
+        means = (sums / counts.where(counts > 0)).reset_index()
+        yield means.pivot_table(**kwargs)
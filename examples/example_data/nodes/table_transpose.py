@@ -16,34 +16,6 @@ class OpNode_TransposeTable(DataNode):
     def __init__(self, scene):
         super().__init__(scene, inputs=[1], outputs=[1])
 
-    def evalImplementation(self, force=False):
-        self.print('evalImplementation')
-
-        # get first input
-        i1 = self.getInput(0)
-        if not i1:
-            self.setToolTip('Input is not connected')
-            self.markInvalid()
-            return
-
-        # get value from input node
-        df1 = i1.eval()
-        if df1 is None:
-            self.setToolTip('First input is NaN')
-            self.markInvalid()
-            return
-
-        self.value = df1.T
-
-        # else set flag and tooltip
-        self.markDirty(False)
-        self.markInvalid(False)
-
-        self.markDescendantInvalid(False)
-        self.markDescendantDirty()
-
-        self.setToolTip('')
-
-        self.evalChildren()
-
-        return self.value
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        return inputs[0].T
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import Qt, QObject, QEvent
-from .datatable_view import DataTableView
+from .datatable_view import DataTableView, DataTableModel
 from .datatable_header import HeaderView
 import pandas as pd
 
@@ -8,9 +8,21 @@ from typing import Dict, List, Union, Iterable, Any
 
 
 class DataFrameView(QWidget):
-    def __init__(self, parent=None, dataframe: Union[pd.DataFrame, pd.Series] = None):
+    def __init__(self, parent=None, dataframe: Union[pd.DataFrame, pd.Series] = None,
+                 model: DataTableModel = None):
+        """View of a `DataFrame` or a `Series` with its headers
+
+        Parameters
+        ----------
+        parent: QWidget
+            parent widget
+        dataframe: Union[pd.DataFrame, pd.Series]
+            Data to display
+        model: DataTableModel
+            Model of another `DataFrameView` to share instead of `dataframe`, nothing is copied
+        """
         super().__init__(parent=parent)
-        self.dataView = DataTableView(parent=self, dataframe=dataframe)
+        self.dataView = DataTableView(parent=self, dataframe=dataframe, model=model)
         # Create headers
         self.columnHeader = HeaderView(parent=self, orientation=Qt.Horizontal)
         self.indexHeader = HeaderView(parent=self, orientation=Qt.Vertical)
@@ -60,13 +72,30 @@ class DataFrameView(QWidget):
         self.gridLayout.setSpacing(2)
         self.setLayout(self.gridLayout)
 
-    # def setDataFrame(self, dataframe: Union[pd.DataFrame, pd.Series]):
-    #     self.dataView.setDataFrame(dataframe)
-    #     self.indexHeader.updateModel()
-    #     self.columnHeader.updateModel()
-    #     # TODO Trying to debug...
-    #     # self.corner_widget.setFixedWidth(self.indexHeader.width())
-    #     # self.corner_widget.setFixedHeight(self.columnHeader.height())
+    def setDataFrame(self, dataframe: Union[pd.DataFrame, pd.Series]):
+        """Display `dataframe`, reusing the models and the widgets of the view.
+
+        The scroll position is kept, as well as the spans and sizes of the headers whose labels did not change.
+        The headers of every view sharing the model follow the new dataframe, see
+        :py:meth:`~datatable_header.HeaderView.onModelReset`.
+
+        Parameters
+        ----------
+        dataframe: Union[pd.DataFrame, pd.Series]
+            Data to display
+        """
+        horizontal = self.dataView.horizontalScrollBar().value()
+        vertical = self.dataView.verticalScrollBar().value()
+        model = self.dataView.model()
+        fetched_rows = model.rowCount()
+
+        model.dataframe = dataframe
+        # fetch the rows previously displayed so that the scroll position can be restored
+        while model.rowCount() < fetched_rows and model.canFetchMore():
+            model.fetchMore()
+
+        self.dataView.horizontalScrollBar().setValue(horizontal)
+        self.dataView.verticalScrollBar().setValue(vertical)
 
     @property
     def dataframe(self):
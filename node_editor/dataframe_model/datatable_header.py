@@ -1,12 +1,13 @@
-from PyQt5.QtWidgets import QTableView, QSizePolicy, QAbstractItemView, QApplication
+from PyQt5.QtWidgets import QTableView, QSizePolicy, QAbstractItemView, QApplication, QStyle
 from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSize, QItemSelectionModel, QItemSelection, QObject, \
     QEvent, QPoint
 from PyQt5.QtGui import QFont
 import pandas as pd
 import numpy as np
 
-from typing import Dict, List, Union, Iterable, Any, TYPE_CHECKING
+from typing import Dict, List, Optional, Union, Iterable, Any, Tuple, TYPE_CHECKING
 from node_editor.utils import dumpException
+from .datatable_statistics import getColumnStatistics, formatStatistics
 
 if TYPE_CHECKING:
     from .dataframe_viewer import DataFrameView
@@ -31,7 +32,30 @@ class HeaderModel(QAbstractTableModel):
         super().__init__(parent)
         self.dataframeView = dataframeView
         self.orientation = parent.orientation
-        self._dataframe = parent.dataframe
+        self.dataModel = dataframeView.dataView.model()
+        self._dataframe = self.dataModel.dataframe
+        # the model of the data may be shared by several views, the labels follow its dataframe whichever view
+        # set it
+        self.dataModel.modelAboutToBeReset.connect(self.beginResetModel)
+        self.dataModel.modelReset.connect(self.onDataReset)
+        if self.isVertical():
+            # the index follows the rows fetched, sorted and filtered by the model of the data
+            self.dataModel.rowsAboutToBeInserted.connect(self.onRowsAboutToBeFetched)
+            self.dataModel.rowsInserted.connect(self.onRowsFetched)
+        else:
+            # summaries of the columns are shown in the tooltips of the lowest level
+            getColumnStatistics().signals.statisticsReady.connect(self.onStatisticsReady)
+
+    def onRowsAboutToBeFetched(self, parent: QModelIndex, first: int, last: int):
+        self.beginInsertRows(QModelIndex(), first, last)
+
+    def onRowsFetched(self, parent: QModelIndex, first: int, last: int):
+        self.endInsertRows()
+
+    def onDataReset(self):
+        """The model of the data was reset, its dataframe may have been replaced"""
+        self._dataframe = self.dataModel.dataframe
+        self.endResetModel()
 
     @property
     def dataframe(self):
@@ -52,12 +76,12 @@ class HeaderModel(QAbstractTableModel):
             return self.dataframe.index.nlevels
 
     def rowCount(self, parent: QModelIndex = ...) -> int:
-        """Rows count is either the count of rows in case orientation is Vertical.
+        """Rows count is either the count of rows fetched by the model of the data in case orientation is Vertical.
         Else it corresponds to the count of levels of the columns"""
         if self.isHorizontal():
             return self.dataframe.columns.nlevels
         elif self.isVertical():
-            return self.dataframe.index.shape[0]
+            return self.dataModel.rowCount()
 
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         row, col = index.row(), index.column()
@@ -65,31 +89,38 @@ class HeaderModel(QAbstractTableModel):
             value = None
             if self.isHorizontal():
                 # Header corresponds to columns
-                if isinstance(self.dataframe.columns, pd.MultiIndex):
-                    value = self.dataframe.columns[col][row]
-                else:
-                    value = self.dataframe.columns[col]
+                value = self.getLabel(self.dataframe.columns, col, row)
             elif self.isVertical():
-                if isinstance(self.dataframe.index, pd.MultiIndex):
-                    value = self.dataframe.index[row][col]
-                else:
-                    value = self.dataframe.index[row]
-            if pd.isna(value):
-                return ''
-            else:
-                return str(value)
-
-    # def updateModel(self):
-    #     """Update model - Is typically called when new dataframe is set upon the DataFrameView"""
-    #     self.layoutAboutToBeChanged.emit()
-    #     # self.beginResetModel()
-    #     self._dataframe = self.dataframeView.dataframe
-    #     # self.endResetModel()
-    #     self.layoutChanged.emit()
+                row = self.dataModel.sourceRow(row)
+                value = self.getLabel(self.dataframe.index, row, col)
+            text = '' if pd.isna(value) else str(value)
+            if role == Qt.ToolTipRole and self.isHorizontal() and row == self.rowCount() - 1:
+                statistics = getColumnStatistics().get(self.dataframe, col)
+                return f'{text}\n{formatStatistics(statistics)}'
+            return text
+
+    def onStatisticsReady(self, key: int, column: int):
+        """Notify the view that the tooltip of `column` changed"""
+        if key == id(self.dataframe) and column < self.columnCount():
+            last_level = self.rowCount() - 1
+            self.dataChanged.emit(self.index(last_level, column), self.index(last_level, column), [Qt.ToolTipRole])
+
+    @staticmethod
+    def getLabel(labels: pd.Index, position: int, level: int) -> Any:
+        """Returns the value of `level` of the label at `position`, read from the codes of a MultiIndex without
+        building the tuple of the label"""
+        if isinstance(labels, pd.MultiIndex):
+            code = labels.codes[level][position]
+            return np.nan if code == -1 else labels.levels[level][code]
+        return labels[position]
 
 
 class HeaderView(QTableView):
     """View displaying datas from a HeaderModel"""
+    # number of rows whose content is used to size the columns
+    SIZE_SAMPLE_ROWS = 100
+    # number of sections before and after the visible ones whose spans are set
+    SPAN_MARGIN = 50
 
     def __init__(self, parent: 'DataFrameView', orientation: Qt.Orientation):
         """View displaying values from parent DataFrameView
@@ -112,6 +143,13 @@ class HeaderView(QTableView):
         self._resize_start_position = None
         self._header_initial_size = None
 
+        # (index, displayed rows, spans of each level) of the last index whose spans were computed
+        self._spans = None
+        # (level, first section) -> size of the spans set on the view
+        self._applied_spans = {}
+        # columns already fitted to their content
+        self._sized_columns = np.zeros(0, dtype=bool)
+
         # define model data
         model = HeaderModel(dataframeView=parent, parent=self)
         self.setModel(model)
@@ -139,6 +177,14 @@ class HeaderView(QTableView):
         self.setFont(font)
 
         self.selectionModel().selectionChanged.connect(self.onSelectionChanged)
+        # the dataframe was replaced, or its rows sorted or filtered
+        model.modelReset.connect(self.onModelReset)
+        # spans and column sizes are set on the visible sections only
+        if self.isVertical():
+            model.rowsInserted.connect(self.updateVisibleSections)
+            self.verticalScrollBar().valueChanged.connect(self.updateVisibleSections)
+        else:
+            self.horizontalScrollBar().valueChanged.connect(self.updateVisibleSections)
 
         # Set initial size
         self.set_spans()
@@ -151,6 +197,26 @@ class HeaderView(QTableView):
     def isVertical(self):
         return self.orientation == Qt.Vertical
 
+    def getLabels(self, dataframe: pd.DataFrame) -> pd.Index:
+        """Returns the columns or the index of `dataframe` depending on the orientation"""
+        return dataframe.columns if self.isHorizontal() else dataframe.index
+
+    def onModelReset(self):
+        """Follow the dataframe of the model, whichever view sharing the model of the data set it.
+
+        Spans and column sizes are kept unless the labels displayed by the header changed, the spans of the
+        index are set again as its rows may have been sorted or filtered.
+        """
+        labels = self.getLabels(self.dataframe)
+        self.dataframe = self.model().dataframe
+
+        new_labels = self.getLabels(self.dataframe)
+        changed = new_labels is not labels and not new_labels.equals(labels)
+        if changed or self.isVertical():
+            self.set_spans()
+        if changed:
+            self.init_column_sizes()
+
     def sizeHint(self):
         # Columm headers
         if self.isHorizontal():
@@ -322,65 +388,162 @@ class HeaderView(QTableView):
 
     # Fits columns to contents but with a minimum width and added padding
     def init_column_sizes(self):
+        """Size the columns from the header and the first `SIZE_SAMPLE_ROWS` rows, whatever the size of the
+        dataframe"""
         padding = 5
 
         # Columns match columns of content with header
         if self.isHorizontal():
-            min_size = 0
-
-            self.resizeColumnsToContents()
-            for col in range(self.model().columnCount()):
-                width = self.columnWidth(col)
-                if width + padding < min_size:
-                    new_width = min_size
-                else:
-                    new_width = width + padding
-                # Match column width of content with header
-                self.setColumnWidth(col, new_width)
-                self.dataView.setColumnWidth(col, new_width)
+            # columns are sized as they become visible
+            self._sized_columns = np.zeros(self.model().columnCount(), dtype=bool)
+            self.sizeVisibleColumns()
 
         else:
             # Index, only set the width
-            self.resizeColumnsToContents()
+            sample = min(self.SIZE_SAMPLE_ROWS, self.model().rowCount())
             for col in range(self.model().columnCount()):
-                width = self.columnWidth(col)
+                width = self.textWidth([self.model().data(self.model().index(row, col), Qt.DisplayRole)
+                                        for row in range(sample)])
                 self.setColumnWidth(col, width + padding)
 
+    def sizeVisibleColumns(self):
+        """Fits the visible columns not sized yet to their contents, with a minimum width and added padding"""
+        if not self.isHorizontal():
+            return
+        sample = min(self.SIZE_SAMPLE_ROWS, self.dataView.model().rowCount())
+
+        first, last = self.getVisibleSections()
+        # sizing the columns may reveal other columns
+        while not self._sized_columns[first:last + 1].all():
+            self._sizeColumns(np.flatnonzero(~self._sized_columns[first:last + 1]) + first, sample)
+            self._sized_columns[first:last + 1] = True
+            first, last = self.getVisibleSections()
+
+    def _sizeColumns(self, columns: np.ndarray, sample: int):
+        padding = 5
+        min_size = 0
+        dataModel = self.dataView.model()
+        for col in columns:
+            col = int(col)
+            width = self.textWidth([self.model().data(self.model().index(row, col), Qt.DisplayRole)
+                                    for row in range(self.model().rowCount())])
+            if sample > 0:
+                width = max(width, self.textWidth(dataModel.getBlock(0, col)[:sample], self.dataView))
+            if width + padding < min_size:
+                new_width = min_size
+            else:
+                new_width = width + padding
+            # Match column width of content with header
+            self.setColumnWidth(col, new_width)
+            self.dataView.setColumnWidth(col, new_width)
+
+    def textWidth(self, texts: List[str], view: QTableView = None) -> int:
+        """Returns the width of a cell of `view` displaying the longest of `texts`
+
+        Only the longest text is measured, cells are not queried for their size hint as
+        :py:meth:`QTableView.resizeColumnsToContents` does on every row.
+        """
+        view = self if view is None else view
+        texts = [text for text in texts if text]
+        # margins of the text within the cell, as in QStyledItemDelegate
+        margin = 2 * (view.style().pixelMetric(QStyle.PM_FocusFrameHMargin, None, view) + 1) + 1
+        if not texts:
+            return margin
+        return view.fontMetrics().horizontalAdvance(max(texts, key=len)) + margin
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.updateVisibleSections()
+
+    def updateVisibleSections(self):
+        """Size the columns and set the spans of the sections which became visible"""
+        self.sizeVisibleColumns()
+        self.updateSpans()
+
     def set_spans(self):
         """Adjust spans of the table to display multiheader like"""
         self.clearSpans()
+        self._applied_spans = {}
+        self.updateSpans()
+
+    def updateSpans(self):
+        """Set the spans of the sections which became visible"""
         try:
-            # Find spans for horizontal HeaderView
             if self.isHorizontal():
                 self._adjust_spans(self.dataframe.columns)
             else:
-                self._adjust_spans(self.dataframe.index)
-
+                # index of the dataframe currently displayed, in the order of the displayed rows
+                self._adjust_spans(self.parent().dataframe.index, self.dataView.model().rows)
         except Exception as e:
             dumpException(e)
 
-    def _adjust_spans(self, index: Union[pd.Index, pd.MultiIndex]):
-        """Compute spans"""
+    def getVisibleSections(self) -> Tuple[int, int]:
+        """Returns the first and last visible sections, extended by `SPAN_MARGIN` sections"""
+        if self.isHorizontal():
+            count = self.model().columnCount()
+            first, last = self.columnAt(0), self.columnAt(self.viewport().width() - 1)
+        else:
+            count = self.model().rowCount()
+            first, last = self.rowAt(0), self.rowAt(self.viewport().height() - 1)
+        first = 0 if first < 0 else first
+        last = count - 1 if last < 0 else last
+        return max(first - self.SPAN_MARGIN, 0), min(last + self.SPAN_MARGIN, count - 1)
+
+    @staticmethod
+    def _compute_spans(index: Union[pd.Index, pd.MultiIndex],
+                       rows: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Compute the runs of identical values of each level of `index` longer than one section.
+
+        Runs are found on the integer codes of the levels, a change in an outer level also ends the runs of
+        the inner levels. If `rows` is not None, the labels are taken in the order of the positions `rows`.
+
+        Returns
+        -------
+        List[Tuple[np.ndarray, np.ndarray]]
+            first sections and sizes of the runs, for each level
+        """
         if isinstance(index, pd.MultiIndex):
-            levels = np.stack([np.array(value) for value in index]).T
+            codes = [np.asarray(level_codes) for level_codes in index.codes]
+        elif index.is_unique:
+            # no span, whatever the order of the rows
+            return [(np.zeros(0, dtype=int), np.zeros(0, dtype=int))]
         else:
-            levels = np.array([index])
-
-        for nlevel, level in enumerate(levels):
-            # detect where level are discontinuous
-            spans = list(np.where(level[1:] != level[:-1])[0])
-            # add the first and last cell if necessary
-            if 0 not in spans:
-                spans.insert(0, -1)
-            if len(level) - 1 not in spans:
-                spans.append(len(level) - 1)
-            # only check if span if larger thant one cell
-            for n in np.where(np.diff(list(spans)) > 1)[0]:
-                span_size = spans[n + 1] - (spans[n] + 1) + 1
+            codes = [pd.factorize(index)[0]]
+        if rows is not None:
+            codes = [level_codes.take(rows) for level_codes in codes]
+
+        spans = []
+        count = len(codes[0])
+        changed = np.zeros(max(count - 1, 0), dtype=bool)
+        for level_codes in codes:
+            changed |= level_codes[1:] != level_codes[:-1]
+            starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+            sizes = np.diff(np.append(starts, count))
+            larger = sizes > 1
+            spans.append((starts[larger], sizes[larger]))
+        return spans
+
+    def _adjust_spans(self, index: Union[pd.Index, pd.MultiIndex], rows: Optional[np.ndarray] = None):
+        """Set the spans of `index` intersecting the visible sections, computed once per index and order of the
+        rows"""
+        if self._spans is None or self._spans[0] is not index or self._spans[1] is not rows:
+            self._spans = (index, rows, self._compute_spans(index, rows))
+
+        # spans of the index are limited to the rows fetched so far
+        count = self.model().columnCount() if self.isHorizontal() else self.model().rowCount()
+        first, last = self.getVisibleSections()
+        for nlevel, (starts, sizes) in enumerate(self._spans[2]):
+            ends = starts + sizes - 1
+            for n in range(np.searchsorted(ends, first), np.searchsorted(starts, last, side='right')):
+                start = int(starts[n])
+                span_size = int(min(sizes[n], count - start))
+                if span_size <= 1 or self._applied_spans.get((nlevel, start)) == span_size:
+                    continue
+                self._applied_spans[(nlevel, start)] = span_size
                 if self.isHorizontal():
-                    self.setSpan(nlevel, spans[n] + 1, 1, span_size)
+                    self.setSpan(nlevel, start, 1, span_size)
                 else:
-                    self.setSpan(spans[n] + 1, nlevel, span_size, 1)
+                    self.setSpan(start, nlevel, span_size, 1)
 
     def print(self, *args):
         if self.isHorizontal():
@@ -0,0 +1,206 @@
+"""Module computing summaries of the columns of the displayed dataframes in a background thread"""
+import weakref
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+import numpy as np
+import pandas as pd
+from node_editor.utils import dumpException
+
+from typing import Dict, Optional, Tuple
+
+DEBUG = False
+
+# number of values above which the statistics which can not be vectorized are estimated from a sample
+SAMPLE_ROWS = 100000
+
+
+def estimateUnique(counts: pd.Series, population: int) -> int:
+    """Estimate the number of distinct values of a population from the value counts of a uniform sample.
+
+    Returns the larger of the Guaranteed-Error Estimator, which underestimates columns of mostly distinct
+    values, and of the Chao1 estimator, which underestimates skewed columns.
+
+    Parameters
+    ----------
+    counts: pd.Series
+        occurrences of each value in the sample
+    population: int
+        number of values of the population
+    """
+    sample_size = int(counts.sum())
+    if sample_size == 0:
+        return 0
+    distinct = len(counts)
+    singles = int((counts == 1).sum())
+    doubles = int((counts == 2).sum())
+    # values seen once in the sample stand for sqrt(population / sample size) distinct values
+    gee = np.sqrt(population / sample_size) * singles + (distinct - singles)
+    if doubles:
+        chao = distinct + singles ** 2 / (2 * doubles)
+    else:
+        chao = distinct + singles * (singles - 1) / 2
+    return int(min(round(max(gee, chao)), population))
+
+
+def computeStatistics(values: pd.Series, sample_rows: int = SAMPLE_ROWS) -> dict:
+    """Returns the minimum, maximum, count of missing values and count of distinct values of `values`
+
+    Missing values, as well as the minimum and maximum of numeric values, are computed exactly. Over
+    `sample_rows` values, the count of distinct values and the minimum and maximum of other values are
+    estimated from a uniform sample.
+
+    Parameters
+    ----------
+    values: pd.Series
+        values of a column
+    sample_rows: int
+        size of the sample
+
+    Returns
+    -------
+    dict
+        with keys 'min', 'max', 'nulls' and 'unique', None if a statistic can not be computed, and 'estimated'
+        the keys of the statistics estimated from the sample
+    """
+    nulls = int(values.isna().sum())
+    population = len(values) - nulls
+    approximate = population > sample_rows
+    non_null = values.dropna()
+    sample = non_null
+    if approximate:
+        rng = np.random.default_rng(0)
+        sample = non_null.iloc[np.unique(rng.integers(0, population, sample_rows))]
+
+    numeric = pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_datetime64_any_dtype(values.dtype)
+    try:
+        extremes = non_null if numeric else sample
+        minimum, maximum = (extremes.min(), extremes.max()) if len(extremes) else (None, None)
+    except TypeError:
+        # values which can not be compared
+        minimum = maximum = None
+
+    try:
+        counts = sample.value_counts()
+        unique = estimateUnique(counts, population) if approximate else len(counts)
+    except TypeError:
+        # unhashable values such as lists
+        unique = None
+
+    estimated = ('unique',) if numeric else ('min', 'max', 'unique')
+    return {'min': minimum, 'max': maximum, 'nulls': nulls, 'unique': unique,
+            'estimated': estimated if approximate else ()}
+
+
+class StatisticsSignals(QObject):
+    """Signals used to bring back the statistics computed in the worker thread to the GUI thread"""
+    jobDone = pyqtSignal(object, int, object)
+    statisticsReady = pyqtSignal(object, int)
+
+
+class ColumnStatistics:
+    """Class computing the statistics of the columns of dataframes in a background thread
+
+    Statistics are computed on demand, once per column, and cached per dataframe identity: they are dropped
+    with the dataframe. A `Node` evaluated again outputs a new dataframe, hence new statistics, while a
+    result reused from the cache keeps its statistics.
+    """
+    # number of threads computing statistics
+    MAX_WORKERS = 1
+
+    def __init__(self):
+        """
+        Instance Attributes
+         - **signals** - ``statisticsReady(dataframe id, column)`` is emitted in the GUI thread once the
+           statistics of a column are available
+        """
+        self.signals = StatisticsSignals()
+        self.signals.jobDone.connect(self.onJobDone, Qt.QueuedConnection)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # id of the dataframe -> (reference to the dataframe, statistics of each column, None while computed)
+        self._statistics: Dict[int, Tuple[weakref.ref, Dict[int, Optional[dict]]]] = {}
+
+    def getExecutor(self) -> ThreadPoolExecutor:
+        """Returns the thread pool, create it if needed"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+                                                thread_name_prefix='ColumnStatistics')
+        return self._executor
+
+    def get(self, dataframe: pd.DataFrame, column: int) -> Optional[dict]:
+        """Returns the statistics of `column` of `dataframe`, None if they are not available yet.
+
+        The computation is started in the worker thread on the first request, see :py:func:`computeStatistics`.
+
+        Parameters
+        ----------
+        dataframe: pd.DataFrame
+            displayed dataframe
+        column: int
+            position of the column
+        """
+        key = id(dataframe)
+        entry = self._statistics.get(key)
+        if entry is None or entry[0]() is not dataframe:
+            entry = self._statistics[key] = (weakref.ref(dataframe), {})
+            weakref.finalize(dataframe, self._release, key, entry[0])
+        reference, columns = entry
+        if column not in columns:
+            columns[column] = None
+            future = self.getExecutor().submit(computeStatistics, dataframe.iloc[:, column])
+            future.add_done_callback(partial(self._onFutureDone, reference, column))
+        return columns[column]
+
+    def _onFutureDone(self, reference: weakref.ref, column: int, future: Future):
+        """Called in the worker thread"""
+        try:
+            statistics = future.result()
+        except Exception as e:
+            dumpException(e)
+            statistics = {}
+        self.signals.jobDone.emit(reference, column, statistics)
+
+    def onJobDone(self, reference: weakref.ref, column: int, statistics: dict):
+        """Store the statistics, in the GUI thread"""
+        dataframe = reference()
+        entry = None if dataframe is None else self._statistics.get(id(dataframe))
+        if entry is None or entry[0] is not reference:
+            # the dataframe was released meanwhile
+            return
+        entry[1][column] = statistics
+        self.print('statistics of column', column, statistics)
+        self.signals.statisticsReady.emit(id(dataframe), column)
+
+    def _release(self, key: int, reference: weakref.ref):
+        entry = self._statistics.get(key)
+        if entry is not None and entry[0] is reference:
+            del self._statistics[key]
+
+    def print(self, *args):
+        if DEBUG:
+            print('>ColumnStatistics :', *args)
+
+
+_column_statistics: Optional[ColumnStatistics] = None
+
+
+def getColumnStatistics() -> ColumnStatistics:
+    """Returns the :class:`ColumnStatistics` shared by the headers of all the tables"""
+    global _column_statistics
+    if _column_statistics is None:
+        _column_statistics = ColumnStatistics()
+    return _column_statistics
+
+
+def formatStatistics(statistics: Optional[dict]) -> str:
+    """Returns `statistics` as lines of text, for the tooltip of a column"""
+    if statistics is None:
+        return 'Computing statistics\N{HORIZONTAL ELLIPSIS}'
+    if not statistics:
+        return 'Statistics unavailable'
+    lines = []
+    for name, key in (('min', 'min'), ('max', 'max'), ('missing', 'nulls'), ('unique', 'unique')):
+        if statistics[key] is not None:
+            approximate = '\N{ALMOST EQUAL TO}' if key in statistics['estimated'] else ''
+            lines.append(f'{name}: {approximate}{statistics[key]}')
+    return '\n'.join(lines)
@@ -4,9 +4,10 @@ from PyQt5.QtGui import *
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass, field, asdict
+from collections import OrderedDict
 from node_editor.utils import dumpException
 
-from typing import Dict, List, Union, Iterable, Any, TYPE_CHECKING
+from typing import Dict, List, Optional, Tuple, Union, Iterable, Any, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .dataframe_viewer import DataFrameView
@@ -14,9 +15,11 @@ if TYPE_CHECKING:
 
 @dataclass
 class Filter:
+    """Filter of the rows of a `DataTableModel`, `expr` is a boolean expression evaluated by
+    :py:meth:`pandas.DataFrame.eval`"""
     expr: str
-    enabled: bool
-    failed: bool
+    enabled: bool = True
+    failed: bool = False
 
 
 def _align(value: Any) -> Qt.AlignmentFlag:
@@ -25,7 +28,7 @@ def _align(value: Any) -> Qt.AlignmentFlag:
     Parameters
     ----------
     value: Any
-        value to align
+        dtype of the values to align
 
     Returns
     -------
@@ -39,7 +42,63 @@ def _align(value: Any) -> Qt.AlignmentFlag:
         return Qt.AlignVCenter + Qt.AlignLeft
 
 
+def _formatValue(value: Any) -> str:
+    """Format a single value for display, floats with 4 decimals and missing values as empty strings"""
+    if pd.isna(value):
+        return ''
+    if isinstance(value, (float, np.floating)):
+        return "{:.4f}".format(value).strip('0')
+    return str(value)
+
+
+def _formatValues(values: pd.Series) -> List[str]:
+    """Vectorized version of `_formatValue`, formatting all the `values` at once
+
+    Parameters
+    ----------
+    values: pd.Series
+        values of a column
+
+    Returns
+    -------
+    List[str]
+        display strings of the values
+    """
+    dtype = values.dtype
+    if not isinstance(dtype, np.dtype) or dtype.kind not in 'biuf':
+        # objects, dates, extension types... formatted one by one
+        return [_formatValue(value) for value in values]
+
+    array = values.to_numpy()
+    if not len(array):
+        return []
+    if dtype.kind == 'f':
+        formatted = np.char.strip(np.char.mod('%.4f', array), '0')
+        formatted = np.where(np.isnan(array), '', formatted)
+    else:
+        formatted = array.astype(str)
+    return formatted.tolist()
+
+
 class DataTableModel(QAbstractTableModel):
+    """Model handling values taken either from a DataFrame or a Series
+
+    Display strings are formatted a block of rows of a column at a time and kept in a bounded cache, only the
+    blocks around the displayed cells are formatted. Alignment is computed once per column.
+
+    Rows are exposed to the view incrementally, one page at a time, as the view scrolls down
+    (see :py:meth:`~DataTableModel.canFetchMore`).
+
+    Sorting and filtering never copy the dataframe, the displayed rows are the positions of an array of
+    positions in the source dataframe. The mask of each filter is computed once per expression.
+    """
+    # number of rows formatted at once
+    BLOCK_ROWS = 256
+    # number of rows exposed to the view at once
+    FETCH_ROWS = 1000
+    # maximum number of formatted blocks kept in memory
+    MAX_CACHED_BLOCKS = 256
+
     def __init__(self, parent: 'DataTableView', dataframe: Union[pd.DataFrame, pd.Series] = None):
         """Model handling values taken either from a DataFrame or a Series
 
@@ -51,34 +110,104 @@ class DataTableModel(QAbstractTableModel):
         -------------------
         _source_dataframe : pd.DataFrame
             Data source
-        _dataframe : pd.DataFrame
-            Data sorted or filtered
+        rows : Optional[np.ndarray]
+            positions in `_source_dataframe` of the rows sorted and filtered, None if displayed as is
         filters : List[Filter]
             list of `Filter` to apply
+        _sort : Optional[Tuple[int, Qt.SortOrder]]
+            column and order of the sort
+        _permutation : Optional[np.ndarray]
+            positions of the rows of `_source_dataframe` once sorted, None if not sorted
+        _masks : Dict[str, np.ndarray]
+            mask of the rows of `_source_dataframe` matching each filter expression
+        _blocks : OrderedDict
+            formatted display strings by (block, column), from the least to the most recently used
+        _alignments : List[Qt.AlignmentFlag]
+            alignment of each column
+        _fetched_rows : int
+            number of rows exposed to the view
         """
         try:
             super().__init__(parent=parent)
             # init attributes
             self._source_dataframe: Union[pd.DataFrame, pd.Series, None] = None
-            self._dataframe: Union[pd.DataFrame, pd.Series, None] = None
+            self.rows: Optional[np.ndarray] = None
+            self.filters: List[Filter] = []
+            self._sort: Optional[Tuple[int, Qt.SortOrder]] = None
+            self._permutation: Optional[np.ndarray] = None
+            self._masks: Dict[str, np.ndarray] = {}
+            self._blocks = OrderedDict()
+            self._alignments = []
+            self._shape = (0, 0)
+            self._fetched_rows = 0
             self.dataframe = dataframe
         except Exception as e:
             dumpException(e)
 
     @property
     def dataframe(self):
-        return self._dataframe
+        return self._source_dataframe
 
     @dataframe.setter
     def dataframe(self, value):
+        """Set the source dataframe, the sort and the filters are applied to the new values"""
         self.beginResetModel()
         if value is None:
             value = pd.DataFrame()  # Default value for DataFrame
         if isinstance(value, pd.Series):
             value = value.to_frame()  # in case of Series cast to DataFrame
-        self._source_dataframe = self._dataframe = value
+        self._source_dataframe = value
+        self._masks.clear()
+        for filter in self.filters:
+            filter.failed = False
+        if self._sort is not None and self._sort[0] >= value.shape[1]:
+            self._sort = None
+        self._permutation = self._sortPermutation()
+        self.rows = self._displayedRows()
+        self.invalidateCache()
         self.endResetModel()
 
+    def invalidateCache(self):
+        """Drop the formatted blocks and compute the alignment of the columns of the current dataframe"""
+        self._blocks.clear()
+        self._alignments = [_align(dtype) for dtype in self._source_dataframe.dtypes]
+        # the shape is queried for each index created by the view
+        row_count = self._source_dataframe.shape[0] if self.rows is None else len(self.rows)
+        self._shape = (row_count, self._source_dataframe.shape[1])
+        self._fetched_rows = min(self.FETCH_ROWS, row_count)
+
+    def sourceRow(self, row: int) -> int:
+        """Returns the position in the source dataframe of the displayed `row`"""
+        return row if self.rows is None else int(self.rows[row])
+
+    def getValues(self, start: int, stop: int, column: int) -> pd.Series:
+        """Returns the values of `column` of the displayed rows from `start` to `stop` excluded"""
+        if self.rows is None:
+            return self._source_dataframe.iloc[start:stop, column]
+        return self._source_dataframe.iloc[self.rows[start:stop], column]
+
+    def getBlock(self, block: int, column: int) -> List[str]:
+        """Returns the display strings of the rows of `block` in `column`, formatted on first access
+
+        Parameters
+        ----------
+        block: int
+            index of the block, rows from ``block * BLOCK_ROWS`` to ``(block + 1) * BLOCK_ROWS`` excluded
+        column: int
+            index of the column
+        """
+        key = (block, column)
+        formatted = self._blocks.get(key)
+        if formatted is None:
+            start = block * self.BLOCK_ROWS
+            formatted = _formatValues(self.getValues(start, start + self.BLOCK_ROWS, column))
+            self._blocks[key] = formatted
+            while len(self._blocks) > self.MAX_CACHED_BLOCKS:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(key)
+        return formatted
+
     # def setDataSource(self, dataframe: Union[pd.Series, pd.DataFrame]):
     #     """Helper function for setting a new dataframe in the model
     #
@@ -91,26 +220,39 @@ class DataTableModel(QAbstractTableModel):
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         """Access to data"""
         if index.isValid():
-            value = self._dataframe.iloc[index.row(), index.column()]
-            if role == Qt.DisplayRole or role == Qt.ToolTipRole:
-                if pd.isna(value):
-                    return ''
-
-                # Float formatting
-                if isinstance(value, (float, np.floating)):
-                    if not role == Qt.ToolTipRole:
-                        return "{:.4f}".format(value).strip('0')
-
-                return str(value)
+            row, column = index.row(), index.column()
+            if role == Qt.DisplayRole:
+                block, offset = divmod(row, self.BLOCK_ROWS)
+                return self.getBlock(block, column)[offset]
+            elif role == Qt.ToolTipRole:
+                # full precision, only for the hovered cell
+                value = self._source_dataframe.iloc[self.sourceRow(row), column]
+                return '' if pd.isna(value) else str(value)
             elif role == Qt.TextAlignmentRole:
-                return _align(value)
+                return self._alignments[column]
         return None
 
     def rowCount(self, parent: QModelIndex = ...) -> int:
-        return self._dataframe.shape[0]
+        """Number of rows fetched so far, see :py:meth:`~DataTableModel.fetchMore`"""
+        return self._fetched_rows
+
+    def canFetchMore(self, parent: QModelIndex = ...) -> bool:
+        """Returns ``True`` if rows of the dataframe are not exposed to the view yet"""
+        if isinstance(parent, QModelIndex) and parent.isValid():
+            return False
+        return self._fetched_rows < self._shape[0]
+
+    def fetchMore(self, parent: QModelIndex = ...) -> None:
+        """Expose the next `FETCH_ROWS` rows to the view, called by the view once scrolled to the last row"""
+        count = min(self.FETCH_ROWS, self._shape[0] - self._fetched_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched_rows, self._fetched_rows + count - 1)
+        self._fetched_rows += count
+        self.endInsertRows()
 
     def columnCount(self, parent: QModelIndex = ...) -> int:
-        return self._dataframe.shape[1]
+        return self._shape[1]
 
     def flags(self, index: QModelIndex):
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable
@@ -123,29 +265,108 @@ class DataTableModel(QAbstractTableModel):
         """to implement ? not sure"""
         pass
 
-    def sort(self, column: int, order: Qt.SortOrder = ...) -> None:
-        """Handle sorting of inner value of dataframe"""
-        pass
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        """Handle sorting of inner value of dataframe, through a permutation of the rows.
+
+        Parameters
+        ----------
+        column: int
+            index of the column to sort by, the sort is removed if negative
+        order: Qt.SortOrder
+            sort order, missing values are always last
+        """
+        try:
+            self._sort = None if column < 0 else (column, order)
+            self._permutation = self._sortPermutation()
+        except Exception as e:
+            dumpException(e)
+            self._sort = self._permutation = None
+        self.updateRows()
+
+    def _sortPermutation(self) -> Optional[np.ndarray]:
+        """Returns the positions of the rows of the source dataframe once sorted, None if not sorted"""
+        if self._sort is None:
+            return None
+        column, order = self._sort
+        values = self._source_dataframe.iloc[:, column]
+        ascending = order == Qt.AscendingOrder
+        # stable so that sorting successively by several columns is meaningful
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+            # numpy sorts nan last, descending order is obtained by reversing the order of the keys
+            array = values.to_numpy()
+            if not ascending:
+                array = -array if array.dtype.kind == 'f' else ~array
+            return np.argsort(array, kind='stable')
+        return values.array.argsort(ascending=ascending, kind='stable', na_position='last')
 
     def addFilter(self, filter: Filter):
         """Add `Filter` to list of filters"""
-        pass
+        self.filters.append(filter)
+        self.applyFilters()
 
     def applyFilters(self):
-        """Apply filters, update value in dataframe"""
-        pass
-
-    def editFilter(self, index):
-        pass
-
-    def toggleFilter(self, index):
-        pass
+        """Apply filters, update the displayed rows. Masks of the expressions already evaluated are reused"""
+        self.updateRows()
+
+    def editFilter(self, index: int, expr: str):
+        """Replace the expression of the filter at `index` by `expr`"""
+        filter = self.filters[index]
+        filter.expr = expr
+        filter.failed = False
+        self.applyFilters()
+
+    def toggleFilter(self, index: int):
+        """Enable or disable the filter at `index`"""
+        filter = self.filters[index]
+        filter.enabled = not filter.enabled
+        self.applyFilters()
+
+    def getMask(self, filter: Filter) -> Optional[np.ndarray]:
+        """Returns the mask of the rows of the source dataframe matching `filter`, None if it can not be evaluated.
+
+        Masks are computed once per expression, until the source dataframe changes.
+        """
+        mask = self._masks.get(filter.expr)
+        if mask is None and not filter.failed:
+            try:
+                result = self._source_dataframe.eval(filter.expr)
+                if not isinstance(result, pd.Series) or not pd.api.types.is_bool_dtype(result.dtype):
+                    raise ValueError(f'{filter.expr} is not a boolean expression')
+                mask = result.to_numpy(dtype=bool, na_value=False)
+                self._masks[filter.expr] = mask
+            except Exception as e:
+                dumpException(e)
+                filter.failed = True
+        return mask
+
+    def _displayedRows(self) -> Optional[np.ndarray]:
+        """Returns the positions of the rows sorted and filtered, None if all the rows are displayed as is"""
+        mask = None
+        for filter in self.filters:
+            if filter.enabled:
+                filter_mask = self.getMask(filter)
+                if filter_mask is not None:
+                    mask = filter_mask if mask is None else mask & filter_mask
+
+        if mask is None:
+            return self._permutation
+        if self._permutation is None:
+            return np.flatnonzero(mask)
+        return self._permutation[mask[self._permutation]]
+
+    def updateRows(self):
+        """Update the displayed rows after a change of the sort or the filters"""
+        self.beginResetModel()
+        self.rows = self._displayedRows()
+        self.invalidateCache()
+        self.endResetModel()
 
 
 class DataTableView(QTableView):
     """View handling datas from a `DataFrame` or a `Series`"""
 
-    def __init__(self, parent: 'DataFrameView' = None, dataframe: Union[pd.DataFrame, pd.Series] = None):
+    def __init__(self, parent: 'DataFrameView' = None, dataframe: Union[pd.DataFrame, pd.Series] = None,
+                 model: DataTableModel = None):
         """View handling datas from a `DataFrame` or a `Series`
 
         Parameters
@@ -154,9 +375,13 @@ class DataTableView(QTableView):
             View holding both the `HeaderView`s and the DataTableView
         dataframe: Union[pd.DataFrame, pd.Series]
             Data to display. The datas is stored in the DataTableModel
+        model: DataTableModel
+            Model of another view to share, with its data and its formatted cells. If given, `dataframe`
+            is ignored
         """
         super().__init__(parent)
-        model = DataTableModel(self, dataframe)
+        if model is None:
+            model = DataTableModel(self, dataframe)
         # deactivate header
         self.horizontalHeader().hide()
         self.verticalHeader().hide()
@@ -54,6 +54,9 @@ class Edge(Serializable):
     def __str__(self):
         return return_simple_id(self, 'Edge')
 
+    def onIdChanged(self, old_id):
+        self.scene.reindex(self, old_id)
+
     # properties and setters
     @property
     def start_socket(self):
@@ -67,6 +70,7 @@ class Edge(Serializable):
 
         # assign new start socket
         self._start_socket = value
+        self.scene.history.markChanged(self)
         # addEdge to the Socket class
         if self.start_socket is not None:
             self.start_socket.addEdge(self)
@@ -83,6 +87,7 @@ class Edge(Serializable):
 
         # assign new end socket
         self._end_socket = value
+        self.scene.history.markChanged(self)
         # addEdge to the Socket class
         if self.end_socket is not None:
             self.end_socket.addEdge(self)
@@ -285,8 +290,11 @@ class Edge(Serializable):
             hashmap = {}
         if restore_id:
             self.id = data['id']
-        self.start_socket = hashmap[data['start']]
-        self.end_socket = hashmap[data['end']]
+        # an edge which was not reconnected keeps its place in the edges of its sockets
+        if self.start_socket is not hashmap[data['start']]:
+            self.start_socket = hashmap[data['start']]
+        if self.end_socket is not hashmap[data['end']]:
+            self.end_socket = hashmap[data['end']]
         self.edge_type = data['edge_type']
 
     def print(self, *args):
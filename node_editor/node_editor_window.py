@@ -143,7 +143,7 @@ class NodeEditorWindow(QMainWindow):
 
     def getFileDialogFilter(self):
         """Returns ``str`` standard file open/save filter for ``QFileDialog``"""
-        return 'Graph (*.json);;All files (*)'
+        return 'Graph (*.json *.msgpack *.json.gz *.msgpack.gz);;All files (*)'
 
     def maybeSave(self):
         """Handling the dialog asking to save the file when closing the window
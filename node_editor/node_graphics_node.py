@@ -269,12 +269,17 @@ class GraphicsNode(QGraphicsRectItem):
         # handle when grNode moved
         if self._was_moved:
             self._was_moved = False
-            self.node.scene.history.storeHistory('Node moved', setModified=True)
-
-            self.node.scene.resetLastSelectedStates()
-            self.doSelect()
-            # store the last selected state, because moving also select the node
-            self.node.scene._last_selected_items = self.node.scene.getSelectedItems()
+            # the selected nodes were moved along
+            for item in self.scene().selectedItems():
+                if isinstance(item, GraphicsNode):
+                    self.node.scene.history.markChanged(item.node)
+            self.node.scene.history.markChanged(self.node)
+            # the move and the selection of the node in a single stamp
+            with self.node.scene.history.transaction('Node moved', setModified=True):
+                self.node.scene.resetLastSelectedStates()
+                self.doSelect()
+                # store the last selected state, because moving also select the node
+                self.node.scene._last_selected_items = self.node.scene.getSelectedItems()
 
             # skip storing selection
             return
@@ -315,6 +320,7 @@ class GraphicsNode(QGraphicsRectItem):
         if rect.height() < self.min_height:
             rect.setHeight(self.min_height)
         self.setRect(rect)
+        self.node.scene.history.markChanged(self.node)
         self.updateSocketAndEdges()
         self.setContentGeometry()
 
@@ -375,11 +381,12 @@ class GraphicsNode(QGraphicsRectItem):
                 for socket in self.node.getSockets():
                     socket.setSocketPosition()
 
-        # in any case
+        # in any case, the selected nodes are moved along with this one
         if self.scene() is not None:
-            for node in self.scene().scene.nodes:
-                if node.isSelected():
-                    node.updateConnectedEdges()
+            self.node.updateConnectedEdges()
+            for item in self.scene().selectedItems():
+                if item is not self and isinstance(item, GraphicsNode):
+                    item.node.updateConnectedEdges()
 
     def updateHandles(self):
         for handle in self.handles.values():
@@ -70,10 +70,14 @@ class Node(Serializable):
         # dirty and evaluation
         self._is_dirty = False
         self._is_invalid = False
+        self._is_running = False
 
     def __str__(self):
         return return_simple_id(self, 'Node')
 
+    def onIdChanged(self, old_id):
+        self.scene.reindex(self, old_id)
+
     # convenience function to update and get the position of the node in the graphical scene
     @property
     def pos(self):
@@ -81,6 +85,7 @@ class Node(Serializable):
 
     def setPos(self, x, y):
         self.grNode.setPos(x, y)
+        self.scene.history.markChanged(self)
 
     @property
     def width(self):
@@ -129,6 +134,7 @@ class Node(Serializable):
     @title.setter
     def title(self, value: str):
         self._title = value
+        self.scene.history.markChanged(self)
         if hasattr(self, 'grNode'):
             self.grNode.title = self._title
 
@@ -170,6 +176,7 @@ class Node(Serializable):
                 # remove grSockets from scene
                 for socket in self.inputs + self.outputs:
                     self.scene.grScene.removeItem(socket.grSocket)
+                    self.scene.removeSocket(socket)
                 self.inputs = []
                 self.outputs = []
 
@@ -293,6 +300,9 @@ class Node(Serializable):
     def isInvalid(self):
         return self._is_invalid
 
+    def isRunning(self):
+        return self._is_running
+
     def markDirty(self, new_value=True):
         """Mark this `Node` as `Dirty`. See :ref:`evaluation` for more
 
@@ -311,6 +321,8 @@ class Node(Serializable):
             self.grStatus.update()
 
         if self._is_dirty:
+            # e.g. the settings or the content of the node were changed
+            self.scene.history.markChanged(self)
             self.onMarkedDirty()
 
     def markChildrenDirty(self, new_value=True):
@@ -333,9 +345,8 @@ class Node(Serializable):
             ``True`` if children and descendants should be `Invalid`.
             ``False`` if you want to make children and descendants valid
         """
-        for other_node in self.getChildrenNodes():
+        for other_node in self.getDescendantNodes():
             other_node.markDirty(new_value)
-            other_node.markDescendantDirty(new_value)
 
     def markInvalid(self, new_value=True):
         """Mark this `Node` as `Invalid`. See :ref:`evaluation` for more
@@ -376,9 +387,25 @@ class Node(Serializable):
             ``True`` if children and descendants should be `Invalid`.
             ``False`` if you want to make children and descendants valid
         """
-        for other_node in self.getChildrenNodes():
+        for other_node in self.getDescendantNodes():
             other_node.markInvalid(new_value)
-            other_node.markDescendantInvalid(new_value)
+
+    def markRunning(self, new_value=True):
+        """Mark this `Node` as being evaluated in a worker thread. See
+        :class:`~node_editor.node_scene_evaluator.SceneEvaluator`
+
+        Parameters
+        ----------
+        new_value : bool
+            ``True`` if the evaluation of this `Node` is in progress. ``False`` once it is done or cancelled
+        """
+        graphics_update = True
+        if self._is_running == new_value:
+            graphics_update = False
+
+        self._is_running = new_value
+        if graphics_update and self.grStatus:
+            self.grStatus.update()
 
     def onMarkedDirty(self):
         """Called when this `Node` has been marked as `Dirty`. This method is supposed to be overridden"""
@@ -388,12 +415,66 @@ class Node(Serializable):
         """Called when this `Node` has been marked as `Invalid`. This method is supposed to be overridden"""
         pass
 
-    def eval(self, ):
+    def eval(self, force: bool = False):
         """Evaluate this `Node`. This method is supposed to be overriden."""
         self.markDirty(False)
         self.markInvalid(False)
         return 0
 
+    def prepareEval(self, force: bool = False):
+        """Prepare the evaluation of this `Node` in the GUI thread. This method is supposed to be overriden.
+
+        Used by the :class:`~node_editor.node_scene_evaluator.SceneEvaluator` when evaluating in parallel.
+        By default, this `Node` is evaluated right away.
+
+        Parameters
+        ----------
+        force : bool
+            ``True`` if the evaluation of this `Node` is forced
+
+        Returns
+        -------
+        callable or None
+            job to run in a worker thread, its result is given to
+            :py:meth:`~node_editor.node_node.Node.finishEval`. None if there is nothing left to compute.
+        """
+        if force:
+            self.eval(force=True)
+        else:
+            self.eval()
+        return None
+
+    def finishEval(self, value):
+        """Called in the GUI thread with the result of the job returned by
+        :py:meth:`~node_editor.node_node.Node.prepareEval`. This method is supposed to be overriden."""
+        self.markDirty(False)
+        self.markInvalid(False)
+        return value
+
+    def failEval(self, exception: Exception):
+        """Called in the GUI thread when the job returned by :py:meth:`~node_editor.node_node.Node.prepareEval`
+        raised `exception`. This method is supposed to be overriden."""
+        self.markInvalid()
+        self.setToolTip(str(exception))
+        dumpException(exception)
+
+    def getOutputFingerprint(self):
+        """Returns a digest of the current output of this `Node`. This method is supposed to be overriden.
+
+        Used by the :class:`~node_editor.node_scene_evaluator.SceneEvaluator` to stop the evaluation at the
+        `Nodes` whose output did not change. None means that the output is unknown, it is then always
+        considered as changed.
+        """
+        return None
+
+    def getResultKey(self):
+        """Returns the key under which the current output of this `Node` is stored in the cache of the `Scene`,
+        None if it is not. This method is supposed to be overriden.
+
+        Used by :py:meth:`~node_editor.node_scene.Scene.saveToFile` to save the outputs along with the graph.
+        """
+        return None
+
     # traversing nodes functions
 
     def evalChildren(self):
@@ -419,6 +500,32 @@ class Node(Serializable):
                 other_nodes.append(other_node)
         return other_nodes
 
+    def getParentNodes(self):
+        """Retrieve all first-level parents connected to this `Node` `Inputs`
+
+        Returns
+        -------
+        List[:class:`~nodeeditor.node_node.Node`]
+            list of `Nodes` connected to this `Node` from all `Inputs`
+
+        """
+        other_nodes = []
+        for input_socket in self.inputs:
+            for edge in input_socket.edges:
+                other_node = edge.getOtherSocket(input_socket).node
+                other_nodes.append(other_node)
+        return other_nodes
+
+    def getDescendantNodes(self):
+        """Retrieve all the descendants of this `Node`, each of them only once. Not this `Node` it self
+
+        Returns
+        -------
+        List[:class:`~nodeeditor.node_node.Node`]
+            list of `Nodes` reachable from this `Node` `Outputs`, in breadth first order
+        """
+        return self.scene.evaluator.collectDescendants(self.getChildrenNodes())
+
     def getInput(self, index: int = 0) -> Union['Node', None]:
         """Get the **first** `Node` connected to the Input specified by index
 
@@ -536,7 +643,8 @@ class Node(Serializable):
             hashmap[data['id']] = self
 
             self.setPos(data['pos_x'], data['pos_y'])  # Restore the position of the node
-            self.title = data['title']  # Restore the title
+            if self.title != data['title']:
+                self.title = data['title']  # Restore the title
             if 'width' in data:
                 self.width = data['width']
             if 'height' in data:
@@ -552,13 +660,9 @@ class Node(Serializable):
             num_outputs = len(data['outputs'])
 
             # Restore the Socket, either instantiate a new Socket or update existing one when found
+            inputs = {socket.index: socket for socket in reversed(self.inputs)}
             for socket_data in data['inputs']:
-                found = None
-                for socket in self.inputs:
-                    if socket.index == socket_data['index']:
-                        found = socket
-                        break
-
+                found = inputs.get(socket_data['index'])
                 if found is None:
                     found = self.__class__.Socket_class(
                         node=self, index=socket_data['index'],
@@ -569,12 +673,9 @@ class Node(Serializable):
                     self.inputs.append(found)
                 found.deserialize(socket_data, hashmap, restore_id)
 
+            outputs = {socket.index: socket for socket in reversed(self.outputs)}
             for socket_data in data['outputs']:
-                found = None
-                for socket in self.outputs:
-                    if socket.index == socket_data['index']:
-                        found = socket
-                        break
+                found = outputs.get(socket_data['index'])
                 if found is None:
                     found = self.__class__.Socket_class(
                         node=self, index=socket_data['index'],
@@ -1,6 +1,5 @@
 # -*- encoding: utf-8 -*-
 """Module containing the representation of the NodeEditor's Scene"""
-import json
 import os
 from PyQt5.QtCore import QPointF, QPoint
 from collections import OrderedDict
@@ -11,17 +10,20 @@ from .node_node import Node
 from .node_edge import Edge
 from .node_scene_history import SceneHistory
 from .node_scene_clipboard import SceneClipboard
-from typing import TYPE_CHECKING, Union, Type
+from .node_scene_evaluator import SceneEvaluator
+from .node_scene_cache import ResultCache
+from .node_scene_autosave import SceneAutosave
+from .node_scene_file import InvalidFile, loadData, saveData
+from typing import TYPE_CHECKING, Dict, List, Optional, Union, Type
 
 if TYPE_CHECKING:
     from .node_graphics_view import NodeGraphicsView
+    from .node_socket import Socket
     from PyQt5.QtWidgets import QGraphicsItem
 
 DEBUG = False
-
-
-class InvalidFile(Exception):
-    pass
+# suffix of the directory where the outputs of the Nodes are saved, next to the file of the graph
+RESULTS_SUFFIX = '.results'
 
 
 class Scene(Serializable):
@@ -32,8 +34,14 @@ class Scene(Serializable):
         Instance Attributes
          - **nodes** - list of `Nodes` in thi `Scene`
          - **edges** - list of `Edges` in this `Scene`
+         - **_node_index**, **_edge_index**, **_socket_index** - `Nodes`, `Edges` and `Sockets` by id
          - **history** - Instance of :class:`~node_editor.node_scene_history.SceneHistory`
          - **clipboard** - Instance of :class:`~node_editor.node_scene_clipboard.SceneClipboard`
+         - **evaluator** - Instance of :class:`~node_editor.node_scene_evaluator.SceneEvaluator`
+         - **cache** - Instance of :class:`~node_editor.node_scene_cache.ResultCache`
+         - **autosave** - Instance of :class:`~node_editor.node_scene_autosave.SceneAutosave`
+         - **save_results** - if ``True``, the outputs of the `Nodes` are saved next to the file of the graph,
+           see :py:meth:`~node_editor.node_scene.Scene.saveToFile`
          - **scene_width** - `Scene` width in pixels
          - **scene_height** - `Scene` height in pixels
         """
@@ -41,10 +49,17 @@ class Scene(Serializable):
         # init attributes
         self.grScene: Union[GraphicsScene, None] = None
 
-        self.nodes = []
-        self.edges = []
+        # nodes and edges in the order they were added, stored as keys for constant time removal
+        self._nodes: Dict[Node, None] = {}
+        self._edges: Dict[Edge, None] = {}
+        self._nodes_list: Optional[List[Node]] = None
+        self._edges_list: Optional[List[Edge]] = None
+        self._node_index: Dict[int, Node] = {}
+        self._edge_index: Dict[int, Edge] = {}
+        self._socket_index: Dict[int, 'Socket'] = {}
         self.scene_width = 64000
         self.scene_height = 64000
+        self.save_results = False
 
         # custom flag used to suppress triggering onItemSelected which does a bunch of stuff
         self._silent_selection_events = False
@@ -63,10 +78,27 @@ class Scene(Serializable):
         self.initUI()
         self.history = SceneHistory(self)
         self.clipboard = SceneClipboard(self)
+        self.evaluator = SceneEvaluator(self)
+        self.cache = ResultCache(self)
+        self.autosave = SceneAutosave(self)
 
         self.grScene.itemSelected.connect(self.onItemSelected)
         self.grScene.itemsDeselected.connect(self.onItemsDeselected)
 
+    @property
+    def nodes(self) -> List[Node]:
+        """`Nodes` of this `Scene` in the order they were added. The list must not be modified"""
+        if self._nodes_list is None:
+            self._nodes_list = list(self._nodes)
+        return self._nodes_list
+
+    @property
+    def edges(self) -> List[Edge]:
+        """`Edges` of this `Scene` in the order they were added. The list must not be modified"""
+        if self._edges_list is None:
+            self._edges_list = list(self._edges)
+        return self._edges_list
+
     @property
     def has_been_modified(self):
         """Has this `Scene` been modified
@@ -131,7 +163,7 @@ class Scene(Serializable):
         if current_selected_items != self._last_selected_items:
             self._last_selected_items = current_selected_items
             if not silent:
-                self.history.storeHistory('Selection Changed')
+                self.history.storeSelection('Selection Changed')
                 for callback in self._item_selected_listeners:
                     callback()
 
@@ -159,7 +191,7 @@ class Scene(Serializable):
             if not current_selected_items:
                 self._last_selected_items = None
                 if not silent:
-                    self.history.storeHistory('Deselected Everything')
+                    self.history.storeSelection('Deselected Everything')
                     for callback in self._items_deselected_listeners:
                         callback()
         except Exception as e:
@@ -317,11 +349,15 @@ class Scene(Serializable):
         -------
         `Node` or None
         """
-        for node in self.nodes:
-            if node.id == node_id:
-                return node
+        return self._node_index.get(node_id)
+
+    def getEdgeByID(self, edge_id: int) -> Union[Edge, None]:
+        """Find edge in the scene according to provided `edge_id` (edge.id), None if not found"""
+        return self._edge_index.get(edge_id)
 
-        return None
+    def getSocketByID(self, socket_id: int) -> Union['Socket', None]:
+        """Find socket of a node of the scene according to provided `socket_id` (socket.id), None if not found"""
+        return self._socket_index.get(socket_id)
 
     def doDeselectItems(self, silent: bool = False) -> None:
         """Deselects everything in scene
@@ -342,36 +378,82 @@ class Scene(Serializable):
 
     def addNode(self, node: Node):
         """Append node to the list of nodes"""
-        self.nodes.append(node)
+        self._nodes[node] = None
+        self._nodes_list = None
+        self._node_index[node.id] = node
+        self.history.markChanged(node)
 
     def addEdge(self, edge: Edge):
         """Append edge to the list of edges"""
-        self.edges.append(edge)
+        self._edges[edge] = None
+        self._edges_list = None
+        self._edge_index[edge.id] = edge
+        self.history.markChanged(edge)
+
+    def addSocket(self, socket: 'Socket'):
+        """Index the socket of a node by its id"""
+        self._socket_index[socket.id] = socket
 
     def removeNode(self, node: Node):
-        """Remove node from the list of nodes"""
-        if node in self.nodes:
-            self.nodes.remove(node)
+        """Remove node from the list of nodes, as well as its sockets"""
+        if node in self._nodes:
+            del self._nodes[node]
+            self._nodes_list = None
+            self._unindex(self._node_index, node, node.id)
+            for socket in node.inputs + node.outputs:
+                self.removeSocket(socket)
+            self.history.markChanged(node)
         else:
             print('!W', 'Scene:removeNode', 'wanna remove edge', node, 'from self.nodes but it is not in the list!')
 
     def removeEdge(self, edge: Edge):
         """Remove edge from the list of edges"""
-        if edge in self.edges:
-            self.edges.remove(edge)
+        if edge in self._edges:
+            del self._edges[edge]
+            self._edges_list = None
+            self._unindex(self._edge_index, edge, edge.id)
+            self.history.markChanged(edge)
         else:
             print('!W', 'Scene:removeEdge', 'wanna remove edge', edge, 'from self.edges but it is not in the list!')
 
+    def removeSocket(self, socket: 'Socket'):
+        """Remove the socket from the index of the sockets"""
+        self._unindex(self._socket_index, socket, socket.id)
+
+    def reindex(self, item: Union[Node, Edge, 'Socket'], old_id: int):
+        """Update the indexes when the id of `item` changed, typically restored by deserialize"""
+        if isinstance(item, Node):
+            index = self._node_index
+        elif isinstance(item, Edge):
+            index = self._edge_index
+        else:
+            index = self._socket_index
+        if index.get(old_id) is item:
+            del index[old_id]
+            index[item.id] = item
+
+    @staticmethod
+    def _unindex(index: dict, item: Union[Node, Edge, 'Socket'], item_id: int):
+        # another item may have been given the same id meanwhile
+        if index.get(item_id) is item:
+            del index[item_id]
+
     def clear(self):
         """Clear the scene by calling remove() on all the nodes"""
-        while len(self.nodes) > 0:
-            self.nodes[0].remove()
+        for node in list(self._nodes):
+            node.remove()
 
         self.has_been_modified = False
 
     def saveToFile(self, filename: str):
         """Save current graph to filename.
 
+        The format is given by the extension of `filename`, see :py:func:`~node_editor.node_scene_file.getFileFormat`
+
+        If `save_results` is set, the outputs of the `Nodes` are written to a directory next to `filename`, the
+        file of the graph keeps their keys. They are read back only when needed once the graph is reopened, as long
+        as the keys of the `Nodes`, that is their settings and inputs, did not change.
+
         Parameters
         ----------
         filename: str
@@ -380,26 +462,48 @@ class Scene(Serializable):
         -------
         None
         """
-        with open(filename, 'w') as file:
-            serialized = self.serialize()
-            file.write(json.dumps(serialized, indent=4))
-            self.print('saving to ', filename, ' was successful')
+        data = self.serialize()
+        if self.save_results:
+            results = self.saveResults(filename)
+            if results['snapshots']:
+                data['results'] = results
+        saveData(data, filename)
+        self.print('saving to ', filename, ' was successful')
 
-            self.has_been_modified = False
+        self.has_been_modified = False
+
+    def saveResults(self, filename: str) -> dict:
+        """Write the current outputs of the `Nodes` next to `filename`, see
+        :py:meth:`~node_editor.node_scene_cache.ResultCache.saveSnapshots`
+
+        Returns
+        -------
+        dict
+            directory of the outputs, relative to the file of the graph, and description of each output
+        """
+        directory = os.path.basename(filename) + RESULTS_SUFFIX
+        keys = [key for key in (node.getResultKey() for node in self.nodes) if key is not None]
+        snapshots = self.cache.saveSnapshots(os.path.join(os.path.dirname(filename), directory), keys)
+        return {'directory': directory, 'snapshots': snapshots}
 
     def loadFromFile(self, filename):
-        """Load graph from filename"""
-        with open(filename, 'r') as file:
-            raw_data = file.read()
-            # data = json.loads(raw_data, encoding='utf-8')  # python 3.9 suppression de encoding
-            try:
-                data = json.loads(raw_data)
-                self.deserialize(data)
-                self.has_been_modified = False
-            except json.JSONDecodeError:
-                raise InvalidFile(f'{os.path.basename(filename)} is not a valid JSON file')
-            except Exception as e:
-                dumpException(e)
+        """Load graph from filename, in the format given by its extension
+
+        Raises
+        ------
+        InvalidFile
+            if the content of the file does not match its format
+        """
+        data = loadData(filename)
+        try:
+            if 'results' in data:
+                directory = os.path.join(os.path.dirname(filename), data['results']['directory'])
+                self.cache.addSnapshots(directory, data['results']['snapshots'])
+            self.deserialize(data)
+            self.autosave.invalidate()
+            self.has_been_modified = False
+        except Exception as e:
+            dumpException(e)
 
     def serialize(self):
         """Serialize the scene.
@@ -421,66 +525,98 @@ class Scene(Serializable):
                             ])
 
     def deserialize(self, data: dict, hashmap: Union[dict, None] = None, restore_id: bool = True) -> bool:
+        """Update the scene to match `data`.
+
+        Nodes and edges of the scene are matched to their serialized data by id in a single pass over `data` :
+        those found are updated, the missing ones are created and the ones left are removed.
+        """
         hashmap = {}
         if restore_id:
             self.id = data['id']
         try:
-            # get list of current nodes
-            all_nodes = self.nodes.copy()
+            # nodes of the scene by id, the ones left once the data is read were not in the graph before
+            nodes_by_id = {node.id: node for node in self.nodes}
+            extra_nodes = dict.fromkeys(self.nodes)
 
-            # go through deserialized nodes
             for node_data in data['nodes']:
-                # can we find this node in the scene ?
-                found: Union[Node, bool] = False
-                for node in all_nodes:
-                    if node.id == node_data['id']:
-                        found = node
-                        break
-                # Either create a new node or replace the old one
-                if not found:
-                    new_node = self.getNodeClassFromData(node_data)(self)
-                    new_node.deserialize(node_data, hashmap, restore_id)
-                    new_node.onDeserialized(node_data)
+                # Either update the existing node or create a new one
+                node = nodes_by_id.pop(node_data['id'], None)
+                if node is None:
+                    node = self.getNodeClassFromData(node_data)(self)
                 else:
-                    found.deserialize(node_data, hashmap, restore_id)
-                    found.onDeserialized(node_data)
-                    all_nodes.remove(found)
-
-            # remove nodes which are left in the scene but were not in the serialized data...
-            # meaning that they were not in the graph before
-            while all_nodes:
-                node = all_nodes.pop()
+                    del extra_nodes[node]
+                node.deserialize(node_data, hashmap, restore_id)
+                node.onDeserialized(node_data)
+
+            for node in extra_nodes:
                 node.remove()
-                print('Scene::deserialize Removing extra nodes from scene')
+                self.print('deserialize : removing extra node', node)
 
-            all_edges = self.edges.copy()
+            edges_by_id = {edge.id: edge for edge in self.edges}
+            extra_edges = dict.fromkeys(self.edges)
 
             for edge_data in data['edges']:
-                # can we find this edge in the scene ?
-                found = False
-                for edge in all_edges:
-                    if edge.id == edge_data['id']:
-                        found = edge
-                        break
-                # Either create a new node or replace the old one
-                if not found:
-                    new_edge = Edge(self).deserialize(edge_data, hashmap, restore_id)
+                edge = edges_by_id.pop(edge_data['id'], None)
+                if edge is None:
+                    edge = Edge(self)
                 else:
-                    found.deserialize(edge_data, hashmap, restore_id)
-                    all_edges.remove(found)
+                    del extra_edges[edge]
+                edge.deserialize(edge_data, hashmap, restore_id)
 
-            while all_edges:
-                edge = all_edges.pop()
+            for edge in extra_edges:
                 edge.remove()
-                print('Scene::deserialize Removing extra edges from scene')
+                self.print('deserialize : removing extra edge', edge)
 
-            print("Scene holding {} items".format(len(self.grScene.items())))
+            self.print("Scene holding {} items".format(len(self.grScene.items())))
 
         except Exception as e:
             dumpException(e)
 
         return True
 
+    def applyChanges(self, nodes: Dict[int, Optional[dict]], edges: Dict[int, Optional[dict]]):
+        """Update, create or remove the given nodes and edges, the rest of the scene is left untouched.
+
+        Parameters
+        ----------
+        nodes : Dict[int, Optional[dict]]
+            serialized data of the nodes by id, None for the nodes to remove
+        edges : Dict[int, Optional[dict]]
+            serialized data of the edges by id, None for the edges to remove
+        """
+        try:
+            for edge_id, edge_data in edges.items():
+                edge = self.getEdgeByID(edge_id)
+                if edge_data is None and edge is not None:
+                    edge.remove()
+            for node_id, node_data in nodes.items():
+                node = self.getNodeByID(node_id)
+                if node_data is None and node is not None:
+                    node.remove()
+
+            hashmap = {}
+            for node_id, node_data in nodes.items():
+                if node_data is None:
+                    continue
+                node = self.getNodeByID(node_id)
+                if node is None:
+                    node = self.getNodeClassFromData(node_data)(self)
+                node.deserialize(node_data, hashmap)
+                node.onDeserialized(node_data)
+
+            for edge_id, edge_data in edges.items():
+                if edge_data is None:
+                    continue
+                edge = self.getEdgeByID(edge_id)
+                if edge is None:
+                    edge = Edge(self)
+                # the sockets may belong to nodes which did not change
+                sockets = {socket_id: self.getSocketByID(socket_id) for socket_id in (edge_data['start'],
+                                                                                       edge_data['end'])}
+                edge.deserialize(edge_data, sockets)
+        except Exception as e:
+            dumpException(e)
+
     def print(self, *args):
         if DEBUG:
             print('>Scene :', *args)
@@ -0,0 +1,252 @@
+# -*- encoding: utf-8 -*-
+"""Module containing the periodic background save of the NodeEditor's Scene"""
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from .node_scene_file import saveData
+from .utils import dumpException
+from typing import TYPE_CHECKING, Dict, Optional, Union
+
+if TYPE_CHECKING:
+    from .node_scene import Scene
+    from .node_node import Node
+    from .node_edge import Edge
+
+DEBUG = False
+
+# default delay between two autosaves, in ms
+DEFAULT_INTERVAL = 60000
+
+
+class AutosaveSignals(QObject):
+    """Signals used to bring back the completion of the writes from the worker thread to the GUI thread"""
+    jobDone = pyqtSignal(object)
+
+
+class SceneAutosave:
+    """Class saving a :class:`~node_editor.node_scene.Scene` periodically to a backup file, in a background thread
+
+    The serialized data of each `Node` and `Edge` is kept as JSON text between autosaves. `Nodes` and `Edges`
+    report their changes through :py:meth:`~node_editor.node_scene_history.SceneHistory.markChanged`, only these
+    ones are serialized again, in the GUI thread. The text of the other ones is immutable, it is shared as is
+    with the worker thread, which builds the file and writes it to a temporary file renamed over the backup:
+    the backup is never left half written.
+
+    Timings are kept in the instance attributes, see :py:meth:`~node_editor.node_scene_autosave.SceneAutosave.getMetrics`.
+    """
+
+    def __init__(self, scene: 'Scene'):
+        """
+        Instance Attributes
+         - **scene** - reference to the :class:`~node_editor.node_scene.Scene`
+         - **path** - path of the backup file, its extension gives the format, None if autosave is disabled
+         - **interval** - delay between two autosaves in ms
+         - **saves** - number of backups written
+         - **failures** - number of backups which failed to be written
+         - **serialized_items** - number of `Nodes` and `Edges` serialized by the last snapshot
+         - **snapshot_seconds** - time spent in the GUI thread by the last snapshot
+         - **write_seconds** - time spent in the worker thread by the last write
+         - **total_snapshot_seconds**, **total_write_seconds** - cumulated timings
+         - **written_bytes** - size of the last backup
+         - **last_save_time** - time of the last backup, as returned by ``time.time``
+        """
+        self.scene = scene
+        self.path: Optional[str] = None
+        self.interval = DEFAULT_INTERVAL
+        self.saves = 0
+        self.failures = 0
+        self.serialized_items = 0
+        self.snapshot_seconds = 0.
+        self.write_seconds = 0.
+        self.total_snapshot_seconds = 0.
+        self.total_write_seconds = 0.
+        self.written_bytes = 0
+        self.last_save_time: Optional[float] = None
+
+        # JSON text of the nodes and edges at the last snapshot
+        self._serialized: Dict[Union['Node', 'Edge'], str] = {}
+        # nodes and edges changed since the last snapshot
+        self._changed: Dict[Union['Node', 'Edge'], None] = {}
+        # the scene changed since the last backup
+        self._modified = False
+        self._running: Optional[Future] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._autosaved_listeners = []
+
+        self.signals = AutosaveSignals()
+        self.signals.jobDone.connect(self.onJobDone, Qt.QueuedConnection)
+        self._timer = QTimer()
+        self._timer.timeout.connect(self.autosave)
+
+        self.scene.history.addItemChangedListener(self.markChanged)
+
+    def addAutosavedListener(self, callback):
+        """`callback` is called with the path of the backup once it is written"""
+        self._autosaved_listeners.append(callback)
+
+    def isEnabled(self) -> bool:
+        return self._timer.isActive()
+
+    def start(self, path: str, interval: Optional[int] = None):
+        """Save the scene to `path` every `interval` ms, the current `interval` if None
+
+        Parameters
+        ----------
+        path : str
+            path of the backup file, in the format given by its extension, see
+            :py:func:`~node_editor.node_scene_file.getFileFormat`
+        interval : Optional[int]
+            delay between two autosaves in ms
+        """
+        if path != self.path:
+            self.discard()
+        self.path = path
+        if interval is not None:
+            self.interval = interval
+        self._modified = True
+        self._timer.start(self.interval)
+
+    def stop(self):
+        """Stop saving the scene, the backup file is kept"""
+        self._timer.stop()
+
+    def markChanged(self, item: Union['Node', 'Edge']):
+        """`item` changed since the last snapshot, it is serialized again on the next autosave"""
+        self._changed[item] = None
+        self._modified = True
+
+    def invalidate(self):
+        """Serialize every `Node` and `Edge` again on the next autosave, used when the whole scene was loaded"""
+        self._serialized.clear()
+        self._changed.clear()
+        self._modified = True
+
+    def snapshot(self) -> OrderedDict:
+        """Returns the serialized scene, with the `Nodes` and `Edges` as JSON text.
+
+        Only the items changed since the previous snapshot are serialized, the text of the others is reused.
+        """
+        for item in self._changed:
+            self._serialized.pop(item, None)
+        self._changed.clear()
+
+        serialized = 0
+        texts = {}
+        for key, items in (('nodes', self.scene.nodes), ('edges', self.scene.edges)):
+            texts[key] = []
+            for item in items:
+                text = self._serialized.get(item)
+                if text is None:
+                    text = self._serialized[item] = json.dumps(item.serialize())
+                    serialized += 1
+                texts[key].append(text)
+        self.serialized_items = serialized
+        return OrderedDict([('id', self.scene.id),
+                            ('scene_width', self.scene.scene_width),
+                            ('scene_height', self.scene.scene_height),
+                            ('nodes', texts['nodes']),
+                            ('edges', texts['edges'])
+                            ])
+
+    def autosave(self, force: bool = False):
+        """Snapshot the scene and write it to the backup file in the worker thread
+
+        Nothing is done if the scene did not change since the last backup, unless `force`, or while the previous
+        backup is being written.
+        """
+        if self.path is None or self._running is not None or not (self._modified or force):
+            return
+        start = time.perf_counter()
+        try:
+            data = self.snapshot()
+        except Exception as e:
+            dumpException(e)
+            self.failures += 1
+            return
+        self._modified = False
+        self.snapshot_seconds = time.perf_counter() - start
+        self.total_snapshot_seconds += self.snapshot_seconds
+        self.print('snapshot of', self.serialized_items, 'items in', self.snapshot_seconds)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='SceneAutosave')
+        self._running = self._executor.submit(self.writeBackup, data, self.path)
+        self._running.add_done_callback(self.signals.jobDone.emit)
+
+    @staticmethod
+    def writeBackup(data: OrderedDict, path: str) -> tuple:
+        """Write the snapshot `data` to `path`, through a temporary file renamed once written. Run in the worker thread
+
+        Returns
+        -------
+        tuple
+            time spent and size of the file
+        """
+        start = time.perf_counter()
+        data['nodes'] = [json.loads(text) for text in data['nodes']]
+        data['edges'] = [json.loads(text) for text in data['edges']]
+        # same extension, hence same format
+        temporary = os.path.join(os.path.dirname(path), '.tmp-' + os.path.basename(path))
+        try:
+            saveData(data, temporary)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return time.perf_counter() - start, os.path.getsize(path)
+
+    def onJobDone(self, future: Future):
+        """Record the timings of the write, in the GUI thread"""
+        if future is not self._running:
+            return
+        self._running = None
+        try:
+            self.write_seconds, self.written_bytes = future.result()
+        except Exception as e:
+            dumpException(e)
+            self.failures += 1
+            self._modified = True
+            return
+        self.saves += 1
+        self.total_write_seconds += self.write_seconds
+        self.last_save_time = time.time()
+        self.print('backup written in', self.write_seconds, self.written_bytes, 'bytes')
+        for callback in self._autosaved_listeners:
+            callback(self.path)
+
+    def getMetrics(self) -> dict:
+        """Returns the counters and timings of the autosaves"""
+        return {'saves': self.saves, 'failures': self.failures, 'serialized_items': self.serialized_items,
+                'snapshot_seconds': self.snapshot_seconds, 'write_seconds': self.write_seconds,
+                'total_snapshot_seconds': self.total_snapshot_seconds,
+                'total_write_seconds': self.total_write_seconds,
+                'written_bytes': self.written_bytes, 'last_save_time': self.last_save_time}
+
+    def wait(self):
+        """Wait for the backup being written, if any"""
+        if self._running is not None:
+            future = self._running
+            future.exception()
+            self.onJobDone(future)
+
+    def discard(self):
+        """Remove the backup file, for instance once the scene was saved"""
+        self.wait()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self._modified = True
+
+    def close(self):
+        """Stop saving the scene, remove the backup file and release the worker thread"""
+        self.stop()
+        self.discard()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def print(self, *args):
+        if DEBUG:
+            print('>SceneAutosave :', *args)
@@ -0,0 +1,538 @@
+# -*- encoding: utf-8 -*-
+"""Module containing the memoization layer of the results computed in the NodeEditor's Scene"""
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .utils import dumpException
+from .node_scene_snapshot import UnsupportedValue, readSnapshot, writeSnapshot
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .node_scene import Scene
+
+DEBUG = False
+
+# default memory budget of the cache, in bytes
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+# a fingerprint hashes FINGERPRINT_BLOCKS blocks of FINGERPRINT_BLOCK_ROWS rows, evenly spread over the result
+FINGERPRINT_BLOCK_ROWS = 64
+FINGERPRINT_BLOCKS = 32
+
+
+def makeKey(*parts) -> Optional[str]:
+    """Returns a digest identifying `parts`.
+
+    Parameters
+    ----------
+    parts
+        json serializable description of a computation, typically the op_code, the node settings and the keys
+        of the inputs
+
+    Returns
+    -------
+    Optional[str]
+        hexadecimal digest or None if `parts` can not be described
+    """
+    try:
+        description = json.dumps(parts, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+def isSampled(value: Any) -> bool:
+    """Returns ``True`` if the fingerprint of `value` only hashes some of its rows, see :py:func:`fingerprint`"""
+    return len(value) > FINGERPRINT_BLOCK_ROWS * FINGERPRINT_BLOCKS
+
+
+def fingerprint(value: Any, full: bool = False) -> Optional[str]:
+    """Returns a digest of the content of `value`.
+
+    Unless `full`, only blocks of rows evenly spread over a large `value`, the first and the last ones included,
+    are hashed along with its shape, its labels and its types: values with the same fingerprint may differ in the
+    other rows, see :py:meth:`~node_editor.node_scene_cache.ResultCache.fingerprintJob`.
+
+    Parameters
+    ----------
+    value: Any
+        pandas object
+    full: bool
+        if ``True``, every row is hashed
+
+    Returns
+    -------
+    Optional[str]
+        hexadecimal digest or None if the content of `value` can not be hashed
+    """
+    if not isinstance(value, (pd.DataFrame, pd.Series)):
+        return None
+    sample = value
+    if not full and isSampled(value):
+        starts = np.linspace(0, len(value) - FINGERPRINT_BLOCK_ROWS, FINGERPRINT_BLOCKS).astype(int)
+        sample = value.iloc[(starts[:, None] + np.arange(FINGERPRINT_BLOCK_ROWS)).ravel()]
+    try:
+        hashed = pd.util.hash_pandas_object(sample, index=True).values
+    except TypeError:
+        # unhashable cells such as lists
+        return None
+    digest = hashlib.sha1(hashed.tobytes())
+    digest.update(repr(value.shape).encode('utf-8'))
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode('utf-8'))
+        digest.update(repr(list(value.dtypes)).encode('utf-8'))
+    else:
+        digest.update(repr((value.name, value.dtype)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def sizeOf(value: Any) -> int:
+    """Returns the memory used by `value` in bytes, including the content of object columns"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Class memoizing the results of the `Nodes` of a :class:`~node_editor.node_scene.Scene`
+
+    Results are stored under a key describing the computation, see :py:func:`makeKey`, so that any `Node`
+    running the same operation with the same settings on the same inputs reuses them, for instance after
+    an undo or when a setting is toggled back. Least recently used results are evicted once the memory
+    budget is exceeded.
+
+    When a spill directory is set, evicted results are written to disk instead of being dropped and are
+    loaded back on the next lookup, see :py:meth:`~node_editor.node_scene_cache.ResultCache.setSpillDirectory`.
+
+    Results saved with a graph are registered as snapshots, read on their first lookup, see
+    :py:meth:`~node_editor.node_scene_cache.ResultCache.addSnapshots`.
+    """
+
+    def __init__(self, scene: 'Scene', max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Instance Attributes
+         - **scene** - reference to the :class:`~node_editor.node_scene.Scene`
+         - **max_bytes** - memory budget in bytes
+         - **used_bytes** - memory currently used by the stored results
+         - **spill_directory** - directory where evicted results are written, None if spilling is disabled
+         - **spilled_bytes** - disk space used by the spilled results
+         - **hits** - number of successful lookups
+         - **misses** - number of failed lookups
+        """
+        self.scene = scene
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.spill_directory: Optional[str] = None
+        self.spilled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, size), ordered from the least to the most recently used
+        self._entries = OrderedDict()
+        # key -> (path, size) of the results written to disk
+        self._spilled = OrderedDict()
+        # key -> path of the results saved with the graph, these files do not belong to the cache
+        self._snapshots = {}
+        # key -> fingerprint of the content of the result
+        self._fingerprints = {}
+        # id of a result without key -> (reference to the result, fingerprint), see fingerprintJob
+        self._value_fingerprints: Dict[int, Tuple[weakref.ref, Optional[str]]] = {}
+        self._owns_spill_directory = False
+
+    def __len__(self):
+        return len(self._entries) + len(self._spilled) + len(self._snapshots)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries or key in self._spilled or key in self._snapshots
+
+    def hasSnapshots(self) -> bool:
+        """Returns ``True`` if results saved with the graph are registered"""
+        return bool(self._snapshots)
+
+    def isSnapshot(self, key: Optional[Hashable]) -> bool:
+        """Returns ``True`` if the result stored under `key` is a snapshot which has not been read yet"""
+        return key in self._snapshots and key not in self._entries and key not in self._spilled
+
+    def isSpilling(self) -> bool:
+        """Returns ``True`` if evicted results are written to disk"""
+        return self.spill_directory is not None
+
+    def setSpillDirectory(self, directory: Optional[str] = None):
+        """Write the evicted results to `directory` instead of dropping them
+
+        Parameters
+        ----------
+        directory : Optional[str]
+            directory of the spilled results. If None, a temporary directory is created, and removed by
+            :py:meth:`~node_editor.node_scene_cache.ResultCache.close`
+        """
+        self.clearSpilled()
+        self._removeSpillDirectory()
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='node_editor_cache_')
+            self._owns_spill_directory = True
+            # in case the cache is not closed
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        self.spill_directory = directory
+
+    def setMaxBytes(self, max_bytes: int):
+        """Set the memory budget, evicting results if needed
+
+        Parameters
+        ----------
+        max_bytes : int
+            memory budget in bytes
+        """
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def get(self, key: Optional[Hashable], default: Any = None) -> Any:
+        """Returns the result stored under `key`, or `default` if there is none
+
+        A spilled result or a snapshot is loaded back in memory.
+
+        Parameters
+        ----------
+        key : Optional[Hashable]
+            key of the result, None is never found
+        default : Any
+            returned value if `key` is not found
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self.print('hit', key)
+            return self._entries[key][0]
+
+        if key in self._spilled:
+            value = self.load(key)
+        elif key in self._snapshots:
+            value = self.loadSnapshot(key)
+        else:
+            value = None
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def _forget(self, key: Hashable):
+        """Drop the fingerprint of `key` once no result is stored under it"""
+        if key not in self:
+            self._fingerprints.pop(key, None)
+
+    def put(self, key: Optional[Hashable], value: Any):
+        """Store `value` under `key`.
+
+        `value` is not stored if `key` is None or if it does not fit in the memory budget.
+
+        Parameters
+        ----------
+        key : Optional[Hashable]
+            key of the result
+        value : Any
+            result to store
+        """
+        if key is None or value is None:
+            return
+        self._remove(key)
+        size = sizeOf(value)
+        if size > self.max_bytes:
+            self.print('result too large to be cached', size)
+            self._forget(key)
+            return
+        self._entries[key] = (value, size)
+        self.used_bytes += size
+        self.evict()
+
+    def peek(self, key: Optional[Hashable]) -> Any:
+        """Returns the result stored in memory under `key`, None if there is none. Neither the order of the
+        results nor the counters are updated"""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def getFingerprint(self, key: Optional[Hashable], value: Any) -> Optional[str]:
+        """Returns the fingerprint of `value`, the result stored under `key`.
+
+        The fingerprint of a key is computed once, see :py:func:`fingerprint`. The fingerprint of a result without
+        key is the one computed by its job, if any, see
+        :py:meth:`~node_editor.node_scene_cache.ResultCache.fingerprintJob`.
+
+        Parameters
+        ----------
+        key : Optional[Hashable]
+            key of the result, if None the fingerprint is not memoized
+        value : Any
+            result
+        """
+        if key is None:
+            entry = self._value_fingerprints.get(id(value))
+            if entry is not None and entry[0]() is value:
+                return entry[1]
+            return fingerprint(value)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = fingerprint(value)
+        return self._fingerprints[key]
+
+    def fingerprintJob(self, key: Optional[Hashable], job: Callable[[], Any],
+                       previous: Optional[Tuple[Any, Optional[str]]] = None) -> Callable[[], Any]:
+        """Returns a job running `job` then computing the fingerprint of its result, in the same worker thread.
+
+        The fingerprint hashes a sample of the rows, see :py:func:`fingerprint`. Only when it is the one of the
+        `previous` result, which would stop the propagation of the changes, the whole content is compared: the
+        fingerprint of an identical result is the previous one, the one of a different result has the hash of
+        all its rows appended.
+
+        Parameters
+        ----------
+        key : Optional[Hashable]
+            key of the result of `job`, if None the fingerprint is kept along with the result, as long as it exists
+        job : Callable[[], Any]
+            job computing a result
+        previous : Optional[Tuple[Any, Optional[str]]]
+            previous result, None if it is not in memory, and its fingerprint
+        """
+        def fingerprintedJob():
+            value = job()
+            if key is not None:
+                if key not in self._fingerprints:
+                    self._fingerprints[key] = self._fingerprintAgainst(value, previous)
+            elif isinstance(value, (pd.DataFrame, pd.Series)):
+                reference = weakref.ref(value)
+                self._value_fingerprints[id(value)] = (reference, self._fingerprintAgainst(value, previous))
+                weakref.finalize(value, self._releaseFingerprint, id(value), reference)
+            return value
+        return fingerprintedJob
+
+    @staticmethod
+    def _fingerprintAgainst(value: Any, previous: Optional[Tuple[Any, Optional[str]]]) -> Optional[str]:
+        digest = fingerprint(value)
+        if digest is None or previous is None or previous[1] is None or not isSampled(value) or \
+                digest != previous[1].partition(':')[0]:
+            return digest
+        previous_value, previous_digest = previous
+        if previous_value is value or (type(previous_value) is type(value) and previous_value.equals(value)):
+            return previous_digest
+        full = fingerprint(value, full=True)
+        return None if full is None else digest + ':' + full
+
+    def _releaseFingerprint(self, key: int, reference: weakref.ref):
+        entry = self._value_fingerprints.get(key)
+        if entry is not None and entry[0] is reference:
+            del self._value_fingerprints[key]
+
+    def discard(self, key: Hashable):
+        """Remove the result stored under `key`, if any, and its fingerprint unless it is a snapshot"""
+        self._remove(key)
+        self._forget(key)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[1]
+        spilled = self._spilled.pop(key, None)
+        if spilled is not None:
+            self.spilled_bytes -= spilled[1]
+            self._removeFile(spilled[0])
+
+    def evict(self):
+        """Remove the least recently used results until the memory budget is met.
+
+        Results are written to the spill directory, if any.
+        """
+        while self.used_bytes > self.max_bytes and self._entries:
+            key, (value, size) = self._entries.popitem(last=False)
+            self.used_bytes -= size
+            self.print('evicting', key, size)
+            if self.isSpilling():
+                self.spill(key, value)
+            self._forget(key)
+
+    def spill(self, key: Hashable, value: Any):
+        """Write `value` to the spill directory.
+
+        Pickle protocol 5 keeps the buffers of the numpy blocks out of band, any pandas object is written
+        without conversion, whatever its index or the type of its column labels.
+        """
+        path = os.path.join(self.spill_directory, self._getFileName(key, '.pkl'))
+        try:
+            with open(path, 'wb') as file:
+                pickle.dump(value, file, protocol=5)
+        except Exception as e:
+            dumpException(e)
+            self._removeFile(path)
+            return
+        size = os.path.getsize(path)
+        self._spilled[key] = (path, size)
+        self.spilled_bytes += size
+
+    def load(self, key: Hashable) -> Any:
+        """Load the spilled result stored under `key` back in memory.
+
+        The result stays on disk if it does not fit in the memory budget.
+
+        Returns
+        -------
+        Any
+            the result, None if it could not be read
+        """
+        path, size = self._spilled[key]
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except Exception as e:
+            dumpException(e)
+            self.discard(key)
+            return None
+
+        self.print('loaded', key)
+        if sizeOf(value) <= self.max_bytes:
+            self.put(key, value)
+        return value
+
+    def addSnapshots(self, directory: str, snapshots: List[dict]):
+        """Register results saved with a graph, they are read on their first lookup.
+
+        Parameters
+        ----------
+        directory : str
+            directory of the snapshots
+        snapshots : List[dict]
+            description of the snapshots, as returned by
+            :py:meth:`~node_editor.node_scene_cache.ResultCache.saveSnapshots`
+        """
+        for snapshot in snapshots:
+            path = os.path.join(directory, snapshot['file'])
+            if os.path.exists(path):
+                self._snapshots[snapshot['key']] = path
+                self._fingerprints.setdefault(snapshot['key'], snapshot['fingerprint'])
+
+    def saveSnapshots(self, directory: str, keys: Iterable[Hashable]) -> List[dict]:
+        """Write the results stored under `keys` to `directory`, see :py:func:`~node_editor.node_scene_snapshot.writeSnapshot`
+
+        Files are named after the keys: a result already written to `directory` is kept as is. Files of results
+        no longer saved are removed. Results which are not available or can not be written are skipped.
+
+        Parameters
+        ----------
+        directory : str
+            directory of the snapshots, created if needed and removed once empty
+        keys : Iterable[Hashable]
+            keys of the results to save
+
+        Returns
+        -------
+        List[dict]
+            key, fingerprint and file name of each written result
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys and not os.path.isdir(directory):
+            return []
+        os.makedirs(directory, exist_ok=True)
+        snapshots = []
+        for key in keys:
+            name = self._getFileName(key, '.npz')
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                source = self._snapshots.get(key)
+                try:
+                    if source is not None and os.path.exists(source):
+                        shutil.copyfile(source, path)
+                    else:
+                        value = self.get(key)
+                        if value is None:
+                            continue
+                        writeSnapshot(value, path)
+                except UnsupportedValue as e:
+                    self.print('result not saved', key, e)
+                    continue
+                except Exception as e:
+                    dumpException(e)
+                    continue
+            snapshots.append({'key': key, 'fingerprint': self._fingerprints.get(key), 'file': name})
+
+        names = {snapshot['file'] for snapshot in snapshots}
+        for name in os.listdir(directory):
+            if name.endswith('.npz') and name not in names:
+                self._removeFile(os.path.join(directory, name))
+        if not snapshots:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        return snapshots
+
+    def loadSnapshot(self, key: Hashable) -> Any:
+        """Read the snapshot stored under `key`, see :py:func:`~node_editor.node_scene_snapshot.readSnapshot`
+
+        Returns
+        -------
+        Any
+            the result, None if it could not be read
+        """
+        try:
+            value = readSnapshot(self._snapshots[key])
+        except Exception as e:
+            dumpException(e)
+            del self._snapshots[key]
+            self._forget(key)
+            return None
+
+        self.print('snapshot loaded', key)
+        if sizeOf(value) <= self.max_bytes:
+            self.put(key, value)
+        return value
+
+    def clearSpilled(self):
+        """Remove the results written to disk"""
+        spilled, self._spilled = self._spilled, OrderedDict()
+        for key, (path, _) in spilled.items():
+            self._removeFile(path)
+            self._forget(key)
+        self.spilled_bytes = 0
+
+    def clear(self):
+        """Remove every stored result"""
+        self._entries.clear()
+        self._snapshots.clear()
+        self._fingerprints.clear()
+        self._value_fingerprints.clear()
+        self.used_bytes = 0
+        self.clearSpilled()
+
+    def close(self):
+        """Remove every stored result as well as the temporary spill directory"""
+        self.clear()
+        self._removeSpillDirectory()
+        self.spill_directory = None
+
+    def _removeSpillDirectory(self):
+        if self._owns_spill_directory and self.spill_directory is not None:
+            shutil.rmtree(self.spill_directory, ignore_errors=True)
+        self._owns_spill_directory = False
+
+    @staticmethod
+    def _getFileName(key: Hashable, extension: str) -> str:
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + extension
+
+    @staticmethod
+    def _removeFile(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def print(self, *args):
+        if DEBUG:
+            print('>ResultCache :', *args)
@@ -55,9 +55,9 @@ class SceneClipboard:
         ])
         # if CUT (delete=True), remove selected items
         if delete:
-            self.scene.getView().deleteSelected()
-            # store our history
-            self.scene.history.storeHistory('Cut out elements from scene to clipboard', setModified=True)
+            # store our history, in a single stamp
+            with self.scene.history.transaction('Cut out elements from scene to clipboard', setModified=True):
+                self.scene.getView().deleteSelected()
 
         return data
 
@@ -94,38 +94,37 @@ class SceneClipboard:
             print("\tbbox_center:", relbboxcenterx, relbboxcentery)
 
         created_nodes = []
-        self.scene.setSilentSelectionEvents()
-
-        self.scene.doDeselectItems()
-
-        # create each node
-        for node_data in datas['nodes']:
-            new_node = self.scene.getNodeClassFromData(node_data)(self.scene)
-            new_node.deserialize(node_data, hashmap, restore_id=False)
-            created_nodes.append(new_node)
-
-            # adjust the new node's position
-            posx, posy = new_node.pos.x(), new_node.pos.y()
-            newx, newy = mousex + posx - minx, mousey + posy - miny
-            new_node.setPos(newx, newy)
-
-            # do not trigger event as setSilentSelectionEvents was called
-            new_node.doSelect()
-
-            if DEBUG_PASTING:
-                print("** PASTA SUM:")
-                print("\tMouse pos:", mousex, mousey)
-                print("\tnew node pos:", posx, posy)
-                print("\tFINAL:", newx, newy)
-
-        # create each edge
-        for edge_data in datas['edges']:
-            new_edge = Edge(self.scene)
-            new_edge.deserialize(edge_data, hashmap, restore_id=False)
-
-        self.scene.setSilentSelectionEvents(False)
-
-        # store history
-        self.scene.history.storeHistory('Elements pasted from the clipboard', setModified=True)
+        # store history, the selection of the pasted nodes in the same stamp
+        with self.scene.history.transaction('Elements pasted from the clipboard', setModified=True):
+            self.scene.setSilentSelectionEvents()
+
+            self.scene.doDeselectItems()
+
+            # create each node
+            for node_data in datas['nodes']:
+                new_node = self.scene.getNodeClassFromData(node_data)(self.scene)
+                new_node.deserialize(node_data, hashmap, restore_id=False)
+                created_nodes.append(new_node)
+
+                # adjust the new node's position
+                posx, posy = new_node.pos.x(), new_node.pos.y()
+                newx, newy = mousex + posx - minx, mousey + posy - miny
+                new_node.setPos(newx, newy)
+
+                # do not trigger event as setSilentSelectionEvents was called
+                new_node.doSelect()
+
+                if DEBUG_PASTING:
+                    print("** PASTA SUM:")
+                    print("\tMouse pos:", mousex, mousey)
+                    print("\tnew node pos:", posx, posy)
+                    print("\tFINAL:", newx, newy)
+
+            # create each edge
+            for edge_data in datas['edges']:
+                new_edge = Edge(self.scene)
+                new_edge.deserialize(edge_data, hashmap, restore_id=False)
+
+            self.scene.setSilentSelectionEvents(False)
 
         return created_nodes
@@ -0,0 +1,413 @@
+# -*- encoding: utf-8 -*-
+"""Module containing the graph-level evaluation engine of the NodeEditor's Scene"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+from .utils import dumpException
+from typing import TYPE_CHECKING, Iterable, List, Union
+
+if TYPE_CHECKING:
+    from .node_scene import Scene
+    from .node_node import Node
+
+DEBUG = False
+
+
+class EvaluatorSignals(QObject):
+    """Signals used to bring back the completion of the jobs from the worker threads to the GUI thread"""
+    jobDone = pyqtSignal(object)
+
+
+class EvaluationRun:
+    """State of the evaluation of a set of `Nodes` on the thread pool"""
+
+    def __init__(self, ordered: List['Node'], forced: Iterable['Node'] = (), stale: Iterable['Node'] = None):
+        """
+        Instance Attributes
+         - **forced** - `Nodes` whose evaluation is forced
+         - **stale** - `Nodes` which have to be evaluated, the others only if the output of a parent changed
+         - **ready** - `Nodes` whose parents are all evaluated, waiting to be prepared
+         - **running** - dictionary of the submitted jobs, `Future` -> `Node`
+         - **failed** - `Nodes` which failed to evaluate
+         - **changed** - evaluated `Nodes` whose output changed
+         - **cancelled** - ``True`` when the run was superseded, the results of its jobs are discarded
+        """
+        self.forced = set(forced)
+        subset = set(ordered)
+        self.stale = subset if stale is None else set(stale)
+        self.parents = {node: set(parent for parent in node.getParentNodes() if parent in subset)
+                        for node in ordered}
+        self.children = {node: set(child for child in node.getChildrenNodes() if child in subset)
+                         for node in ordered}
+        self.remaining = {node: len(self.parents[node]) for node in ordered}
+        self.ready = deque(node for node in ordered if self.remaining[node] == 0)
+        self.running = {}
+        self.failed = set()
+        self.changed = set()
+        self.done = set()
+        self.cancelled = False
+        # output fingerprint of the nodes before their evaluation
+        self.fingerprints = {}
+
+    def isFinished(self) -> bool:
+        return not self.ready and not self.running
+
+    def needsEval(self, node: 'Node') -> bool:
+        """Returns ``True`` if `node` is stale or if the output of one of its parents changed"""
+        return node in self.stale or node in self.forced or bool(self.parents[node] & self.changed)
+
+    def start(self, node: 'Node'):
+        """`node` is about to be evaluated, keep track of its output"""
+        self.fingerprints[node] = node.getOutputFingerprint()
+
+    def release(self, node: 'Node'):
+        """`node` is evaluated, its children may now be ready"""
+        self.done.add(node)
+        if node.isDirty() or node.isInvalid():
+            self.failed.add(node)
+        elif node in self.fingerprints:
+            previous = self.fingerprints.pop(node)
+            if previous is None or previous != node.getOutputFingerprint():
+                self.changed.add(node)
+        for child in self.children[node]:
+            self.remaining[child] -= 1
+            if self.remaining[child] == 0:
+                self.ready.append(child)
+
+    def pendingNodes(self) -> List['Node']:
+        """Returns the `Nodes` which are not evaluated yet"""
+        return [node for node in self.remaining if node not in self.done]
+
+
+class SceneEvaluator:
+    """Class evaluating the `Nodes` of a :class:`~node_editor.node_scene.Scene`
+
+    Instead of letting each `Node` cascade the evaluation to its children, the evaluator collects the set of
+    `Nodes` affected by a change, orders it topologically once and evaluates each `Node` exactly once,
+    after all of its parents.
+
+    When more than one worker is allowed, `Nodes` which do not depend on each other are computed concurrently
+    on a thread pool, see :py:meth:`~node_editor.node_scene_evaluator.SceneEvaluator.setMaxWorkers`.
+
+    `Nodes` which were up to date before the evaluation are only evaluated again if the output of one of their
+    parents changed, see :py:meth:`~node_editor.node_node.Node.getOutputFingerprint`. The propagation stops at
+    the `Nodes` yielding an identical result.
+
+    In asynchronous mode, the evaluation methods return right away and the jobs complete in the background,
+    without blocking the GUI thread. A new evaluation supersedes the one in progress : the pending `Nodes` of the
+    previous run are evaluated again by the new one and the results of its stale jobs are discarded.
+    """
+
+    def __init__(self, scene: 'Scene'):
+        """
+        Instance Attributes
+         - **scene** - reference to the :class:`~node_editor.node_scene.Scene`
+         - **max_workers** - size of the thread pool. Evaluation is sequential when lower than 2
+         - **asynchronous** - if ``True``, jobs run in the background, see
+           :py:meth:`~node_editor.node_scene_evaluator.SceneEvaluator.setAsynchronous`
+        """
+        self.scene = scene
+        self.max_workers = 1
+        self.asynchronous = False
+        self._executor = None
+        self._current_run: Union[EvaluationRun, None] = None
+
+        self._signals = EvaluatorSignals()
+        # always queued, even when the job is already done at submission and the callback runs in the GUI thread
+        self._signals.jobDone.connect(self.onJobDone, Qt.QueuedConnection)
+
+    def setMaxWorkers(self, max_workers: int):
+        """Set the number of `Nodes` which can be computed concurrently
+
+        Parameters
+        ----------
+        max_workers : int
+            size of the thread pool. Evaluation is sequential in the GUI thread when lower than 2
+        """
+        if max_workers != self.max_workers:
+            self.shutdown()
+        self.max_workers = max_workers
+
+    def setAsynchronous(self, value: bool = True):
+        """Run the evaluation in the background instead of blocking the GUI thread
+
+        Parameters
+        ----------
+        value : bool
+            if ``True``, evaluation methods return right away and the `Nodes` are updated as their job complete.
+            There is at least one worker thread, even if `max_workers` is lower than 2.
+        """
+        if not value:
+            self.cancel()
+        self.asynchronous = value
+
+    def isRunning(self) -> bool:
+        """Returns ``True`` if an asynchronous evaluation is in progress"""
+        return self._current_run is not None
+
+    def getExecutor(self) -> ThreadPoolExecutor:
+        """Returns the thread pool, create it if needed"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers),
+                                                thread_name_prefix='SceneEvaluator')
+        return self._executor
+
+    def cancel(self) -> List['Node']:
+        """Cancel the asynchronous evaluation in progress.
+
+        Jobs which did not start are cancelled, the results of the running ones will be discarded.
+        `Nodes` which were not evaluated yet are left `Dirty`.
+
+        Returns
+        -------
+        List[Node]
+            `Nodes` of the cancelled run which were not evaluated
+        """
+        run = self._current_run
+        if run is None:
+            return []
+        self._current_run = None
+        run.cancelled = True
+        for future, node in run.running.items():
+            future.cancel()
+            node.markRunning(False)
+        run.running.clear()
+        return run.pendingNodes()
+
+    def shutdown(self):
+        """Release the thread pool, waiting for the running jobs"""
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def collectDescendants(self, nodes: Iterable['Node']) -> List['Node']:
+        """Returns `nodes` and all of their descendants, each `Node` only once
+
+        Parameters
+        ----------
+        nodes : Iterable[Node]
+            `Nodes` the traversal starts from
+
+        Returns
+        -------
+        List[Node]
+            `nodes` followed by their descendants in breadth first order
+        """
+        collected = []
+        visited = set()
+        queue = deque(nodes)
+        while queue:
+            node = queue.popleft()
+            if node in visited:
+                continue
+            visited.add(node)
+            collected.append(node)
+            queue.extend(node.getChildrenNodes())
+        return collected
+
+    def topologicalOrder(self, nodes: Iterable['Node']) -> List['Node']:
+        """Order `nodes` such that every `Node` comes after its parents.
+
+        Only the edges between `nodes` are considered. `Nodes` belonging to a cycle can not be ordered,
+        they are marked `Invalid` and left out of the result.
+
+        Parameters
+        ----------
+        nodes : Iterable[Node]
+            `Nodes` to order
+
+        Returns
+        -------
+        List[Node]
+            `nodes` in topological order
+        """
+        nodes = list(nodes)
+        subset = set(nodes)
+        in_degree = {node: 0 for node in nodes}
+        for node in nodes:
+            for child in node.getChildrenNodes():
+                if child in subset:
+                    in_degree[child] += 1
+
+        # keep the initial ordering of the nodes for the ones which are ready at the same time
+        queue = deque(node for node in nodes if in_degree[node] == 0)
+        ordered = []
+        while queue:
+            node = queue.popleft()
+            ordered.append(node)
+            for child in node.getChildrenNodes():
+                if child in subset:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        queue.append(child)
+
+        if len(ordered) != len(nodes):
+            for node in nodes:
+                if in_degree[node] > 0:
+                    print('!W', 'SceneEvaluator:topologicalOrder', node, 'is part of a cycle')
+                    node.markInvalid()
+                    node.setToolTip('Cycle detected')
+        return ordered
+
+    def evalNodes(self, nodes: Iterable['Node'], force: bool = False):
+        """Evaluate `nodes` and all of their descendants.
+
+        `nodes` and their descendants are marked `Dirty`, then evaluated once in topological order.
+        Descendants which were up to date are left untouched if their inputs did not change.
+
+        Parameters
+        ----------
+        nodes : Iterable[Node]
+            `Nodes` which changed
+        force : bool
+            if ``True``, evaluation of `nodes` themselves is forced. Descendants are evaluated normally.
+        """
+        nodes = list(nodes)
+        forced = nodes if force else []
+        # supersede the evaluation in progress, its pending nodes are evaluated again with the new ones
+        previous_run = self._current_run
+        pending = self.cancel()
+        if previous_run is not None:
+            forced += [node for node in pending if node in previous_run.forced]
+
+        roots = nodes + pending
+        affected = self.collectDescendants(roots)
+        stale = set(roots) | set(node for node in affected if node.isDirty() or node.isInvalid())
+        for node in affected:
+            node.markDirty()
+        self._evalOrdered(self.topologicalOrder(affected), forced, stale)
+
+    def evalDirtyNodes(self):
+        """Evaluate every `Dirty` or `Invalid` `Node` of the `Scene` as well as their descendants"""
+        # the pending nodes of the evaluation in progress are dirty, hence evaluated again
+        self.cancel()
+        roots = [node for node in self.scene.nodes if node.isDirty() or node.isInvalid()]
+        affected = self.collectDescendants(roots)
+        stale = set(node for node in affected if node.isDirty() or node.isInvalid())
+        for node in affected:
+            if not node.isInvalid():
+                node.markDirty()
+        self._evalOrdered(self.topologicalOrder(affected), stale=stale)
+
+    def _evalOrdered(self, ordered: List['Node'], forced: Iterable['Node'] = (), stale: Iterable['Node'] = None):
+        """Evaluate `ordered` one after the other.
+
+        `Nodes` fed by a `Node` which failed to evaluate are not evaluated and left `Dirty`.
+        `Nodes` which are not `stale` and whose parents output did not change are marked back as up to date.
+        """
+        run = EvaluationRun(ordered, forced, stale)
+        if self.asynchronous or self.max_workers > 1:
+            return self._evalParallel(run)
+
+        for node in ordered:
+            if run.parents[node] & run.failed:
+                self.print('skipping', node, 'as one of its inputs failed')
+                node.markDirty()
+                run.release(node)
+                continue
+
+            if not run.needsEval(node):
+                self.print('skipping', node, 'as its inputs did not change')
+                node.markDirty(False)
+                run.release(node)
+                continue
+
+            run.start(node)
+            try:
+                if node in run.forced:
+                    node.eval(force=True)
+                else:
+                    node.eval()
+            except Exception as e:
+                dumpException(e)
+                node.markInvalid()
+            run.release(node)
+
+    def _evalParallel(self, run: EvaluationRun):
+        """Evaluate the `Nodes` of `run`, computing concurrently the ones whose parents are all evaluated.
+
+        :py:meth:`~node_editor.node_node.Node.prepareEval` and :py:meth:`~node_editor.node_node.Node.finishEval`
+        are called in the current (GUI) thread, only the returned jobs run on the thread pool.
+        `Nodes` fed by a `Node` which failed to evaluate are not evaluated and left `Dirty`.
+        In asynchronous mode, returns once the first jobs are submitted.
+        """
+        if self.asynchronous:
+            self._current_run = run
+            self._schedule(run)
+            if run.isFinished():
+                self._current_run = None
+            return
+
+        self._schedule(run)
+        while run.running:
+            done, _ = wait(run.running, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._complete(run, future)
+            self._schedule(run)
+
+    def _schedule(self, run: EvaluationRun):
+        """Prepare the ready `Nodes` of `run` and submit their job to the thread pool"""
+        executor = self.getExecutor()
+        while run.ready:
+            node = run.ready.popleft()
+            if run.parents[node] & run.failed:
+                self.print('skipping', node, 'as one of its inputs failed')
+                node.markDirty()
+                run.release(node)
+                continue
+
+            if not run.needsEval(node):
+                self.print('skipping', node, 'as its inputs did not change')
+                node.markDirty(False)
+                run.release(node)
+                continue
+
+            run.start(node)
+            try:
+                job = node.prepareEval(force=node in run.forced)
+            except Exception as e:
+                node.failEval(e)
+                job = None
+
+            if job is None:
+                run.release(node)
+                continue
+
+            node.markRunning()
+            future = executor.submit(job)
+            run.running[future] = node
+            if self.asynchronous:
+                # called in the worker thread, the signal is queued to the GUI thread
+                future.add_done_callback(self._signals.jobDone.emit)
+
+    def _complete(self, run: EvaluationRun, future: Future):
+        """Apply the result of a job of `run` to its `Node`"""
+        node = run.running.pop(future)
+        node.markRunning(False)
+        if node.grNode is None:
+            # the node was removed from the scene in the meantime
+            run.release(node)
+            return
+
+        try:
+            node.finishEval(future.result())
+        except Exception as e:
+            node.failEval(e)
+        run.release(node)
+
+    def onJobDone(self, future: Future):
+        """Slot called in the GUI thread when a job submitted in asynchronous mode is done"""
+        run = self._current_run
+        if run is None or future not in run.running:
+            self.print('discarding the result of a stale job')
+            return
+
+        self._complete(run, future)
+        self._schedule(run)
+        if run.isFinished():
+            self._current_run = None
+
+    def print(self, *args):
+        if DEBUG:
+            print('>SceneEvaluator :', *args)
@@ -0,0 +1,362 @@
+# -*- encoding: utf-8 -*-
+"""Module containing the readers and writers of the files of the NodeEditor's Scene
+
+The format of a file is chosen by its extension :
+ - ``.json`` - indented JSON, the default for any other extension
+ - ``.msgpack`` - compact binary `MessagePack <https://msgpack.org>`_ encoding
+ - ``.json.gz``, ``.msgpack.gz`` - the same, compressed with gzip
+
+MessagePack is encoded by the ``msgpack`` package when it is installed, and by the encoder of this module
+otherwise, both producing the same files. Files are written by chunks. MessagePack files are read by chunks as
+well, their raw content is never held in memory at once, whereas JSON files are read whole by ``json.load``.
+
+Usage from the console ::
+
+    nodeeditor-convert graph.json graph.msgpack.gz
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import struct
+from .utils import dumpException
+from typing import Any, BinaryIO, IO, List, Optional, Tuple
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+DEBUG = False
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+GZIP_SUFFIX = '.gz'
+EXTENSIONS = {'.json': JSON, '.msgpack': MSGPACK}
+# size of the chunks read from and written to the files
+CHUNK_SIZE = 64 * 1024
+# errors raised when decoding an invalid file
+DECODE_ERRORS = (ValueError, EOFError, gzip.BadGzipFile) + ((msgpack.UnpackException,) if HAS_MSGPACK else ())
+
+
+class InvalidFile(Exception):
+    pass
+
+
+def getFileFormat(filename: str) -> Tuple[str, bool]:
+    """Returns the encoding of `filename` from its extension, JSON for unknown extensions, and whether it is
+    compressed"""
+    name = filename.lower()
+    compressed = name.endswith(GZIP_SUFFIX)
+    if compressed:
+        name = name[:-len(GZIP_SUFFIX)]
+    return EXTENSIONS.get(os.path.splitext(name)[1], JSON), compressed
+
+
+def openFile(filename: str, mode: str) -> BinaryIO:
+    """Open `filename` in binary `mode`, through gzip if its extension is .gz"""
+    if getFileFormat(filename)[1]:
+        # fast compression, the files are written on every save
+        return gzip.open(filename, mode, compresslevel=1 if 'w' in mode else 9)
+    return open(filename, mode)
+
+
+def writeData(data: Any, file: BinaryIO, encoding: str = JSON):
+    """Write `data` to the binary `file` with `encoding`"""
+    if encoding == MSGPACK:
+        if HAS_MSGPACK:
+            packer = msgpack.Packer(use_bin_type=True)
+            _packStreamed(data, file, packer)
+        else:
+            writer = MessagePackWriter(file)
+            writer.pack(data)
+            writer.flush()
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8')
+        json.dump(data, text, indent=4)
+        # flush the text and leave the file open
+        text.detach()
+
+
+def readData(file: BinaryIO, encoding: str = JSON) -> Any:
+    """Read the data written by :py:func:`writeData` from the binary `file`
+
+    MessagePack is read by chunks, JSON is read whole before being decoded.
+    """
+    if encoding == MSGPACK:
+        if HAS_MSGPACK:
+            unpacker = msgpack.Unpacker(file, raw=False, strict_map_key=False, read_size=CHUNK_SIZE,
+                                        max_buffer_size=0)
+            return unpacker.unpack()
+        return MessagePackReader(file).unpack()
+    return json.load(io.TextIOWrapper(file, encoding='utf-8'))
+
+
+def saveData(data: Any, filename: str):
+    """Write `data` to `filename` in the format given by its extension, see :py:func:`getFileFormat`"""
+    with openFile(filename, 'wb') as file:
+        writeData(data, file, getFileFormat(filename)[0])
+
+
+def loadData(filename: str) -> Any:
+    """Read `filename` in the format given by its extension, see :py:func:`getFileFormat`
+
+    Raises
+    ------
+    InvalidFile
+        if the content of the file does not match its format
+    """
+    encoding, compressed = getFileFormat(filename)
+    name = os.path.basename(filename)
+    try:
+        with openFile(filename, 'rb') as file:
+            return readData(file, encoding)
+    except json.JSONDecodeError:
+        raise InvalidFile(f'{name} is not a valid JSON file')
+    except DECODE_ERRORS as e:
+        raise InvalidFile(f'{name} is not a valid {"compressed " if compressed else ""}{encoding} file : {e}')
+
+
+def convertFile(source: str, destination: str):
+    """Convert the scene file `source` to the format of `destination`, see :py:func:`getFileFormat`"""
+    saveData(loadData(source), destination)
+
+
+def _packStreamed(data: Any, file: BinaryIO, packer: 'msgpack.Packer'):
+    # the items of the lists of the top level mapping (i.e. nodes, edges) are packed one by one
+    if not isinstance(data, dict):
+        file.write(packer.pack(data))
+        return
+    file.write(packer.pack_map_header(len(data)))
+    for key, value in data.items():
+        file.write(packer.pack(key))
+        if isinstance(value, (list, tuple)):
+            file.write(packer.pack_array_header(len(value)))
+            for item in value:
+                file.write(packer.pack(item))
+        else:
+            file.write(packer.pack(value))
+
+
+_UINT8 = struct.Struct('>BB')
+_UINT16 = struct.Struct('>BH')
+_UINT32 = struct.Struct('>BI')
+_UINT64 = struct.Struct('>BQ')
+_INT8 = struct.Struct('>Bb')
+_INT16 = struct.Struct('>Bh')
+_INT32 = struct.Struct('>Bi')
+_INT64 = struct.Struct('>Bq')
+_FLOAT64 = struct.Struct('>Bd')
+
+
+class MessagePackWriter:
+    """Class encoding data as MessagePack to a binary file, by chunks of :py:data:`CHUNK_SIZE` bytes
+
+    Supports None, bool, int, float, str, bytes, list, tuple and dict, as JSON does.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self._buffer = bytearray()
+
+    def flush(self):
+        """Write the encoded data to the file"""
+        self.file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def pack(self, value: Any):
+        """Encode `value`"""
+        buffer = self._buffer
+        if isinstance(value, str):
+            encoded = value.encode('utf-8')
+            length = len(encoded)
+            if length < 32:
+                buffer.append(0xa0 | length)
+            else:
+                self.packLength(length, 0xd9, 0xda, 0xdb)
+            buffer += encoded
+        elif value is None:
+            buffer.append(0xc0)
+        elif value is True:
+            buffer.append(0xc3)
+        elif value is False:
+            buffer.append(0xc2)
+        elif isinstance(value, int):
+            if 0 <= value < 0x80:
+                buffer.append(value)
+            else:
+                self.packInt(value)
+        elif isinstance(value, float):
+            buffer += _FLOAT64.pack(0xcb, value)
+        elif isinstance(value, dict):
+            length = len(value)
+            if length < 16:
+                buffer.append(0x80 | length)
+            else:
+                self.packLength(length, None, 0xde, 0xdf)
+            pack = self.pack
+            for key, item in value.items():
+                pack(key)
+                pack(item)
+            if len(self._buffer) >= CHUNK_SIZE:
+                self.flush()
+        elif isinstance(value, (list, tuple)):
+            length = len(value)
+            if length < 16:
+                buffer.append(0x90 | length)
+            else:
+                self.packLength(length, None, 0xdc, 0xdd)
+            pack = self.pack
+            for item in value:
+                pack(item)
+            if len(self._buffer) >= CHUNK_SIZE:
+                self.flush()
+        elif isinstance(value, (bytes, bytearray)):
+            self.packLength(len(value), 0xc4, 0xc5, 0xc6)
+            buffer += value
+        else:
+            raise TypeError(f'Object of type {type(value).__name__} can not be encoded as MessagePack')
+
+    def packInt(self, value: int):
+        if value >= 0:
+            for packer, code, limit in ((_UINT8, 0xcc, 1 << 8), (_UINT16, 0xcd, 1 << 16), (_UINT32, 0xce, 1 << 32),
+                                        (_UINT64, 0xcf, 1 << 64)):
+                if value < limit:
+                    self._buffer += packer.pack(code, value)
+                    return
+            raise OverflowError(f'{value} is too large to be encoded as MessagePack')
+        if value >= -32:
+            self._buffer.append(value & 0xff)
+            return
+        for packer, code, limit in ((_INT8, 0xd0, 1 << 7), (_INT16, 0xd1, 1 << 15), (_INT32, 0xd2, 1 << 31),
+                                    (_INT64, 0xd3, 1 << 63)):
+            if value >= -limit:
+                self._buffer += packer.pack(code, value)
+                return
+        raise OverflowError(f'{value} is too small to be encoded as MessagePack')
+
+    def packLength(self, length: int, code8: Optional[int], code16: int, code32: int):
+        if code8 is not None and length < 1 << 8:
+            self._buffer += _UINT8.pack(code8, length)
+        elif length < 1 << 16:
+            self._buffer += _UINT16.pack(code16, length)
+        else:
+            self._buffer += _UINT32.pack(code32, length)
+
+
+class MessagePackReader:
+    """Class decoding the MessagePack written by :class:`MessagePackWriter` from a binary file, by chunks of
+    :py:data:`CHUNK_SIZE` bytes"""
+    # code -> struct of the fixed size values
+    FIXED = {0xcc: struct.Struct('>B'), 0xcd: struct.Struct('>H'), 0xce: struct.Struct('>I'),
+             0xcf: struct.Struct('>Q'), 0xd0: struct.Struct('>b'), 0xd1: struct.Struct('>h'),
+             0xd2: struct.Struct('>i'), 0xd3: struct.Struct('>q'), 0xca: struct.Struct('>f'),
+             0xcb: struct.Struct('>d')}
+    # code -> struct of the length and kind of the variable size values
+    SIZED = {0xd9: (FIXED[0xcc], 'str'), 0xda: (FIXED[0xcd], 'str'), 0xdb: (FIXED[0xce], 'str'),
+             0xc4: (FIXED[0xcc], 'bin'), 0xc5: (FIXED[0xcd], 'bin'), 0xc6: (FIXED[0xce], 'bin'),
+             0xdc: (FIXED[0xcd], 'array'), 0xdd: (FIXED[0xce], 'array'),
+             0xde: (FIXED[0xcd], 'map'), 0xdf: (FIXED[0xce], 'map')}
+
+    def __init__(self, file: IO[bytes]):
+        self.file = file
+        self._buffer = b''
+        self._position = 0
+
+    def ensure(self, size: int):
+        """Make sure the next `size` bytes are in the buffer, reading the file as needed"""
+        available = len(self._buffer) - self._position
+        if available >= size:
+            return
+        chunks = [self._buffer[self._position:]]
+        while available < size:
+            chunk = self.file.read(max(CHUNK_SIZE, size - available))
+            if not chunk:
+                raise EOFError('unexpected end of the MessagePack data')
+            chunks.append(chunk)
+            available += len(chunk)
+        self._buffer = b''.join(chunks)
+        self._position = 0
+
+    def read(self, size: int) -> bytes:
+        """Returns the next `size` bytes"""
+        self.ensure(size)
+        start = self._position
+        self._position = start + size
+        return self._buffer[start:self._position]
+
+    def unpack(self) -> Any:
+        """Decode the next value"""
+        self.ensure(1)
+        code = self._buffer[self._position]
+        self._position += 1
+        if code < 0x80:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if code < 0x90:
+            return self.unpackMap(code & 0x0f)
+        if code < 0xa0:
+            return self.unpackArray(code & 0x0f)
+        if code < 0xc0:
+            return self.read(code & 0x1f).decode('utf-8')
+        if code == 0xc0:
+            return None
+        if code in (0xc2, 0xc3):
+            return code == 0xc3
+        if code in self.FIXED:
+            unpacker = self.FIXED[code]
+            self.ensure(unpacker.size)
+            value = unpacker.unpack_from(self._buffer, self._position)[0]
+            self._position += unpacker.size
+            return value
+        if code in self.SIZED:
+            unpacker, kind = self.SIZED[code]
+            self.ensure(unpacker.size)
+            length = unpacker.unpack_from(self._buffer, self._position)[0]
+            self._position += unpacker.size
+            if kind == 'str':
+                return self.read(length).decode('utf-8')
+            if kind == 'bin':
+                return self.read(length)
+            if kind == 'array':
+                return self.unpackArray(length)
+            return self.unpackMap(length)
+        raise ValueError(f'unsupported MessagePack code 0x{code:02x}')
+
+    def unpackArray(self, length: int) -> list:
+        unpack = self.unpack
+        return [unpack() for _ in range(length)]
+
+    def unpackMap(self, length: int) -> dict:
+        unpack = self.unpack
+        result = {}
+        for _ in range(length):
+            key = unpack()
+            result[key] = unpack()
+        return result
+
+
+def main(argv: List[str] = None) -> int:
+    """Console entry point, convert a scene file to another format"""
+    parser = argparse.ArgumentParser(description='Convert a graph saved by the node editor to another format, '
+                                                 'given by the extension : .json, .msgpack, optionally .gz')
+    parser.add_argument('source', help='graph saved by the node editor')
+    parser.add_argument('destination', help='converted graph')
+    args = parser.parse_args(argv)
+    try:
+        convertFile(args.source, args.destination)
+    except InvalidFile as e:
+        print(e)
+        return 1
+    except Exception as e:
+        dumpException(e)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,19 +1,85 @@
+import json
+import zlib
+from contextlib import contextmanager
+from PyQt5.QtCore import QTimer
 from .node_graphics_edge import GraphicsEdge
+from .node_edge import Edge
 from .utils import dumpException
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple, Union
 
 if TYPE_CHECKING:
     from .node_scene import Scene
+    from .node_node import Node
 
 DEBUG = False
 
+# default memory budget of the history, in bytes
+DEFAULT_MAX_BYTES = 64 * 1024 ** 2
+
+
+def pack(data: Any) -> bytes:
+    """Returns `data` as compressed JSON. Equal data give equal bytes, as long as their keys are in the same order"""
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 1)
+
+
+def unpack(blob: bytes) -> Any:
+    """Returns the data packed by :py:func:`pack`"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
 
 class SceneHistory:
+    """Class storing the history of the changes of a :class:`~node_editor.node_scene.Scene`
+
+    Each history stamp records the serialized data of the nodes and edges changed since the previous stamp,
+    before and after the change, so that undo and redo only update these objects in place.
+
+    Serialized data are stored compressed, see :py:func:`pack`, and shared between consecutive stamps: the data
+    of an object after a change is the same bytes object as its data before its next change. The oldest stamps
+    are dropped once the memory budget is exceeded.
+
+    `Nodes` and `Edges` report their changes with
+    :py:meth:`~node_editor.node_scene_history.SceneHistory.markChanged` ; only the marked ones are serialized
+    when a stamp is stored and compared to their data at the previous stamp.
+
+    Operations storing several stamps can be grouped in a single one with a transaction, see
+    :py:meth:`~node_editor.node_scene_history.SceneHistory.transaction`, and selection changes are stored once
+    the selection settled, see :py:meth:`~node_editor.node_scene_history.SceneHistory.storeSelection`.
+    """
+    # delay in ms after the last selection change before the selection is stored
+    SELECTION_DELAY = 200
+
     def __init__(self, scene: 'Scene'):
+        """
+        Instance Attributes
+         - **scene** - reference to the :class:`~node_editor.node_scene.Scene`
+         - **history_stack** - list of the history stamps
+         - **history_current_step** - position of the stamp matching the current state of the scene
+         - **history_limit** - maximum number of stamps, None if only the memory budget applies
+         - **max_bytes** - memory budget in bytes, the current stamp is kept whatever its size
+         - **used_bytes** - memory used by the stamps and the current state of the scene
+        """
         self.scene = scene
-
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.used_bytes = 0
+        # id of the stored bytes -> number of references from the stamps and the state
+        self._references: Dict[int, int] = {}
+
+        # packed nodes and edges by id at the current step, None until the first stamp
+        self._state: Optional[Dict[str, Dict[int, bytes]]] = None
+        # nodes and edges changed since the last stamp
+        self._changed_nodes: Dict['Node', None] = {}
+        self._changed_edges: Dict[Edge, None] = {}
+        # description and modified flag of the stamp of the transaction in progress, see beginTransaction
+        self._transaction: Optional[dict] = None
+        self._transaction_depth = 0
+        # description of the selection stamp waiting for the selection to settle
+        self._pending_selection: Optional[str] = None
+        self._selection_timer = QTimer()
+        self._selection_timer.setSingleShot(True)
+        self._selection_timer.setInterval(self.SELECTION_DELAY)
+        self._selection_timer.timeout.connect(self.flushSelection)
         self.clear()
-        self.history_limit = 32
+        self.history_limit = None
 
         self.undo_selection_has_changed = False
 
@@ -21,11 +87,19 @@ class SceneHistory:
         self._history_modified_listeners = []
         self._history_stored_listeners = []
         self._history_restored_listeners = []
+        self._item_changed_listeners = []
 
     def clear(self):
         """Clear history _stack"""
         self.history_stack = []
         self.history_current_step = -1
+        self._state = None
+        self._references = {}
+        self.used_bytes = 0
+        self._changed_nodes.clear()
+        self._changed_edges.clear()
+        self._pending_selection = None
+        self._selection_timer.stop()
 
     def storeInitialHistoryStamp(self):
         self.storeHistory('Initial History Stamp')
@@ -39,6 +113,98 @@ class SceneHistory:
     def addHistoryRestoredListener(self, callback):
         self._history_restored_listeners.append(callback)
 
+    def addItemChangedListener(self, callback):
+        """`callback` is called with each `Node` or `Edge` marked as changed, see :py:meth:`markChanged`"""
+        self._item_changed_listeners.append(callback)
+
+    def markChanged(self, item: Union['Node', Edge]):
+        """Mark `item` as changed since the last stamp, it is compared to its previous state on the next stamp
+
+        Parameters
+        ----------
+        item : Union[Node, Edge]
+            `Node` or `Edge` added, removed or modified
+        """
+        if isinstance(item, Edge):
+            self._changed_edges[item] = None
+        else:
+            self._changed_nodes[item] = None
+        for callback in self._item_changed_listeners:
+            callback(item)
+
+    def beginTransaction(self, desc: str):
+        """Start grouping the stamps stored until :py:meth:`commitTransaction` in a single stamp.
+
+        Transactions may be nested, the stamp is stored when the outermost one is committed.
+
+        Parameters
+        ----------
+        desc : str
+            Short description of the stamp of the transaction
+        """
+        if self._transaction_depth == 0:
+            self._transaction = {'desc': desc, 'modified': False, 'stored': False}
+        self._transaction_depth += 1
+
+    def commitTransaction(self):
+        """End the transaction started by :py:meth:`beginTransaction`.
+
+        Its stamp is stored if a stamp was requested or a change marked meanwhile.
+        """
+        self._transaction_depth -= 1
+        if self._transaction_depth > 0:
+            return
+        transaction, self._transaction = self._transaction, None
+        if transaction['stored'] or self._changed_nodes or self._changed_edges:
+            self.storeHistory(transaction['desc'], setModified=transaction['modified'])
+
+    @contextmanager
+    def transaction(self, desc: str, setModified: bool = False):
+        """Context manager grouping the stamps stored in its block in a single stamp
+
+        Parameters
+        ----------
+        desc : str
+            Short description of the stamp of the transaction
+        setModified : bool
+            if ``True`` the scene is marked as modified
+        """
+        self.beginTransaction(desc)
+        self._transaction['modified'] |= setModified
+        try:
+            yield
+        finally:
+            self.commitTransaction()
+
+    def isInTransaction(self) -> bool:
+        return self._transaction_depth > 0
+
+    def storeSelection(self, desc: str):
+        """Store a stamp once the selection did not change for :py:attr:`SELECTION_DELAY` ms.
+
+        Bursts of selection changes, e.g. a rubber band selection, are recorded by a single stamp, and none
+        if another stamp is stored meanwhile since every stamp records the selection.
+        """
+        if self.isInTransaction():
+            self._transaction['stored'] = True
+            return
+        self._pending_selection = desc
+        self._selection_timer.start()
+
+    def flushSelection(self):
+        """Store the pending selection stamp now, if any.
+
+        Nothing is stored if neither the selection nor the scene changed since the current stamp.
+        """
+        self._selection_timer.stop()
+        desc, self._pending_selection = self._pending_selection, None
+        if desc is None:
+            return
+        if not self._changed_nodes and not self._changed_edges and 0 <= self.history_current_step and \
+                unpack(self.history_stack[self.history_current_step]['selection']) == self.captureCurrentSelection():
+            return
+        self.storeHistory(desc)
+
     def canUndo(self):
         return self.history_current_step > 0
 
@@ -47,23 +213,27 @@ class SceneHistory:
 
     def undo(self):
         if DEBUG: print('UNDO')
+        self.flushSelection()
         if self.canUndo():
+            history_stamp = self.history_stack[self.history_current_step]
             self.history_current_step -= 1
-            self.restoreHistory()
+            self.restoreHistory(history_stamp, undo=True)
             self.scene.has_been_modified = True
 
     def redo(self):
         if DEBUG: print('REDO')
+        self.flushSelection()
         if self.canRedo():
             self.history_current_step += 1
-            self.restoreHistory()
+            self.restoreHistory(self.history_stack[self.history_current_step])
             self.scene.has_been_modified = True
 
-    def restoreHistory(self):
+    def restoreHistory(self, history_stamp: dict, undo: bool = False):
+        """Revert the changes of `history_stamp` if `undo`, apply them otherwise"""
         if DEBUG:
             print('Restoring history .... current step: {}'.format(self.history_current_step),
                   'len {}'.format(len(self.history_stack)))
-        self.restoreHistoryStamp(self.history_stack[self.history_current_step])
+        self.restoreHistoryStamp(history_stamp, undo)
         # Listeners
         for callback in self._history_modified_listeners:
             callback()
@@ -72,6 +242,15 @@ class SceneHistory:
             callback()
 
     def storeHistory(self, desc, setModified=False):
+        if self.isInTransaction():
+            # stored when the transaction is committed
+            self._transaction['stored'] = True
+            self._transaction['modified'] |= setModified
+            return
+        # the selection is recorded by this stamp
+        self._pending_selection = None
+        self._selection_timer.stop()
+
         if setModified:
             self.scene.has_been_modified = True
 
@@ -82,19 +261,23 @@ class SceneHistory:
 
         # if the current step is not at the end of the history _stack
         if self.history_current_step + 1 < len(self.history_stack):
+            for history_stamp in self.history_stack[self.history_current_step + 1:]:
+                self._release(self._stampBlobs(history_stamp))
             self.history_stack = self.history_stack[0:self.history_current_step + 1]
 
         # history is outside of the limits
-        if self.history_current_step + 1 >= self.history_limit:
-            self.history_stack = self.history_stack[1:]
-            self.history_current_step -= 1
+        if self.history_limit is not None and self.history_current_step + 1 >= self.history_limit:
+            self.dropOldestStamp()
 
         hs = self.createHistoryStamp(desc)
+        self._retain(self._stampBlobs(hs))
 
         self.history_stack.append(hs)
         self.history_current_step += 1
         if DEBUG: print(' -- setting step to: ', self.history_current_step)
 
+        self.evict()
+
         # always trigger history modified i.e. updateEditMenu
         for callback in self._history_modified_listeners:
             callback()
@@ -114,13 +297,114 @@ class SceneHistory:
                 sel_obj['edges'].append(item.edge.id)
         return sel_obj
 
+    def setMaxBytes(self, max_bytes: int):
+        """Set the memory budget, dropping the oldest stamps if needed
+
+        Parameters
+        ----------
+        max_bytes : int
+            memory budget in bytes
+        """
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def evict(self):
+        """Drop the oldest stamps until the memory budget is met, the current stamp is kept"""
+        while self.used_bytes > self.max_bytes and self.history_current_step > 0:
+            self.dropOldestStamp()
+
+    def dropOldestStamp(self):
+        """Drop the first stamp, the next one becomes the oldest state which can be restored"""
+        self._release(self._stampBlobs(self.history_stack[0]))
+        self.history_stack = self.history_stack[1:]
+        self.history_current_step -= 1
+
+    @staticmethod
+    def _stampBlobs(history_stamp: dict) -> Iterator[bytes]:
+        yield history_stamp['selection']
+        for key in ('nodes', 'edges'):
+            for before, after in history_stamp[key].values():
+                if before is not None:
+                    yield before
+                if after is not None:
+                    yield after
+
+    def _retain(self, blobs):
+        for blob in blobs:
+            key = id(blob)
+            count = self._references.get(key, 0)
+            if count == 0:
+                self.used_bytes += len(blob)
+            self._references[key] = count + 1
+
+    def _release(self, blobs):
+        for blob in blobs:
+            key = id(blob)
+            count = self._references[key] - 1
+            if count == 0:
+                del self._references[key]
+                self.used_bytes -= len(blob)
+            else:
+                self._references[key] = count
+
+    def _setState(self, state: Dict[int, bytes], item_id: int, blob: Optional[bytes]):
+        """Set the packed data of an object at the current step, None if it does not exist"""
+        previous = state.pop(item_id, None)
+        if blob is not None:
+            state[item_id] = blob
+            self._retain((blob,))
+        if previous is not None:
+            self._release((previous,))
+
+    def captureState(self):
+        """Store the serialized data of every node and edge of the scene, the reference of the next changes"""
+        data = self.scene.serialize()
+        self._state = {'nodes': {}, 'edges': {}}
+        for key in ('nodes', 'edges'):
+            for item_data in data[key]:
+                self._setState(self._state[key], item_data['id'], pack(item_data))
+        self._changed_nodes.clear()
+        self._changed_edges.clear()
+
+    def captureChanges(self) -> Tuple[dict, dict]:
+        """Returns the changes of the nodes and edges marked since the last stamp.
+
+        Returns
+        -------
+        Tuple[dict, dict]
+            changes of the nodes and of the edges, by id, as tuples of the serialized data before and after the
+            change, None if the object did not exist
+        """
+        nodes = self._compareChanged(self._state['nodes'], self._changed_nodes, self.scene.getNodeByID)
+        edges = self._compareChanged(self._state['edges'], self._changed_edges, self.scene.getEdgeByID)
+        self._changed_nodes.clear()
+        self._changed_edges.clear()
+        return nodes, edges
+
+    def _compareChanged(self, state: Dict[int, bytes], changed: dict, lookup: Callable[[int], object]) -> dict:
+        changes = {}
+        for item in changed:
+            item_id = item.id
+            # the item was removed from the scene
+            after = pack(item.serialize()) if lookup(item_id) is item else None
+            before = state.get(item_id)
+            if after == before:
+                continue
+            changes[item_id] = (before, after)
+            self._setState(state, item_id, after)
+        return changes
+
     def createHistoryStamp(self, desc: str) -> dict:
         """Create History Stamp
 
-        The stamp is dictionary containing 3 keys :
+        The stamp is dictionary containing 4 keys :
             - desc : Short description of the event triggering the creation of the stamp
-            - snapshot : The result of `Scene` serialization
-            - selection : dictionary containing the id of selected items
+            - nodes : The changes of the `Nodes` since the previous stamp, see
+              :py:meth:`~node_editor.node_scene_history.SceneHistory.captureChanges`
+            - edges : The changes of the `Edges` since the previous stamp
+            - selection : packed dictionary containing the id of selected items
+
+        The first stamp records no change, the current state of the scene is its reference.
 
         Parameters
         ----------
@@ -133,42 +417,64 @@ class SceneHistory:
 
 
         """
-        # take a snapshot of current scene
+        if self._state is None:
+            self.captureState()
+            nodes, edges = {}, {}
+        else:
+            nodes, edges = self.captureChanges()
         hystory_stamp = {
             'desc': desc,
-            'snapshot': self.scene.serialize(),
-            'selection': self.captureCurrentSelection()
+            'nodes': nodes,
+            'edges': edges,
+            'selection': pack(self.captureCurrentSelection())
         }
         return hystory_stamp
 
-    def restoreHistoryStamp(self, history_stamp):
+    def restoreHistoryStamp(self, history_stamp: dict, undo: bool = False):
+        """Apply the changes of `history_stamp` to the scene, the data before the changes if `undo`.
+
+        The selection of the current step is restored.
+        """
         if DEBUG: print('RHS :', history_stamp['desc'])
 
         try:
             self.undo_selection_has_changed = False
             previous_selection = self.captureCurrentSelection()
 
-            self.scene.deserialize(history_stamp['snapshot'])
+            side = 0 if undo else 1
+            changes = {}
+            for key in ('nodes', 'edges'):
+                changes[key] = {}
+                for item_id, change in history_stamp[key].items():
+                    self._setState(self._state[key], item_id, change[side])
+                    changes[key][item_id] = None if change[side] is None else unpack(change[side])
+            self.scene.applyChanges(changes['nodes'], changes['edges'])
+            self._changed_nodes.clear()
+            self._changed_edges.clear()
+            # the listeners are told about the restored items, whose changes were not all marked
+            for key, lookup in (('nodes', self.scene.getNodeByID), ('edges', self.scene.getEdgeByID)):
+                for item_id in changes[key]:
+                    item = lookup(item_id)
+                    if item is not None:
+                        for callback in self._item_changed_listeners:
+                            callback(item)
 
             # restore selection
-            if DEBUG: print('restoring edge selection')
+            selection = unpack(self.history_stack[self.history_current_step]['selection'])
+            for item in self.scene.grScene.selectedItems():
+                item.setSelected(False)
 
-            for edge in self.scene.edges:
-                edge.grEdge.setSelected(False)
-            for edge_id in history_stamp['selection']['edges']:
-                for edge in self.scene.edges:
-                    if edge.id == edge_id:
-                        edge.grEdge.setSelected(True)
-                        break
+            if DEBUG: print('restoring edge selection')
+            for edge_id in selection['edges']:
+                edge = self.scene.getEdgeByID(edge_id)
+                if edge is not None:
+                    edge.grEdge.setSelected(True)
 
             if DEBUG: print('restoring node selection')
-            for node in self.scene.nodes:
-                node.grNode.setSelected(False)
-            for node_id in history_stamp['selection']['nodes']:
-                for node in self.scene.nodes:
-                    if node.id == node_id:
-                        node.grNode.setSelected(True)
-                        break
+            for node_id in selection['nodes']:
+                node = self.scene.getNodeByID(node_id)
+                if node is not None:
+                    node.grNode.setSelected(True)
             current_selection = self.captureCurrentSelection()
 
             # reset the last_selected_items - since we're comparing change to the last_selected_state
@@ -0,0 +1,396 @@
+# -*- encoding: utf-8 -*-
+"""Module containing the headless execution engine of the graphs saved by the NodeEditor's Scene.
+
+A graph saved with :py:meth:`~node_editor.node_scene.Scene.saveToFile` is evaluated without instantiating any
+Qt object : `Nodes` are rebuilt from their `op_code` and `node_settings` only, and computed by the
+``evalOperation(inputs, settings)`` classmethod of their class.
+
+In streaming mode, the sources read their data by chunks which flow through the graph, see
+:py:meth:`~node_editor.node_scene_runner.SceneRunner.runStreaming`, such that files larger than the memory
+can be processed.
+
+Usage from the console ::
+
+    nodeeditor-run graph.json --output-dir results
+    nodeeditor-run graph.json --output-dir results --chunksize 100000
+"""
+import argparse
+import importlib
+import os
+import sys
+from collections import deque, OrderedDict
+from .node_scene_file import InvalidFile, loadData
+from .utils import dumpException
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+DEBUG = False
+
+DEFAULT_NODES_MODULES = ['examples.example_data.nodes']
+DEFAULT_FACTORY = 'examples.example_data.data_conf:NodeFactory'
+
+
+class RunnerError(Exception):
+    pass
+
+
+class HeadlessNode:
+    """Class representing a `Node` of a saved graph, without any graphical object"""
+
+    def __init__(self, data: dict, node_class: type):
+        """
+        Instance Attributes
+         - **id** - id of the serialized `Node`
+         - **title** - title of the `Node`
+         - **op_code** - op_code of the `Node`
+         - **node_class** - class of the `Node`, providing the ``evalOperation`` and ``evalStream`` classmethods
+         - **settings** - node settings as serialized
+         - **inputs** - for each input socket, the `HeadlessNode` connected to it or None
+         - **children** - `HeadlessNodes` connected to the outputs
+         - **value** - result of the evaluation
+         - **error** - exception raised by the evaluation, None if successful
+        """
+        self.id = data['id']
+        self.title = data.get('title', '')
+        self.op_code = data.get('op_code')
+        self.node_class = node_class
+        self.settings = data.get('node_settings', {})
+        self.inputs: List[Optional[HeadlessNode]] = []
+        self.children: List[HeadlessNode] = []
+        self.value: Any = None
+        self.error: Optional[Exception] = None
+
+    def __str__(self):
+        return "<{} {} {}>".format(self.__class__.__name__, self.op_code, self.id)
+
+    def getParentNodes(self) -> List['HeadlessNode']:
+        return [node for node in self.inputs if node is not None]
+
+    def getChildrenNodes(self) -> List['HeadlessNode']:
+        return self.children
+
+    def isSink(self) -> bool:
+        """Returns ``True`` if no `Node` is connected to the outputs"""
+        return len(self.children) == 0
+
+    def eval(self):
+        """Evaluate this `HeadlessNode` from the values of its inputs"""
+        inputs = []
+        for node in self.inputs:
+            if node is None:
+                raise RunnerError('Input is not connected')
+            if node.value is None:
+                raise RunnerError('Input is NaN')
+            inputs.append(node.value)
+        self.value = self.node_class.evalOperation(inputs, self.settings)
+        return self.value
+
+    def iterChunks(self, chunksize: int) -> Iterator[Any]:
+        """Evaluate this `HeadlessNode` chunk by chunk, pulling the chunks of its inputs.
+
+        Inputs are evaluated again for each `Node` consuming them, such that no chunk is kept in memory. A
+        result made of a single chunk, such as an aggregation, is kept and reused.
+
+        Parameters
+        ----------
+        chunksize : int
+            number of rows of the chunks read by the sources
+
+        Returns
+        -------
+        Iterator[Any]
+            chunks of the output
+        """
+        if self.value is not None:
+            yield self.value
+            return
+
+        streams = []
+        for node in self.inputs:
+            if node is None:
+                raise RunnerError('Input is not connected')
+            streams.append(node.iterChunks(chunksize))
+
+        first, count = None, 0
+        for chunk in self.node_class.evalStream(streams, self.settings, chunksize):
+            if count == 0:
+                first = chunk
+            count += 1
+            yield chunk
+        if count == 1:
+            self.value = first
+
+
+class SceneRunner:
+    """Class evaluating a saved graph without GUI
+
+    The classes of the `Nodes` are retrieved by op_code through `node_class_selector`, typically
+    ``NodeFactory.from_op_code``. Only their ``evalOperation`` classmethod is used, or ``evalStream`` in streaming
+    mode.
+    """
+
+    def __init__(self, node_class_selector: Callable[[str], type]):
+        """
+        Instance Attributes
+         - **node_class_selector** - function returning the class of a `Node` from its op_code
+         - **nodes** - dictionary of the `HeadlessNodes`, id -> `HeadlessNode`
+        """
+        self.node_class_selector = node_class_selector
+        self.nodes: Dict[int, HeadlessNode] = OrderedDict()
+
+    def loadFromFile(self, filename: str):
+        """Load the graph saved in `filename`, in the format given by its extension"""
+        try:
+            data = loadData(filename)
+        except InvalidFile as e:
+            raise RunnerError(str(e))
+        self.deserialize(data)
+
+    def deserialize(self, data: dict):
+        """Rebuild the `HeadlessNodes` and their connections from the serialized `Scene`
+
+        Parameters
+        ----------
+        data : dict
+            result of :py:meth:`~node_editor.node_scene.Scene.serialize`
+        """
+        self.nodes.clear()
+        # input socket id -> (node, index of the input)
+        inputs = {}
+        # output socket id -> node
+        outputs = {}
+        for node_data in data['nodes']:
+            if 'op_code' not in node_data:
+                raise RunnerError(f"Node {node_data['id']} has no op_code")
+            node = HeadlessNode(node_data, self.node_class_selector(node_data['op_code']))
+            self.nodes[node.id] = node
+
+            # same ordering of the sockets as Node.deserialize
+            sockets = sorted(node_data['inputs'], key=lambda value: value['index'] + value['position'] * 1e3)
+            node.inputs = [None] * len(sockets)
+            for index, socket_data in enumerate(sockets):
+                inputs[socket_data['id']] = (node, index)
+            for socket_data in node_data['outputs']:
+                outputs[socket_data['id']] = node
+
+        for edge_data in data['edges']:
+            start, end = edge_data['start'], edge_data['end']
+            if start in inputs:
+                start, end = end, start
+            if start not in outputs or end not in inputs:
+                raise RunnerError(f"Edge {edge_data['id']} is not connected to an input and an output")
+            parent = outputs[start]
+            node, index = inputs[end]
+            node.inputs[index] = parent
+            parent.children.append(node)
+
+    def topologicalOrder(self, nodes: Iterable[HeadlessNode] = None) -> List[HeadlessNode]:
+        """Order `nodes` and their ancestors such that every `Node` comes after its parents
+
+        Parameters
+        ----------
+        nodes : Iterable[HeadlessNode]
+            `Nodes` to evaluate, all the `Nodes` of the graph by default
+
+        Returns
+        -------
+        List[HeadlessNode]
+            `nodes` and their ancestors in topological order
+        """
+        if nodes is None:
+            nodes = self.nodes.values()
+
+        subset = set()
+        queue = deque(nodes)
+        while queue:
+            node = queue.popleft()
+            if node not in subset:
+                subset.add(node)
+                queue.extend(node.getParentNodes())
+
+        in_degree = {node: len([parent for parent in node.getParentNodes() if parent in subset])
+                     for node in subset}
+        queue = deque(node for node in self.nodes.values() if node in subset and in_degree[node] == 0)
+        ordered = []
+        while queue:
+            node = queue.popleft()
+            ordered.append(node)
+            for child in node.getChildrenNodes():
+                if child in subset:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        queue.append(child)
+
+        if len(ordered) != len(subset):
+            raise RunnerError('The graph contains a cycle')
+        return ordered
+
+    def run(self, nodes: Iterable[HeadlessNode] = None) -> List[HeadlessNode]:
+        """Evaluate `nodes` after their ancestors.
+
+        `Nodes` fed by a `Node` which failed to evaluate are not evaluated.
+
+        Parameters
+        ----------
+        nodes : Iterable[HeadlessNode]
+            `Nodes` to evaluate, all the `Nodes` of the graph by default
+
+        Returns
+        -------
+        List[HeadlessNode]
+            `Nodes` which failed to evaluate
+        """
+        failed = []
+        for node in self.topologicalOrder(nodes):
+            if any(parent.error is not None for parent in node.getParentNodes()):
+                node.error = RunnerError('One of the inputs failed')
+            else:
+                try:
+                    node.eval()
+                    node.error = None
+                except Exception as e:
+                    dumpException(e)
+                    node.error = e
+            if node.error is not None:
+                failed.append(node)
+            self.print(node, 'failed' if node.error is not None else 'done')
+        return failed
+
+    def runStreaming(self, chunksize: int, output_dir: str = None,
+                     nodes: Iterable[HeadlessNode] = None) -> List[HeadlessNode]:
+        """Evaluate `nodes` chunk by chunk, see :py:meth:`~node_editor.node_scene_runner.HeadlessNode.iterChunks`
+
+        Parameters
+        ----------
+        chunksize : int
+            number of rows of the chunks read by the sources
+        output_dir : str
+            if given, the chunks are appended to a csv file per `Node` as they arrive. Otherwise they are
+            gathered in the value of the `Node`
+        nodes : Iterable[HeadlessNode]
+            `Nodes` to evaluate, the sink `Nodes` by default
+
+        Returns
+        -------
+        List[HeadlessNode]
+            `Nodes` which failed to evaluate
+        """
+        failed = []
+        for node in (self.getSinkNodes() if nodes is None else nodes):
+            try:
+                if output_dir is None:
+                    node.value = node.node_class.gatherChunks(node.iterChunks(chunksize))
+                else:
+                    saveChunks(node, node.iterChunks(chunksize), output_dir)
+                node.error = None
+            except Exception as e:
+                dumpException(e)
+                node.error = e
+                failed.append(node)
+            self.print(node, 'failed' if node.error is not None else 'done')
+        return failed
+
+    def getSinkNodes(self) -> List[HeadlessNode]:
+        """Returns the `Nodes` whose outputs are not connected, i.e. the results of the graph"""
+        return [node for node in self.nodes.values() if node.isSink()]
+
+    def print(self, *args):
+        if DEBUG:
+            print('>SceneRunner :', *args)
+
+
+def importNodes(module_names: Iterable[str]):
+    """Import the modules registering the `Nodes`, including the submodules listed in the ``__all__``
+    attribute of a package"""
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        if hasattr(module, '__path__'):
+            for name in getattr(module, '__all__', []):
+                importlib.import_module(f'{module_name}.{name}')
+
+
+def getNodeClassSelector(factory: str) -> Callable[[str], type]:
+    """Returns the ``from_op_code`` function of `factory`, given as ``module:attribute``"""
+    module_name, _, attribute = factory.partition(':')
+    return getattr(importlib.import_module(module_name), attribute or 'NodeFactory').from_op_code
+
+
+def getResultPath(node: HeadlessNode, output_dir: str) -> str:
+    """Returns the path of the csv file storing the result of `node`"""
+    return os.path.join(output_dir, '{}_{}.csv'.format(node.op_code, node.id))
+
+
+def saveResult(node: HeadlessNode, output_dir: str) -> Optional[str]:
+    """Write the value of `node` to a csv file in `output_dir`, returns the path of the file"""
+    if not hasattr(node.value, 'to_csv'):
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    path = getResultPath(node, output_dir)
+    node.value.to_csv(path)
+    return path
+
+
+def saveChunks(node: HeadlessNode, chunks: Iterable[Any], output_dir: str) -> Optional[str]:
+    """Append `chunks`, the output of `node`, to a csv file in `output_dir`, returns the path of the file"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = getResultPath(node, output_dir)
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(path, mode='w' if header else 'a', header=header)
+        header = False
+    return path if not header else None
+
+
+def main(argv: List[str] = None) -> int:
+    """Console entry point, evaluate a saved graph and write the results of its sink `Nodes`"""
+    parser = argparse.ArgumentParser(description='Evaluate a graph saved by the node editor without GUI')
+    parser.add_argument('filename', help='graph saved by the node editor (.json, .msgpack, optionally .gz)')
+    parser.add_argument('-o', '--output-dir', help='directory where the results of the sink nodes are written as csv')
+    parser.add_argument('--nodes', action='append',
+                        help='module registering the nodes, may be repeated '
+                             f"(default: {', '.join(DEFAULT_NODES_MODULES)})")
+    parser.add_argument('--factory', default=DEFAULT_FACTORY,
+                        help=f'node factory providing from_op_code, as module:attribute (default: {DEFAULT_FACTORY})')
+    parser.add_argument('--chunksize', type=int,
+                        help='streaming mode, number of rows of the chunks read by the sources')
+    parser.add_argument('--path', action='append', default=[],
+                        help='directory added to the python path to import the nodes, may be repeated '
+                             '(default: current directory)')
+    args = parser.parse_args(argv)
+
+    for path in reversed(args.path or [os.getcwd()]):
+        sys.path.insert(0, os.path.abspath(path))
+
+    try:
+        importNodes(args.nodes or DEFAULT_NODES_MODULES)
+        runner = SceneRunner(getNodeClassSelector(args.factory))
+        runner.loadFromFile(args.filename)
+        if args.chunksize:
+            failed = runner.runStreaming(args.chunksize, args.output_dir)
+        else:
+            failed = runner.run()
+    except Exception as e:
+        dumpException(e)
+        return 2
+
+    for node in runner.getSinkNodes():
+        if node.error is not None:
+            continue
+        if args.chunksize and args.output_dir:
+            # the chunks are already written
+            print('{} {} -> {}'.format(node.op_code, node.id, getResultPath(node, args.output_dir)))
+            continue
+        shape = getattr(node.value, 'shape', '')
+        message = '{} {} {}'.format(node.op_code, node.id, shape)
+        if args.output_dir:
+            path = saveResult(node, args.output_dir)
+            if path is not None:
+                message += ' -> {}'.format(path)
+        print(message)
+
+    for node in failed:
+        print('{} {} failed: {}'.format(node.op_code, node.id, node.error), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
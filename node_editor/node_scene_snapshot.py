@@ -0,0 +1,141 @@
+# -*- encoding: utf-8 -*-
+"""Module writing the results of the `Nodes` as columnar files, saved next to the file of the graph.
+
+A result is written as a NumPy ``.npz`` archive holding one array per column, per level of the index and per
+level of the column labels, plus a json description of how to rebuild the pandas object. Arrays are written
+with ``allow_pickle=False``: opening a graph never unpickles anything, unlike the spilled results of
+:class:`~node_editor.node_scene_cache.ResultCache`.
+
+Supported columns are the numpy dtypes, timezone aware datetimes, the nullable extension dtypes and strings.
+Other results, such as columns of mixed objects, are not written and are computed again on reopen.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict
+
+# name of the array holding the description of the result
+META = '__meta__'
+
+
+class UnsupportedValue(Exception):
+    """Raised when a result can not be written as columnar arrays"""
+
+
+def _encodeArray(values: Any, name: str, arrays: Dict[str, np.ndarray]) -> dict:
+    """Store the content of `values`, a Series or an Index, in `arrays` and returns its description"""
+    dtype = values.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        arrays[name] = values.array.asi8
+        return {'kind': 'datetimetz', 'dtype': str(dtype)}
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        arrays[name] = np.asarray(values)
+        return {'kind': 'numpy'}
+    array = values.array
+    if hasattr(array, '_data') and hasattr(array, '_mask'):
+        # nullable integers, floats and booleans
+        arrays[name] = np.asarray(array._data)
+        arrays[name + '_na'] = np.asarray(array._mask)
+        return {'kind': 'masked', 'dtype': str(dtype)}
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            raise UnsupportedValue(f'column of mixed objects {name}')
+        missing = np.asarray(pd.isna(values), dtype=bool)
+        filled = np.asarray(values, dtype=object).copy()
+        filled[missing] = ''
+        arrays[name] = filled.astype(str)
+        arrays[name + '_na'] = missing
+        return {'kind': 'str', 'dtype': str(dtype)}
+    raise UnsupportedValue(f'unsupported dtype {dtype}')
+
+
+def _decodeArray(spec: dict, name: str, archive) -> Any:
+    kind = spec['kind']
+    if kind == 'numpy':
+        return archive[name]
+    if kind == 'datetimetz':
+        dtype = pd.api.types.pandas_dtype(spec['dtype'])
+        utc = pd.DatetimeIndex(archive[name].view(f'datetime64[{dtype.unit}]')).tz_localize('UTC')
+        return utc.tz_convert(dtype.tz).array
+    if kind == 'masked':
+        array_type = pd.api.types.pandas_dtype(spec['dtype']).construct_array_type()
+        return array_type(archive[name], archive[name + '_na'])
+    # strings
+    values = archive[name].astype(object)
+    values[archive[name + '_na']] = np.nan if spec['dtype'] == 'object' else None
+    return pd.array(values, dtype=spec['dtype'])
+
+
+def _label(label: Any) -> Any:
+    """Returns `label`, the name of an index, if it can be written as json, its representation otherwise"""
+    return label if label is None or isinstance(label, (str, int, float, bool)) else repr(label)
+
+
+def _encodeIndex(index: pd.Index, prefix: str, arrays: Dict[str, np.ndarray]) -> dict:
+    names = [_label(name) for name in index.names]
+    if isinstance(index, pd.RangeIndex):
+        return {'range': [index.start, index.stop, index.step], 'names': names}
+    levels = [_encodeArray(index.get_level_values(level), f'{prefix}{level}', arrays)
+              for level in range(index.nlevels)]
+    return {'levels': levels, 'names': names, 'multi': isinstance(index, pd.MultiIndex)}
+
+
+def _decodeIndex(spec: dict, prefix: str, archive) -> pd.Index:
+    if 'range' in spec:
+        return pd.RangeIndex(*spec['range'], name=spec['names'][0])
+    levels = [_decodeArray(level, f'{prefix}{position}', archive) for position, level in enumerate(spec['levels'])]
+    if spec['multi']:
+        return pd.MultiIndex.from_arrays(levels, names=spec['names'])
+    return pd.Index(levels[0], name=spec['names'][0])
+
+
+def writeSnapshot(value: Any, path: str):
+    """Write `value` to `path` as columnar arrays.
+
+    The file is written under a temporary name then renamed, an existing snapshot is never left truncated.
+
+    Parameters
+    ----------
+    value: Any
+        DataFrame or Series
+    path: str
+        path of the ``.npz`` file
+
+    Raises
+    ------
+    UnsupportedValue
+        if `value` can not be written, in which case no file is written
+    """
+    arrays = {}
+    if isinstance(value, pd.DataFrame):
+        meta = {'type': 'frame',
+                'index': _encodeIndex(value.index, 'i', arrays),
+                'columns': _encodeIndex(value.columns, 'k', arrays),
+                'data': [_encodeArray(value.iloc[:, position], f'c{position}', arrays)
+                         for position in range(value.shape[1])]}
+    elif isinstance(value, pd.Series):
+        meta = {'type': 'series', 'name': _label(value.name),
+                'index': _encodeIndex(value.index, 'i', arrays),
+                'data': [_encodeArray(value, 'c0', arrays)]}
+    else:
+        raise UnsupportedValue(f'unsupported result {type(value).__name__}')
+
+    arrays[META] = np.array(json.dumps(meta))
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(temporary, path)
+
+
+def readSnapshot(path: str) -> Any:
+    """Returns the result written to `path` by :py:func:`writeSnapshot`"""
+    with np.load(path, allow_pickle=False) as archive:
+        meta = json.loads(str(archive[META]))
+        index = _decodeIndex(meta['index'], 'i', archive)
+        data = [_decodeArray(spec, f'c{position}', archive) for position, spec in enumerate(meta['data'])]
+        if meta['type'] == 'series':
+            return pd.Series(data[0], index=index, name=meta['name'], copy=False)
+        value = pd.DataFrame(dict(enumerate(data)), index=index, copy=False)
+        value.columns = _decodeIndex(meta['columns'], 'k', archive)
+        return value
@@ -1,6 +1,21 @@
 class Serializable:
     def __init__(self):
-        self.id = id(self)
+        self._id = id(self)
+
+    @property
+    def id(self):
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        old_id, self._id = self._id, value
+        if old_id != value:
+            self.onIdChanged(old_id)
+
+    def onIdChanged(self, old_id):
+        """Called when the id was changed, typically restored by `deserialize`. Override to keep the indexes
+        by id up to date"""
+        pass
 
     def serialize(self):
         raise NotImplemented
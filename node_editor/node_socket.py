@@ -52,14 +52,19 @@ class Socket(Serializable):
         self.setSocketPosition()
 
         self.edges = []
+        self.node.scene.addSocket(self)
 
     def __str__(self):
         return return_simple_id(self, 'Socket')
 
+    def onIdChanged(self, old_id):
+        self.node.scene.reindex(self, old_id)
+
     def delete(self):
         """Delete this ``Socket`` from graphics scene"""
         self.grSocket.setParentItem(None)
         self.node.scene.grScene.removeItem(self.grSocket)
+        self.node.scene.removeSocket(self)
         del self.grSocket
 
     def changeSocketType(self, new_socket_type: int) -> bool:
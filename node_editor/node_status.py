@@ -44,6 +44,7 @@ class GraphicsStatus(QGraphicsItem):
         self._invalid_brush = QBrush(QColor('#ed1d25'))
         self._valid_brush = QBrush(QColor('#00a651'))
         self._dirty_brush = QBrush(QColor('#ffe543'))
+        self._running_brush = QBrush(QColor('#3d9be9'))
 
     def hoverEnterEvent(self, event: 'QGraphicsSceneHoverEvent') -> None:
         self._hovered = True
@@ -74,7 +75,10 @@ class GraphicsStatus(QGraphicsItem):
     def paint(self, painter: QPainter, option: 'QStyleOptionGraphicsItem',
               widget: Optional[QWidget] = ...) -> None:
         # painting circle
-        if self.node.isInvalid():
+        if self.node.isRunning():
+            painter.setBrush(self._running_brush)
+            text = "\N{HORIZONTAL ELLIPSIS}"
+        elif self.node.isInvalid():
             painter.setBrush(self._invalid_brush)
             text = '!'
         elif self.node.isDirty():
@@ -42,7 +42,8 @@ def print_items(item):
 def dumpException(e):
     # print('Exception:', e.__class__, e)
     # traceback.print_tb(e.__traceback__)
-    traceback.print_exc()
+    # print the traceback of e, even outside of the except clause (e.g. error raised in a worker thread)
+    traceback.print_exception(type(e), e, e.__traceback__)
 
 
 def loadStylessheet(filename):
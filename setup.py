@@ -34,7 +34,8 @@ setup(
     description="Python Boilerplate contains all the boilerplate you need to create a Python package.",
     entry_points={
         'console_scripts': [
-            '_template=_template.cli:main',
+            'nodeeditor-run=node_editor.node_scene_runner:main',
+            'nodeeditor-convert=node_editor.node_scene_file:main',
         ],
     },
     install_requires=requirements,
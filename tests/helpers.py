@@ -0,0 +1,56 @@
+"""Fixtures shared by the tests, the Qt application is created once on import."""
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from examples.example_data.data_node_base import DataNode
+from examples.example_data.data_node_graphics_base import OpGraphicsNode
+from examples.example_data.data_subwindow import DataSubWindow
+
+# file read by the tests of the data example
+CSV = os.path.join(os.path.dirname(__file__), os.pardir, 'examples', 'example_data', 'pigs.csv')
+
+
+def createWindow() -> DataSubWindow:
+    """Returns a window of the data example evaluating in the calling thread, without periodic backup"""
+    window = DataSubWindow()
+    window.scene.evaluator.setAsynchronous(False)
+    window.scene.autosave.stop()
+    return window
+
+
+class CountingNode(DataNode):
+    """`DataNode` adding `offset` to the sum of its inputs, each evaluation is recorded in `evaluations` with the
+    name of the thread it ran in"""
+    op_title = 'Counting'
+    GraphicsNode_class = OpGraphicsNode
+    evaluations = []
+
+    def __init__(self, scene, name: str, inputs: int = 1, offset: int = 1, delay: float = 0.):
+        self.name = name
+        self.offset = offset
+        self.delay = delay
+        super().__init__(scene, inputs=[1] * inputs, outputs=[1])
+
+    def initPropertiesWidget(self):
+        pass
+
+    def getNodeSettings(self) -> dict:
+        return {'name': self.name, 'offset': self.offset, 'delay': self.delay}
+
+    @classmethod
+    def evalOperation(cls, inputs, settings):
+        time.sleep(settings['delay'])
+        cls.evaluations.append((settings['name'], threading.current_thread().name))
+        return pd.DataFrame({'x': [sum(int(value['x'].iloc[0]) for value in inputs) + settings['offset']]})
+
+    @classmethod
+    def evaluated(cls) -> list:
+        """Returns the names of the evaluated nodes, in the order of their evaluation"""
+        return [name for name, _ in cls.evaluations]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""Tests of the CSV file node of the data example."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tests.helpers import CSV, createWindow
+from examples.example_data.data_subwindow import DataSubWindow
+from examples.example_data.nodes.files import OpNode_ReadCSVFile
+
+
+class TestReadCSVFile(unittest.TestCase):
+    """Settings of `OpNode_ReadCSVFile` saved with the graph."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, 'pigs.csv')
+        shutil.copyfile(CSV, self.filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def createNode(self, window: DataSubWindow, header) -> OpNode_ReadCSVFile:
+        node = OpNode_ReadCSVFile(window.scene)
+        node.restoreNodeSettings({'node_settings': {'filepath_or_buffer': self.filepath, 'encoding': 'utf-8',
+                                                    'index_col': [0], 'header': header}})
+        node.forcedEval()
+        return node
+
+    def reopen(self, window: DataSubWindow) -> OpNode_ReadCSVFile:
+        filename = os.path.join(self.directory, 'graph.json')
+        window.fileSave(filename)
+        reopened = createWindow()
+        self.assertTrue(reopened.fileLoad(filename))
+        return reopened.scene.nodes[0]
+
+    def test_001_header_round_trip(self):
+        """The header rows are restored, the file is read as it was saved"""
+        for header in ([0], None):
+            with self.subTest(header=header):
+                window = createWindow()
+                node = self.createNode(window, header)
+                reopened = self.reopen(window)
+                self.assertEqual(reopened.getNodeSettings()['header'], header)
+                self.assertEqual(reopened.getNodeSettings()['index_col'], [0])
+                self.assertEqual(reopened.value.shape, node.value.shape)
+                self.assertEqual(list(reopened.value.columns), list(node.value.columns))
+
+    def test_002_restore_twice(self):
+        """Restoring the settings again, as undo and redo do, does not duplicate the index and header rows"""
+        node = self.createNode(createWindow(), [0])
+        settings = node.getNodeSettings()
+        node.restoreNodeSettings({'node_settings': settings})
+        self.assertEqual(node.getNodeSettings(), settings)
+
+    def test_003_schema_not_in_history(self):
+        """The schema inferred by the evaluation is saved with the graph but is not an edit of the history"""
+        window = createWindow()
+        node = self.createNode(window, [0])
+        node.schema = None
+        window.scene.history.storeInitialHistoryStamp()
+        node.finishEval(node.value)
+        self.assertIsNotNone(node.schema)
+        self.assertNotIn(node, window.scene.history._changed_nodes)
+        self.assertEqual(node.serialize()['node_settings']['schema'], node.schema)
+        self.assertEqual(self.reopen(window).schema, node.schema)
+
+    def test_004_undo_settings(self):
+        """Undo and redo of a change of the settings read the file with the restored settings"""
+        window = createWindow()
+        history = window.scene.history
+        history.storeInitialHistoryStamp()
+        node = self.createNode(window, [0])
+        history.storeHistory('Read file', setModified=True)
+        with_index = node.value
+        # the index column is removed from the properties widget
+        node._idx_list.setCurrentRow(0)
+        node.onIdxRemBtnClicked()
+        history.storeHistory('Index removed', setModified=True)
+        without_index = node.value
+        self.assertEqual(without_index.shape[1], with_index.shape[1] + 1)
+
+        for step, index_col, expected in ((history.undo, [0], with_index), (history.redo, None, without_index)):
+            with self.subTest(step=step.__name__):
+                step()
+                self.assertEqual(node.getNodeSettings()['index_col'], index_col)
+                self.assertFalse(node.isDirty())
+                pd.testing.assert_frame_equal(node.value, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""Tests of the results saved with the graph, see `node_editor.node_scene_snapshot`."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from tests.helpers import CSV, createWindow
+from node_editor.node_edge import Edge
+from node_editor.node_scene_snapshot import UnsupportedValue, readSnapshot, writeSnapshot
+from examples.example_data.data_subwindow import DataSubWindow
+from examples.example_data.nodes.files import OpNode_ReadCSVFile
+from examples.example_data.nodes.select_columns import DataNode_SelectColumns
+
+
+class TestSnapshotFile(unittest.TestCase):
+    """Round trip of `writeSnapshot` and `readSnapshot`."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'result.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def roundTrip(self, value):
+        writeSnapshot(value, self.path)
+        return readSnapshot(self.path)
+
+    def test_001_frames(self):
+        index = pd.MultiIndex.from_arrays([['a', 'b', None], pd.to_datetime(['2020-01-01', '2021-01-01', None])],
+                                          names=['key', 2])
+        frames = [
+            pd.DataFrame({'x': [1, 2, 3], 'y': [1.5, np.nan, 3.], 's': ['a', np.nan, 'c'], 'b': [True, False, True]}),
+            pd.DataFrame({'i': pd.array([1, None, 3], dtype='Int64'),
+                          't': pd.date_range('2020', periods=3, tz='Europe/Paris'),
+                          's': pd.array(['x', None, 'z'], dtype='string'),
+                          'd': pd.to_timedelta([1, 2, 3], unit='s')}, index=index),
+            pd.DataFrame(np.arange(6).reshape(2, 3), columns=pd.MultiIndex.from_tuples([('a', 1), ('a', 2), ('b', 1)])),
+            pd.DataFrame([[1, 2]], columns=['a', 'a']),
+            pd.DataFrame(index=pd.RangeIndex(2, 10, 2)),
+        ]
+        for frame in frames:
+            with self.subTest(columns=list(frame.columns)):
+                pd.testing.assert_frame_equal(self.roundTrip(frame), frame)
+
+    def test_002_series(self):
+        series = pd.Series([1., 2.], index=['u', 'v'], name='n')
+        pd.testing.assert_series_equal(self.roundTrip(series), series)
+
+    def test_003_unsupported(self):
+        """Values which can not be written as arrays raise UnsupportedValue and leave no file"""
+        for value in (pd.DataFrame({'o': [1, 'a']}), pd.DataFrame({'c': pd.Categorical(['a'])}), 3):
+            with self.subTest(value=value):
+                with self.assertRaises(UnsupportedValue):
+                    writeSnapshot(value, self.path)
+                self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestReopenWithResults(unittest.TestCase):
+    """Results saved with the graph are used on reopen instead of being computed again."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, 'pigs.csv')
+        shutil.copyfile(CSV, self.filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def createWindow(self) -> DataSubWindow:
+        window = createWindow()
+        window.scene.save_results = True
+        return window
+
+    def saveGraph(self, header) -> str:
+        window = self.createWindow()
+        csv = OpNode_ReadCSVFile(window.scene)
+        csv.restoreNodeSettings({'node_settings': {'filepath_or_buffer': self.filepath, 'encoding': 'utf-8',
+                                                   'index_col': [0], 'header': None}})
+        select = DataNode_SelectColumns(window.scene)
+        Edge(window.scene, csv.outputs[0], select.inputs[0])
+        # header rows are selected as from the properties widget
+        for row in header or []:
+            csv._hdr_spinbox.setValue(row)
+            csv.onHdrAddBtnClicked()
+        csv.forcedEval()
+        self.assertEqual(csv.getNodeSettings()['header'], header)
+        self.assertFalse(select.isDirty())
+
+        filename = os.path.join(self.directory, 'graph.json')
+        window.fileSave(filename)
+        self.expected = select.value
+        return filename
+
+    def test_001_csv_not_read_again(self):
+        for header in ([0], None):
+            with self.subTest(header=header):
+                filename = self.saveGraph(header)
+                with mock.patch.object(OpNode_ReadCSVFile, 'evalOperation',
+                                       wraps=OpNode_ReadCSVFile.evalOperation) as evalOperation:
+                    window = self.createWindow()
+                    self.assertTrue(window.fileLoad(filename))
+                    select = [node for node in window.scene.nodes if isinstance(node, DataNode_SelectColumns)][0]
+                    self.assertFalse(select.isDirty())
+                    pd.testing.assert_frame_equal(select.value, self.expected)
+                evalOperation.assert_not_called()
+
+    def test_002_file_changed(self):
+        """The file changed since the graph was saved, it is read again"""
+        filename = self.saveGraph([0])
+        os.utime(self.filepath, (0, 0))
+        with mock.patch.object(OpNode_ReadCSVFile, 'evalOperation',
+                               wraps=OpNode_ReadCSVFile.evalOperation) as evalOperation:
+            self.assertTrue(self.createWindow().fileLoad(filename))
+        evalOperation.assert_called_once()
+
+    def test_003_not_saved_by_default(self):
+        """An ordinary save writes no result next to the graph"""
+        window = createWindow()
+        csv = OpNode_ReadCSVFile(window.scene)
+        csv.restoreNodeSettings({'node_settings': {'filepath_or_buffer': self.filepath, 'encoding': 'utf-8',
+                                                   'index_col': [0], 'header': [0]}})
+        csv.forcedEval()
+        window.fileSave(os.path.join(self.directory, 'graph.json'))
+        self.assertEqual(sorted(name for name in os.listdir(self.directory) if not name.startswith('.')),
+                         ['graph.json', 'pigs.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""Tests of the formatting of the cells of `DataTableModel`."""
+
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from node_editor.dataframe_model.datatable_view import DataTableModel, _formatValue, _formatValues
+
+
+class TestFormatValues(unittest.TestCase):
+    """`_formatValues` formats a column as `_formatValue` formats each of its cells."""
+
+    def test_001_same_as_per_cell(self):
+        columns = {
+            'float': pd.Series([1.5, -0.25, 0., 10., 123456.789, np.nan, np.inf, -np.inf, 1e-6]),
+            'float32': pd.Series([1.5, np.nan, 2.], dtype='float32'),
+            'int': pd.Series([0, -3, 2 ** 40]),
+            'uint': pd.Series([0, 7], dtype='uint8'),
+            'bool': pd.Series([True, False]),
+            'object': pd.Series(['a', None, 1.5, np.nan]),
+            'datetime': pd.Series(pd.to_datetime(['2020-01-01', None])),
+            'nullable': pd.Series([1, None], dtype='Int64'),
+            'category': pd.Series(['x', 'y', None], dtype='category'),
+            'empty': pd.Series([], dtype=float),
+        }
+        for name, values in columns.items():
+            with self.subTest(dtype=name):
+                self.assertEqual(_formatValues(values), [_formatValue(value) for value in values])
+
+    def test_002_model_display(self):
+        """Cells displayed by the model, sorted or not, are formatted as their source value"""
+        dataframe = pd.DataFrame({'x': [3.25, np.nan, 1., 2.5], 's': ['c', 'a', None, 'b']})
+        model = DataTableModel(None, dataframe)
+        for sort in (None, (0, Qt.AscendingOrder), (1, Qt.DescendingOrder)):
+            with self.subTest(sort=sort):
+                if sort is not None:
+                    model.sort(*sort)
+                for row in range(model.rowCount()):
+                    for column in range(model.columnCount()):
+                        value = dataframe.iat[model.sourceRow(row), column]
+                        self.assertEqual(model.data(model.index(row, column), Qt.DisplayRole), _formatValue(value))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""Tests of the spans of the headers of the table views."""
+
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from node_editor.dataframe_model.datatable_header import HeaderView
+
+
+def sameLabel(first, second) -> bool:
+    return first == second or (pd.isna(first) and pd.isna(second))
+
+
+def expectedSpans(index: pd.Index, rows=None) -> list:
+    """Runs of each level found by comparing the labels one by one, as the headers did before"""
+    labels = [label if isinstance(index, pd.MultiIndex) else (label,) for label in index]
+    if rows is not None:
+        labels = [labels[row] for row in rows]
+    spans = []
+    for nlevel in range(index.nlevels):
+        starts, sizes = [], []
+        start = 0
+        for section in range(1, len(labels) + 1):
+            if section < len(labels) and all(sameLabel(labels[section][level], labels[section - 1][level])
+                                             for level in range(nlevel + 1)):
+                continue
+            if section - start > 1:
+                starts.append(start)
+                sizes.append(section - start)
+            start = section
+        spans.append((starts, sizes))
+    return spans
+
+
+class TestComputeSpans(unittest.TestCase):
+    """`HeaderView._compute_spans` finds the runs of identical labels from the codes of the levels."""
+
+    def assertSpans(self, index: pd.Index, rows=None):
+        spans = HeaderView._compute_spans(index, rows)
+        self.assertEqual([(starts.tolist(), sizes.tolist()) for starts, sizes in spans], expectedSpans(index, rows))
+
+    def test_001_multiindex(self):
+        index = pd.MultiIndex.from_arrays([['a', 'a', 'a', 'b', 'b', 'a', 'a', np.nan, np.nan],
+                                           [1, 1, 2, 2, 2, 2, 2, 3, 3],
+                                           ['x', 'x', 'x', 'x', 'y', 'y', 'y', 'z', 'z']])
+        self.assertSpans(index)
+        # an outer change ends the runs of the inner levels
+        starts, sizes = HeaderView._compute_spans(index)[1]
+        self.assertEqual(starts.tolist(), [0, 3, 5, 7])
+        self.assertEqual(sizes.tolist(), [2, 2, 2, 2])
+
+    def test_002_rows(self):
+        """The labels are taken in the order of the displayed rows"""
+        index = pd.MultiIndex.from_product([['a', 'b'], [1, 2, 3]])
+        for rows in (np.arange(6), np.array([0, 3, 1, 4, 2, 5]), np.array([5, 4, 1, 0]), np.array([2]),
+                     np.zeros(0, dtype=int)):
+            with self.subTest(rows=rows.tolist()):
+                self.assertSpans(index, rows)
+
+    def test_003_single_level(self):
+        for index in (pd.Index(['a', 'a', 'b', 'a', 'a', 'a']), pd.Index([1., np.nan, np.nan, 2.]),
+                      pd.Index(['a', 'b', 'c']), pd.RangeIndex(5), pd.Index([], dtype=object)):
+            with self.subTest(index=list(index)):
+                self.assertSpans(index)
+                self.assertSpans(index, np.arange(len(index))[::-1])
+
+    def test_004_random(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            index = pd.MultiIndex.from_arrays([rng.integers(0, 3, 50), rng.integers(0, 2, 50),
+                                               rng.choice(['u', 'v'], 50)])
+            self.assertSpans(index.sortlevel()[0])
+            self.assertSpans(index, rng.permutation(50)[:30])
+
+
+if __name__ == '__main__':
+    unittest.main()
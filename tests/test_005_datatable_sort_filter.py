@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests of the sort and the filters of `DataTableModel`."""
+
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from node_editor.dataframe_model.datatable_view import DataTableModel, Filter
+
+
+def expectedOrder(values: pd.Series, ascending: bool) -> list:
+    """Positions of `values` sorted by a stable sort, equal values in their original order and missing ones last"""
+    missing = [position for position in range(len(values)) if pd.isna(values.iloc[position])]
+    present = [position for position in range(len(values)) if not pd.isna(values.iloc[position])]
+    # the sort of python is stable in both directions
+    return sorted(present, key=lambda position: values.iloc[position], reverse=not ascending) + missing
+
+
+class TestSort(unittest.TestCase):
+    """The rows are sorted through a permutation, stable in both orders with missing values last."""
+
+    def setUp(self):
+        self.dataframe = pd.DataFrame({
+            'float': [2., np.nan, 1., 2., np.nan, 1., 3., 2.],
+            'int': [1, 3, 1, 2, 3, 1, 0, 2],
+            'uint': np.array([1, 3, 1, 2, 3, 1, 0, 2], dtype='uint8'),
+            'bool': [True, False, True, False, False, True, True, False],
+            'str': ['b', None, 'a', 'b', 'c', None, 'a', 'b'],
+            'nullable': pd.array([2, None, 1, 2, None, 1, 3, 2], dtype='Int64'),
+            'date': pd.to_datetime(['2020', None, '2019', '2020', '2021', '2019', None, '2020']),
+        })
+        self.model = DataTableModel(None, self.dataframe)
+
+    def displayedRows(self) -> list:
+        return [self.model.sourceRow(row) for row in range(self.model.rowCount())]
+
+    def test_001_orders(self):
+        for column, name in enumerate(self.dataframe.columns):
+            for order in (Qt.AscendingOrder, Qt.DescendingOrder):
+                with self.subTest(column=name, order=order):
+                    self.model.sort(column, order)
+                    self.assertEqual(self.displayedRows(),
+                                     expectedOrder(self.dataframe[name], order == Qt.AscendingOrder))
+
+    def test_002_successive_sorts(self):
+        """Sorting by a second column keeps the order of the first one among equal values"""
+        self.model.sort(0, Qt.DescendingOrder)
+        self.model.sort(1, Qt.DescendingOrder)
+        expected = self.dataframe.iloc[expectedOrder(self.dataframe['float'], False)]
+        expected = expected.iloc[expectedOrder(expected['int'], False)]
+        self.assertEqual(self.displayedRows(), [self.dataframe.index.get_loc(label) for label in expected.index])
+
+    def test_003_unsorted(self):
+        self.model.sort(2, Qt.AscendingOrder)
+        self.model.sort(-1)
+        self.assertIsNone(self.model.rows)
+        self.assertEqual(self.displayedRows(), list(range(len(self.dataframe))))
+
+    def test_004_new_dataframe(self):
+        """The sort is applied to a new dataframe, dropped if its column does not exist any more"""
+        self.model.sort(1, Qt.AscendingOrder)
+        self.model.dataframe = self.dataframe.iloc[::-1]
+        self.assertEqual(self.displayedRows(), expectedOrder(self.dataframe['int'].iloc[::-1], True))
+        self.model.dataframe = self.dataframe.iloc[:, :1]
+        self.assertIsNone(self.model.rows)
+
+
+class TestFilter(unittest.TestCase):
+    """The rows displayed are the ones matching all the enabled filters, in the order of the sort."""
+
+    def setUp(self):
+        self.dataframe = pd.DataFrame({'x': [5., 1., np.nan, 3., 4., 2.], 'y': list('abcabc')})
+        self.model = DataTableModel(None, self.dataframe)
+
+    def displayedRows(self) -> list:
+        return [self.model.sourceRow(row) for row in range(self.model.rowCount())]
+
+    def test_001_masks(self):
+        self.model.addFilter(Filter('x > 1'))
+        self.assertEqual(self.displayedRows(), [0, 3, 4, 5])
+        self.model.addFilter(Filter('y != "a"'))
+        self.assertEqual(self.displayedRows(), [4, 5])
+
+        self.model.toggleFilter(0)
+        self.assertEqual(self.displayedRows(), [1, 2, 4, 5])
+        self.model.editFilter(1, 'y == "c"')
+        self.assertEqual(self.displayedRows(), [2, 5])
+        self.model.toggleFilter(1)
+        self.assertIsNone(self.model.rows)
+
+    def test_002_sorted(self):
+        self.model.sort(0, Qt.DescendingOrder)
+        self.model.addFilter(Filter('y != "a"'))
+        self.assertEqual(self.displayedRows(), [4, 5, 1, 2])
+
+    def test_003_failed(self):
+        """An expression which can not be evaluated, or is not boolean, filters nothing and is marked as failed"""
+        for expr in ('z > 1', 'x + 1'):
+            with self.subTest(expr=expr):
+                model = DataTableModel(None, self.dataframe)
+                model.addFilter(Filter(expr))
+                self.assertTrue(model.filters[0].failed)
+                self.assertIsNone(model.rows)
+                self.assertEqual(model.rowCount(), len(self.dataframe))
+
+    def test_004_new_dataframe(self):
+        """Masks are evaluated again on a new dataframe"""
+        self.model.addFilter(Filter('x > 2'))
+        self.model.dataframe = self.dataframe.assign(x=self.dataframe['x'] * 2)
+        self.assertEqual(self.displayedRows(), [0, 3, 4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests of the statistics of the columns shown in the table headers."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from node_editor.dataframe_model.datatable_statistics import computeStatistics, estimateUnique
+
+
+class TestComputeStatistics(unittest.TestCase):
+    """`computeStatistics` is exact below the size of the sample and estimates above."""
+
+    def test_001_exact(self):
+        columns = {
+            'float': (pd.Series([2.5, np.nan, -1., 2.5]), -1., 2.5, 1, 2),
+            'int': (pd.Series([3, 1, 3, 2]), 1, 3, 0, 3),
+            'str': (pd.Series(['b', None, 'a', 'b']), 'a', 'b', 1, 2),
+            'date': (pd.Series(pd.to_datetime(['2020', None, '2019'])),
+                     pd.Timestamp('2019'), pd.Timestamp('2020'), 1, 2),
+            'nullable': (pd.Series([1, None, 1], dtype='Int64'), 1, 1, 1, 1),
+        }
+        for name, (values, minimum, maximum, nulls, unique) in columns.items():
+            with self.subTest(dtype=name):
+                statistics = computeStatistics(values)
+                self.assertEqual((statistics['min'], statistics['max']), (minimum, maximum))
+                self.assertEqual(statistics['nulls'], nulls)
+                self.assertEqual(statistics['unique'], unique)
+                self.assertEqual(statistics['estimated'], ())
+
+    def test_002_missing(self):
+        statistics = computeStatistics(pd.Series([np.nan, np.nan]))
+        self.assertEqual((statistics['min'], statistics['max'], statistics['nulls'], statistics['unique']),
+                         (None, None, 2, 0))
+
+    def test_003_not_comparable(self):
+        """Values which can not be compared have no extremes, their distinct values are still counted"""
+        statistics = computeStatistics(pd.Series([1, 'a', None]))
+        self.assertIsNone(statistics['min'])
+        self.assertIsNone(statistics['max'])
+        self.assertEqual(statistics['unique'], 2)
+
+    def test_004_sampled(self):
+        """Over the size of the sample, the extremes of numbers stay exact and the distinct values are estimated"""
+        rng = np.random.default_rng(1)
+        values = pd.Series(rng.integers(0, 5000, 20000).astype(float))
+        values.iloc[::10] = np.nan
+        statistics = computeStatistics(values, sample_rows=2000)
+        self.assertEqual(statistics['estimated'], ('unique',))
+        self.assertEqual(statistics['nulls'], 2000)
+        self.assertEqual((statistics['min'], statistics['max']), (values.min(), values.max()))
+        self.assertAlmostEqual(statistics['unique'] / values.nunique(), 1, delta=0.5)
+
+        strings = values.dropna().astype(int).astype(str)
+        statistics = computeStatistics(strings, sample_rows=2000)
+        self.assertEqual(statistics['estimated'], ('min', 'max', 'unique'))
+        self.assertIn(statistics['min'], set(strings))
+
+
+class TestEstimateUnique(unittest.TestCase):
+    """`estimateUnique` extrapolates the distinct values of a sample to the population."""
+
+    def test_001_bounds(self):
+        self.assertEqual(estimateUnique(pd.Series([], dtype=int), 100), 0)
+        # never more than the population nor less than the values seen
+        self.assertEqual(estimateUnique(pd.Series([1] * 10), 10), 10)
+        self.assertGreaterEqual(estimateUnique(pd.Series([5, 3, 2]), 1000), 3)
+
+    def test_002_no_new_values(self):
+        """Every value seen several times, the population likely holds no other value"""
+        self.assertEqual(estimateUnique(pd.Series([10, 20, 30]), 10000), 3)
+
+    def test_003_distributions(self):
+        rng = np.random.default_rng(2)
+        population = 100000
+        for name, values in (('distinct', np.arange(population)),
+                             ('uniform', rng.integers(0, 1000, population)),
+                             ('skewed', rng.zipf(1.5, population))):
+            with self.subTest(distribution=name):
+                sample = rng.choice(values, 5000, replace=False)
+                estimate = estimateUnique(pd.Series(sample).value_counts(), population)
+                actual = len(np.unique(values))
+                self.assertGreaterEqual(estimate, len(np.unique(sample)))
+                self.assertLess(max(estimate / actual, actual / estimate), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+"""Tests of the history of the changes of the scene, see `node_editor.node_scene_history`."""
+
+import unittest
+
+import pandas as pd
+from PyQt5.QtCore import QEvent, QPoint, Qt
+from PyQt5.QtGui import QMouseEvent
+
+from tests.helpers import CSV, app, createWindow
+from node_editor.node_edge import Edge
+from examples.example_data.nodes.files import OpNode_ReadCSVFile
+from examples.example_data.nodes.select_columns import DataNode_SelectColumns
+
+
+def sceneState(scene) -> dict:
+    """Returns the serialized nodes and edges of `scene` by id, whatever their order in the scene"""
+    data = scene.serialize()
+    return {key: {item['id']: item for item in data[key]} for key in ('nodes', 'edges')}
+
+
+def sceneValues(scene) -> dict:
+    return {node.id: node.value for node in scene.nodes}
+
+
+def createCSV(scene, index_col) -> OpNode_ReadCSVFile:
+    node = OpNode_ReadCSVFile(scene)
+    node.restoreNodeSettings({'node_settings': {'filepath_or_buffer': CSV, 'encoding': 'utf-8',
+                                                'index_col': index_col, 'header': [0]}})
+    node.forcedEval()
+    return node
+
+
+class HistoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.window = createWindow()
+        self.scene = self.window.scene
+        self.history = self.scene.history
+
+    def assertBookkeeping(self):
+        """The memory used is the size of the distinct blobs referenced by the stamps and the state"""
+        references = {}
+        blobs = list(self.history._state['nodes'].values()) + list(self.history._state['edges'].values())
+        for history_stamp in self.history.history_stack:
+            blobs.extend(self.history._stampBlobs(history_stamp))
+        for blob in blobs:
+            references[id(blob)] = references.get(id(blob), 0) + 1
+        self.assertEqual(self.history._references, references)
+        distinct = {id(blob): blob for blob in blobs}
+        self.assertEqual(self.history.used_bytes, sum(len(blob) for blob in distinct.values()))
+
+
+class TestUndoRedo(HistoryTestCase):
+    """Undo and redo restore the scene of each stamp, and the values of its nodes."""
+
+    def test_001_round_trip(self):
+        states, values = [], []
+
+        def stamp(desc):
+            self.history.storeHistory(desc, setModified=True)
+            states.append(sceneState(self.scene))
+            values.append(sceneValues(self.scene))
+            self.assertBookkeeping()
+
+        stamp('Initial History Stamp')
+        csv = createCSV(self.scene, [0])
+        stamp('Add file')
+        select = DataNode_SelectColumns(self.scene)
+        edge = Edge(self.scene, csv.outputs[0], select.inputs[0])
+        select.forcedEval()
+        stamp('Add selection')
+        select.setPos(200, 50)
+        stamp('Move')
+        # the index column is removed from the properties widget
+        csv._idx_list.setCurrentRow(0)
+        csv.onIdxRemBtnClicked()
+        stamp('Settings changed')
+        other = createCSV(self.scene, None)
+        edge.start_socket = other.outputs[0]
+        select.forcedEval()
+        stamp('Reconnect')
+        csv.remove()
+        stamp('Remove')
+
+        for step in range(len(states) - 2, -1, -1):
+            self.history.undo()
+            self.assertStep(states[step], values[step])
+        self.assertFalse(self.history.canUndo())
+        for step in range(1, len(states)):
+            self.history.redo()
+            self.assertStep(states[step], values[step])
+        self.assertFalse(self.history.canRedo())
+
+    def assertStep(self, state: dict, values: dict):
+        with self.subTest(step=self.history.history_current_step):
+            self.assertEqual(sceneState(self.scene), state)
+            current = sceneValues(self.scene)
+            self.assertEqual(current.keys(), values.keys())
+            for node_id, value in values.items():
+                if value is None:
+                    self.assertIsNone(current[node_id])
+                else:
+                    pd.testing.assert_frame_equal(current[node_id], value)
+            self.assertBookkeeping()
+
+    def test_002_new_branch(self):
+        """A stamp stored after an undo drops the stamps which were undone, and their data"""
+        self.history.storeInitialHistoryStamp()
+        node = createCSV(self.scene, [0])
+        self.history.storeHistory('Add file')
+        for position in range(3):
+            node.setPos(position * 10, 0)
+            self.history.storeHistory('Move')
+        self.history.undo()
+        self.history.undo()
+        node.setPos(0, 100)
+        self.history.storeHistory('Move')
+        self.assertEqual(len(self.history.history_stack), 4)
+        self.assertFalse(self.history.canRedo())
+        self.assertBookkeeping()
+
+
+class TestMemoryBudget(HistoryTestCase):
+    """The oldest stamps are dropped once the history exceeds its memory budget."""
+
+    def setUp(self):
+        super().setUp()
+        self.history.storeInitialHistoryStamp()
+        self.node = createCSV(self.scene, [0])
+        self.history.storeHistory('Add file')
+        for position in range(8):
+            self.node.setPos(position * 10, 0)
+            self.history.storeHistory('Move')
+
+    def test_001_shared_blobs(self):
+        """The data of a node after a change is the data before its next change, stored once"""
+        previous, current = self.history.history_stack[-2:]
+        self.assertIs(current['nodes'][self.node.id][0], previous['nodes'][self.node.id][1])
+        self.assertIs(self.history._state['nodes'][self.node.id], current['nodes'][self.node.id][1])
+        self.assertBookkeeping()
+
+    def test_002_evict(self):
+        stack = list(self.history.history_stack)
+        self.history.setMaxBytes(self.history.used_bytes - 1)
+        self.assertLess(len(self.history.history_stack), len(stack))
+        # the most recent stamps are kept, the current one last
+        self.assertEqual(self.history.history_stack, stack[len(stack) - len(self.history.history_stack):])
+        self.assertEqual(self.history.history_current_step, len(self.history.history_stack) - 1)
+        self.assertLessEqual(self.history.used_bytes, self.history.max_bytes)
+        self.assertBookkeeping()
+
+        # the current stamp is kept whatever its size
+        self.history.setMaxBytes(1)
+        self.assertEqual(self.history.history_stack, stack[-1:])
+        self.assertEqual(self.history.history_current_step, 0)
+        self.assertFalse(self.history.canUndo())
+        self.assertBookkeeping()
+
+        # the stamps stored afterwards are dropped as well
+        self.node.setPos(0, 100)
+        self.history.storeHistory('Move')
+        self.assertEqual(len(self.history.history_stack), 1)
+        self.assertBookkeeping()
+
+    def test_003_evict_undone(self):
+        """Stamps undone are dropped first when a new stamp is stored"""
+        self.history.undo()
+        self.history.undo()
+        self.history.setMaxBytes(self.history.used_bytes)
+        self.node.setPos(0, 100)
+        self.history.storeHistory('Move')
+        self.assertFalse(self.history.canRedo())
+        self.assertLessEqual(self.history.used_bytes, self.history.max_bytes)
+        self.assertBookkeeping()
+
+    def test_004_clear(self):
+        """Once cleared, the memory used is the one of the state of the scene and of the initial stamp"""
+        self.history.clear()
+        self.assertEqual(self.history.used_bytes, 0)
+        self.history.storeInitialHistoryStamp()
+        state = list(self.history._state['nodes'].values()) + list(self.history._state['edges'].values())
+        self.assertEqual(self.history.used_bytes,
+                         sum(len(blob) for blob in state) + len(self.history.history_stack[0]['selection']))
+        self.assertBookkeeping()
+
+
+class TestGroupedStamps(HistoryTestCase):
+    """Operations changing several objects, and bursts of selection changes, store a single stamp."""
+
+    def setUp(self):
+        super().setUp()
+        self.csv = createCSV(self.scene, [0])
+        self.select = DataNode_SelectColumns(self.scene)
+        self.select.setPos(300, 0)
+        self.edge = Edge(self.scene, self.csv.outputs[0], self.select.inputs[0])
+        self.select.forcedEval()
+        self.history.storeInitialHistoryStamp()
+
+    def selectNodes(self, nodes):
+        for item in self.scene.grScene.selectedItems():
+            item.setSelected(False)
+        for node in nodes:
+            node.grNode.setSelected(True)
+
+    def test_001_paste(self):
+        self.selectNodes([self.csv, self.select])
+        self.edge.grEdge.setSelected(True)
+        self.history.flushSelection()
+        data = self.scene.clipboard.serializeSelected()
+        count = len(self.history.history_stack)
+        pasted = self.scene.clipboard.deserializeFromClipboard(data)
+        self.assertEqual(len(pasted), 2)
+        self.assertEqual(len(self.history.history_stack), count + 1)
+        self.assertEqual(len(self.scene.nodes), 4)
+        self.assertEqual(len(self.scene.edges), 2)
+
+        self.history.undo()
+        self.assertEqual(len(self.scene.nodes), 2)
+        self.assertEqual(len(self.scene.edges), 1)
+        self.assertBookkeeping()
+
+    def test_002_drag(self):
+        """The selected nodes moved along with the dragged one, in a single stamp"""
+        self.selectNodes([self.csv, self.select])
+        self.history.flushSelection()
+        count = len(self.history.history_stack)
+        positions = {node: (node.pos.x(), node.pos.y()) for node in (self.csv, self.select)}
+
+        # the title of the file node is dragged, the window is not shown
+        view = self.scene.getView()
+        view.resize(1000, 800)
+        rect = self.csv.grNode.sceneBoundingRect()
+        start = view.mapFromScene(rect.center().x(), rect.top() + 10)
+        app.sendEvent(view.viewport(), QMouseEvent(QEvent.MouseButtonPress, start, Qt.LeftButton, Qt.LeftButton,
+                                                   Qt.NoModifier))
+        for step in range(1, 6):
+            app.sendEvent(view.viewport(), QMouseEvent(QEvent.MouseMove, start + QPoint(10 * step, 5 * step),
+                                                       Qt.NoButton, Qt.LeftButton, Qt.NoModifier))
+        app.sendEvent(view.viewport(), QMouseEvent(QEvent.MouseButtonRelease, start + QPoint(50, 25),
+                                                   Qt.LeftButton, Qt.NoButton, Qt.NoModifier))
+        self.assertEqual([(node.pos.x() - x, node.pos.y() - y) for node, (x, y) in positions.items()],
+                         [(50, 25), (50, 25)])
+        self.assertEqual(len(self.history.history_stack), count + 1)
+        self.assertEqual(set(self.history.history_stack[-1]['nodes']), {self.csv.id, self.select.id})
+
+        self.history.undo()
+        self.assertEqual({node: (node.pos.x(), node.pos.y()) for node in positions}, positions)
+        self.assertBookkeeping()
+
+    def test_003_transaction(self):
+        """Nested transactions store one stamp when the outermost one is committed, none if nothing changed"""
+        count = len(self.history.history_stack)
+        with self.history.transaction('Outer'):
+            with self.history.transaction('Inner'):
+                self.csv.setPos(0, 100)
+                self.history.storeHistory('Moved')
+            self.select.setPos(0, 200)
+            self.history.storeHistory('Moved')
+            self.assertEqual(len(self.history.history_stack), count)
+        self.assertEqual(len(self.history.history_stack), count + 1)
+        self.assertEqual(self.history.history_stack[-1]['desc'], 'Outer')
+        self.assertEqual(set(self.history.history_stack[-1]['nodes']), {self.csv.id, self.select.id})
+
+        with self.history.transaction('Nothing'):
+            pass
+        self.assertEqual(len(self.history.history_stack), count + 1)
+
+    def test_004_selection_burst(self):
+        count = len(self.history.history_stack)
+        for nodes in ([self.csv], [self.csv, self.select], [self.select]):
+            self.selectNodes(nodes)
+            self.history.storeSelection('Selection Changed')
+        self.assertEqual(len(self.history.history_stack), count)
+        self.history.flushSelection()
+        self.assertEqual(len(self.history.history_stack), count + 1)
+        self.assertEqual(self.history.captureCurrentSelection()['nodes'], [self.select.id])
+
+        # nothing pending any more
+        self.history.flushSelection()
+        self.assertEqual(len(self.history.history_stack), count + 1)
+
+    def test_005_same_selection(self):
+        """A selection back to the one of the current stamp stores nothing"""
+        self.selectNodes([self.csv])
+        self.history.storeHistory('Selected')
+        count = len(self.history.history_stack)
+        for nodes in ([self.select], [self.csv]):
+            self.selectNodes(nodes)
+            self.history.storeSelection('Selection Changed')
+        self.history.flushSelection()
+        self.assertEqual(len(self.history.history_stack), count)
+
+    def test_006_stamp_records_selection(self):
+        """A stamp stored meanwhile records the pending selection, which is not stored again"""
+        self.selectNodes([self.csv])
+        self.history.storeSelection('Selection Changed')
+        self.csv.setPos(0, 100)
+        self.history.storeHistory('Moved')
+        count = len(self.history.history_stack)
+        self.history.flushSelection()
+        self.assertEqual(len(self.history.history_stack), count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+
+"""Tests of the cache of the results of the scene, see `node_editor.node_scene_cache`."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tests.helpers import CountingNode, createWindow
+from node_editor.node_edge import Edge
+from node_editor.node_scene_cache import (FINGERPRINT_BLOCK_ROWS, FINGERPRINT_BLOCKS, ResultCache, fingerprint,
+                                          makeKey, sizeOf)
+
+
+def largeFrame() -> pd.DataFrame:
+    rows = FINGERPRINT_BLOCK_ROWS * FINGERPRINT_BLOCKS * 4
+    return pd.DataFrame({'x': np.arange(rows, dtype=float), 's': np.arange(rows).astype(str)})
+
+
+def unsampledChange(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Returns a copy of `dataframe` with a value changed in a row the fingerprint does not sample"""
+    changed = dataframe.copy()
+    changed.iloc[FINGERPRINT_BLOCK_ROWS + 1, 0] = -1.
+    return changed
+
+
+def frame(value: float, rows: int = 1000) -> pd.DataFrame:
+    return pd.DataFrame({'x': np.full(rows, value)})
+
+
+class TestResultCache(unittest.TestCase):
+    """Results are stored under the key of their computation, the least recently used ones evicted first."""
+
+    def setUp(self):
+        self.size = sizeOf(frame(0.))
+        # room for two results
+        self.cache = ResultCache(None, max_bytes=int(self.size * 2.5))
+
+    def test_001_key(self):
+        self.assertEqual(makeKey('op', {'a': 1, 'b': [2]}, ['k']), makeKey('op', {'b': [2], 'a': 1}, ['k']))
+        self.assertNotEqual(makeKey('op', {'a': 1}, ['k']), makeKey('op', {'a': 2}, ['k']))
+        self.assertNotEqual(makeKey('op', {'a': 1}, ['k']), makeKey('op', {'a': 1}, ['l']))
+
+    def test_002_hit(self):
+        value = frame(1.)
+        self.cache.put('a', value)
+        self.assertIs(self.cache.get('a'), value)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNone(self.cache.get(None))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertEqual(self.cache.used_bytes, self.size)
+        # a result stored again under the same key replaces the previous one
+        self.cache.put('a', frame(2.))
+        self.assertEqual(self.cache.used_bytes, self.size)
+        self.assertEqual(self.cache.get('a')['x'].iloc[0], 2.)
+
+    def test_003_lru(self):
+        for key in ('a', 'b'):
+            self.cache.put(key, frame(0.))
+        # a lookup makes `a` the most recently used
+        self.cache.get('a')
+        self.cache.put('c', frame(0.))
+        self.assertEqual(list(self.cache._entries), ['a', 'c'])
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.used_bytes, 2 * self.size)
+
+        # peek does not change the order
+        self.cache.peek('a')
+        self.cache.setMaxBytes(self.size)
+        self.assertEqual(list(self.cache._entries), ['c'])
+        self.assertEqual(self.cache.used_bytes, self.size)
+
+    def test_004_too_large(self):
+        self.cache.put('a', frame(0.))
+        self.cache.put('large', frame(0., rows=5000))
+        self.assertNotIn('large', self.cache)
+        self.assertEqual(list(self.cache._entries), ['a'])
+
+
+class TestSpill(unittest.TestCase):
+    """Evicted results are written to the spill directory and loaded back on their next lookup."""
+
+    def setUp(self):
+        self.size = sizeOf(frame(0.))
+        self.cache = ResultCache(None, max_bytes=int(self.size * 2.5))
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache.setSpillDirectory(self.directory.name)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_001_reload(self):
+        first = pd.DataFrame({'x': np.arange(1000.), 's': ['a', 'b'] * 500,
+                              'd': pd.date_range('2020', periods=1000)},
+                             index=pd.Index(['r%d' % row for row in range(1000)], name='row'))
+        # room for `first` and one other result
+        self.cache.setMaxBytes(sizeOf(first) + int(self.size * 1.5))
+        self.cache.put('a', first)
+        for key in ('b', 'c'):
+            self.cache.put(key, frame(0.))
+        self.assertEqual(list(self.cache._spilled), ['a'])
+        self.assertIn('a', self.cache)
+        path, size = self.cache._spilled['a']
+        self.assertEqual(os.path.dirname(path), self.directory.name)
+        self.assertEqual(self.cache.spilled_bytes, os.path.getsize(path))
+
+        misses = self.cache.misses
+        reloaded = self.cache.get('a')
+        self.assertEqual(self.cache.misses, misses)
+        pd.testing.assert_frame_equal(reloaded, first)
+        # back in memory, the least recently used result takes its place on disk
+        self.assertIn('a', self.cache._entries)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(self.cache._spilled), ['b'])
+        self.assertEqual(self.cache.spilled_bytes, self.cache._spilled['b'][1])
+
+    def test_002_clear(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.put(key, frame(0.))
+        self.cache.discard('a')
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.cache.put('d', frame(0.))
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.assertEqual((self.cache.used_bytes, self.cache.spilled_bytes, len(self.cache)), (0, 0, 0))
+
+    def test_003_temporary_directory(self):
+        """A temporary spill directory is removed on close, a given one is kept"""
+        self.cache.setSpillDirectory()
+        directory = self.cache.spill_directory
+        self.assertTrue(os.path.isdir(directory))
+        self.cache.setSpillDirectory(self.directory.name)
+        self.assertFalse(os.path.exists(directory))
+
+        self.cache.setSpillDirectory()
+        directory = self.cache.spill_directory
+        self.cache.close()
+        self.assertFalse(os.path.exists(directory))
+        self.assertFalse(self.cache.isSpilling())
+        self.assertTrue(os.path.isdir(self.directory.name))
+
+    def test_004_disabled(self):
+        """Without spill directory, evicted results are dropped"""
+        self.cache.close()
+        for key in ('a', 'b', 'c'):
+            self.cache.put(key, frame(0.))
+        self.assertNotIn('a', self.cache)
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestNodeCache(unittest.TestCase):
+    """A node whose settings and inputs come back to a previous state reuses its result."""
+
+    def setUp(self):
+        self.window = createWindow()
+        self.scene = self.window.scene
+        self.a = CountingNode(self.scene, 'A', inputs=0)
+        self.b = CountingNode(self.scene, 'B')
+        Edge(self.scene, self.a.outputs[0], self.b.inputs[0])
+        self.scene.evaluator.evalNodes([self.a])
+        CountingNode.evaluations.clear()
+
+    def test_001_toggle_back(self):
+        self.a.offset = 2
+        self.scene.evaluator.evalNodes([self.a])
+        self.assertEqual(CountingNode.evaluated(), ['A', 'B'])
+        hits = self.scene.cache.hits
+
+        self.a.offset = 1
+        self.scene.evaluator.evalNodes([self.a])
+        self.assertEqual(CountingNode.evaluated(), ['A', 'B'])
+        self.assertGreater(self.scene.cache.hits, hits)
+        self.assertEqual(self.b.value['x'].iloc[0], 2)
+
+    def test_002_forced(self):
+        """A forced evaluation does not look the result up"""
+        self.scene.evaluator.evalNodes([self.a], force=True)
+        self.assertEqual(CountingNode.evaluated(), ['A'])
+
+
+class TestFingerprint(unittest.TestCase):
+    """Fingerprints sample the rows of large results, the whole content is compared only when they match."""
+
+    def test_001_sampled(self):
+        dataframe = largeFrame()
+        changed = unsampledChange(dataframe)
+        self.assertEqual(fingerprint(changed), fingerprint(dataframe))
+        self.assertNotEqual(fingerprint(changed, full=True), fingerprint(dataframe, full=True))
+        # shape, labels and types are always part of the fingerprint
+        for other in (dataframe.iloc[:-1], dataframe.rename(columns={'x': 'y'}), dataframe.astype({'x': 'float32'})):
+            self.assertNotEqual(fingerprint(other), fingerprint(dataframe))
+
+    def test_002_small(self):
+        """Small results are hashed whole"""
+        dataframe = pd.DataFrame({'x': [1., 2., 3.]})
+        self.assertEqual(fingerprint(dataframe), fingerprint(dataframe, full=True))
+        self.assertNotEqual(fingerprint(dataframe.replace(2., 0.)), fingerprint(dataframe))
+        self.assertIsNone(fingerprint(3))
+        self.assertIsNone(fingerprint(pd.DataFrame({'l': [[1], [2]]})))
+
+    def test_003_against_previous(self):
+        cache = ResultCache(None)
+        dataframe = largeFrame()
+        digest = fingerprint(dataframe)
+        for previous_value in (dataframe, None):
+            with self.subTest(previous_in_memory=previous_value is not None):
+                previous = (previous_value, digest)
+                # an identical result keeps the previous fingerprint, when it can be compared
+                same = cache.fingerprintJob(None, lambda: dataframe.copy(), previous)()
+                same_digest = cache.getFingerprint(None, same)
+                if previous_value is None:
+                    self.assertNotEqual(same_digest, digest)
+                else:
+                    self.assertEqual(same_digest, digest)
+                # a result differing in rows which are not sampled has another fingerprint
+                changed = cache.fingerprintJob(None, lambda: unsampledChange(dataframe), previous)()
+                changed_digest = cache.getFingerprint(None, changed)
+                self.assertNotEqual(changed_digest, digest)
+                self.assertNotEqual(changed_digest, same_digest)
+
+        # full fingerprints are compared as such
+        full = cache.getFingerprint(None, cache.fingerprintJob(None, lambda: unsampledChange(dataframe),
+                                                               (None, digest))())
+        again = cache.fingerprintJob(None, lambda: unsampledChange(dataframe), (None, full))()
+        self.assertEqual(cache.getFingerprint(None, again), full)
+
+    def test_004_forgotten(self):
+        """Fingerprints are dropped along with their results"""
+        cache = ResultCache(None, max_bytes=10 ** 6)
+        values = {}
+        for key in ('a', 'b', 'c'):
+            values[key] = cache.fingerprintJob(key, lambda: pd.DataFrame({'x': np.arange(50000.)}))()
+            cache.getFingerprint(key, values[key])
+            cache.put(key, values[key])
+        self.assertEqual(set(cache._fingerprints), {'b', 'c'})
+        cache.discard('b')
+        self.assertEqual(set(cache._fingerprints), {'c'})
+
+        value = cache.fingerprintJob(None, lambda: pd.DataFrame({'x': [1]}))()
+        self.assertEqual(len(cache._value_fingerprints), 1)
+        cache.clear()
+        self.assertEqual(cache._fingerprints, {})
+        self.assertEqual(cache._value_fingerprints, {})
+        self.assertIsNotNone(cache.getFingerprint(None, value))
+
+
+if __name__ == '__main__':
+    unittest.main()
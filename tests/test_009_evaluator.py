@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""Tests of the evaluation of the nodes of the scene, see `node_editor.node_scene_evaluator`."""
+
+import threading
+import time
+import unittest
+
+from tests.helpers import CountingNode, app, createWindow
+from node_editor.node_edge import Edge
+
+
+class EvaluatorTestCase(unittest.TestCase):
+    """The diamond A -> B, A -> C, (B, C) -> D, evaluated once before each test"""
+
+    def setUp(self):
+        self.window = createWindow()
+        self.scene = self.window.scene
+        self.evaluator = self.scene.evaluator
+        self.a = CountingNode(self.scene, 'A', inputs=0)
+        self.b = CountingNode(self.scene, 'B')
+        self.c = CountingNode(self.scene, 'C')
+        self.d = CountingNode(self.scene, 'D', inputs=2)
+        Edge(self.scene, self.a.outputs[0], self.b.inputs[0])
+        Edge(self.scene, self.a.outputs[0], self.c.inputs[0])
+        Edge(self.scene, self.b.outputs[0], self.d.inputs[0])
+        Edge(self.scene, self.c.outputs[0], self.d.inputs[1])
+        self.evaluator.evalNodes([self.a])
+        self.assertEqual(self.result(self.d), 5)
+        CountingNode.evaluations.clear()
+
+    def tearDown(self):
+        self.evaluator.shutdown()
+
+    def result(self, node: CountingNode) -> int:
+        return int(node.value['x'].iloc[0])
+
+
+class TestTopologicalOrder(EvaluatorTestCase):
+    """Each node affected by a change is evaluated once, after all of its parents."""
+
+    def test_001_diamond(self):
+        self.a.offset = 2
+        self.evaluator.evalNodes([self.a])
+        evaluated = CountingNode.evaluated()
+        self.assertEqual(sorted(evaluated), ['A', 'B', 'C', 'D'])
+        self.assertEqual((evaluated[0], evaluated[-1]), ('A', 'D'))
+        self.assertEqual(self.result(self.d), 7)
+        self.assertFalse(any(node.isDirty() or node.isInvalid() for node in self.scene.nodes))
+
+    def test_002_branch(self):
+        """Only the descendants of the changed node are evaluated"""
+        self.b.offset = 2
+        self.evaluator.evalNodes([self.b])
+        self.assertEqual(CountingNode.evaluated(), ['B', 'D'])
+        self.assertEqual(self.result(self.d), 6)
+
+    def test_003_same_output(self):
+        """The propagation stops at a node whose result did not change"""
+        self.evaluator.evalNodes([self.a], force=True)
+        self.assertEqual(CountingNode.evaluated(), ['A'])
+        self.assertFalse(any(node.isDirty() for node in self.scene.nodes))
+
+    def test_004_dirty_nodes(self):
+        for node in (self.b, self.c):
+            node.offset = 0
+            node.markDirty()
+        self.evaluator.evalDirtyNodes()
+        self.assertEqual(sorted(CountingNode.evaluated()), ['B', 'C', 'D'])
+        self.assertEqual(CountingNode.evaluated()[-1], 'D')
+        self.assertEqual(self.result(self.d), 3)
+
+
+class TestParallel(EvaluatorTestCase):
+    """Nodes which do not depend on each other are computed concurrently on the thread pool."""
+
+    def test_001_branches(self):
+        self.evaluator.setMaxWorkers(2)
+        self.b.delay = self.c.delay = 0.3
+        self.a.offset = 2
+        start = time.perf_counter()
+        self.evaluator.evalNodes([self.a])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sorted(CountingNode.evaluated()), ['A', 'B', 'C', 'D'])
+        self.assertEqual(CountingNode.evaluated()[-1], 'D')
+        self.assertEqual(self.result(self.d), 7)
+        threads = dict(CountingNode.evaluations)
+        self.assertNotEqual(threads['B'], threads['C'])
+        self.assertNotIn(threading.current_thread().name, threads.values())
+        # both branches sleep at the same time
+        self.assertLess(elapsed, 0.55)
+
+    def test_002_sequential(self):
+        """A single worker evaluates in the calling thread"""
+        self.evaluator.setMaxWorkers(1)
+        self.a.offset = 2
+        self.evaluator.evalNodes([self.a])
+        self.assertEqual({thread for _, thread in CountingNode.evaluations}, {threading.current_thread().name})
+
+
+class TestAsynchronous(EvaluatorTestCase):
+    """In asynchronous mode a new evaluation supersedes the one in progress."""
+
+    def setUp(self):
+        super().setUp()
+        self.evaluator.setAsynchronous(True)
+
+    def waitEvaluation(self, timeout: float = 5.):
+        """Process the events of the application until the evaluation in progress is done"""
+        deadline = time.perf_counter() + timeout
+        while self.evaluator.isRunning():
+            self.assertLess(time.perf_counter(), deadline, 'evaluation not done')
+            app.processEvents()
+            time.sleep(0.01)
+        app.processEvents()
+
+    def test_001_returns_right_away(self):
+        self.a.delay = 0.2
+        self.a.offset = 2
+        self.evaluator.evalNodes([self.a])
+        self.assertTrue(self.evaluator.isRunning())
+        self.assertTrue(self.d.isDirty())
+        self.waitEvaluation()
+        self.assertEqual(sorted(CountingNode.evaluated()), ['A', 'B', 'C', 'D'])
+        self.assertEqual(self.result(self.d), 7)
+
+    def test_002_superseded(self):
+        """The result of the superseded job is discarded, its pending nodes are evaluated by the new run"""
+        self.a.delay = 0.2
+        self.a.offset = 2
+        self.evaluator.evalNodes([self.a])
+        self.a.offset = 3
+        self.evaluator.evalNodes([self.a])
+        self.waitEvaluation()
+        # the job already running is not interrupted, its descendants are only evaluated with the new value
+        self.assertEqual(CountingNode.evaluated().count('A'), 2)
+        self.assertEqual(sorted(CountingNode.evaluated()[2:]), ['B', 'C', 'D'])
+        self.assertEqual(self.result(self.a), 3)
+        self.assertEqual(self.result(self.d), 9)
+        self.assertFalse(any(node.isDirty() or node.isInvalid() for node in self.scene.nodes))
+
+    def test_003_cancel(self):
+        """Cancelled nodes are left dirty and evaluated by the next evaluation"""
+        self.a.delay = 0.2
+        self.a.offset = 2
+        self.evaluator.evalNodes([self.a])
+        # the result of the running job is discarded as well
+        self.assertEqual(set(self.evaluator.cancel()), {self.a, self.b, self.c, self.d})
+        self.assertFalse(self.evaluator.isRunning())
+        time.sleep(0.3)
+        app.processEvents()
+        self.assertTrue(all(node.isDirty() for node in self.scene.nodes))
+
+        self.evaluator.evalDirtyNodes()
+        self.waitEvaluation()
+        self.assertEqual(self.result(self.d), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Tests of the periodic backup of the scene, see `node_editor.node_scene_autosave`."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.helpers import CountingNode, createWindow
+from node_editor.node_edge import Edge
+from node_editor.node_scene_file import loadData, saveData
+
+
+def failingSave(data, filename):
+    """Writes half of the file then fails, as a full disk would"""
+    with open(filename, 'w') as file:
+        file.write('{"nodes": [')
+    raise OSError('No space left on device')
+
+
+class TestAutosave(unittest.TestCase):
+    """The backup is written in the worker thread, through a temporary file renamed over the previous backup."""
+
+    def setUp(self):
+        self.window = createWindow()
+        self.scene = self.window.scene
+        self.autosave = self.scene.autosave
+        self.a = CountingNode(self.scene, 'A', inputs=0)
+        self.b = CountingNode(self.scene, 'B')
+        Edge(self.scene, self.a.outputs[0], self.b.inputs[0])
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'backup.json')
+        self.autosave.start(self.path)
+        self.autosave.stop()
+
+    def tearDown(self):
+        self.autosave.close()
+        self.directory.cleanup()
+
+    def save(self, force: bool = False):
+        self.autosave.autosave(force)
+        self.autosave.wait()
+
+    def assertBackup(self):
+        """The backup holds the current scene and no temporary file is left"""
+        data = loadData(self.path)
+        expected = self.scene.serialize()
+        for key in ('nodes', 'edges'):
+            self.assertEqual(data[key], expected[key])
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.path)])
+
+    def test_001_write(self):
+        self.save()
+        self.assertBackup()
+        self.assertEqual((self.autosave.saves, self.autosave.failures), (1, 0))
+        metrics = self.autosave.getMetrics()
+        self.assertEqual(metrics['written_bytes'], os.path.getsize(self.path))
+        self.assertEqual(metrics['serialized_items'], 3)
+
+        # nothing changed, nothing is written unless forced
+        self.save()
+        self.assertEqual(self.autosave.saves, 1)
+        self.save(force=True)
+        self.assertEqual((self.autosave.saves, self.autosave.serialized_items), (2, 0))
+
+    def test_002_incremental(self):
+        """Only the changed items are serialized again"""
+        self.save()
+        self.b.offset = 5
+        self.autosave.markChanged(self.b)
+        self.save()
+        self.assertEqual(self.autosave.serialized_items, 1)
+        self.assertBackup()
+
+        c = CountingNode(self.scene, 'C')
+        Edge(self.scene, self.b.outputs[0], c.inputs[0])
+        self.save(force=True)
+        self.assertEqual(self.autosave.serialized_items, 2)
+        self.assertBackup()
+
+        self.autosave.invalidate()
+        self.save()
+        self.assertEqual(self.autosave.serialized_items, 5)
+
+    def test_003_failure(self):
+        """A failed write leaves the previous backup untouched, the next autosave writes it again"""
+        self.save()
+        with open(self.path) as file:
+            previous = file.read()
+
+        self.b.offset = 5
+        self.autosave.markChanged(self.b)
+        with mock.patch('node_editor.node_scene_autosave.saveData', failingSave):
+            self.save()
+        self.assertEqual(self.autosave.failures, 1)
+        with open(self.path) as file:
+            self.assertEqual(file.read(), previous)
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.path)])
+
+        self.save()
+        self.assertEqual(self.autosave.saves, 2)
+        self.assertBackup()
+
+    def test_004_replaced(self):
+        """The backup is replaced by a rename, a reader holding the previous file still reads it whole"""
+        saveData({'nodes': [], 'edges': []}, self.path)
+        with open(self.path) as reader:
+            self.save()
+            self.assertEqual(json.load(reader), {'nodes': [], 'edges': []})
+        self.assertBackup()
+
+    def test_005_discard(self):
+        self.save()
+        self.autosave.discard()
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()